@@ -10,19 +10,44 @@ import os
 
 from config import config
 from models import db, User, Customer, Product, Order, OrderItem, Contact
+from services import (replica, archive, user_cache, throttle, template_cache, assets,
+                      compression, conditional, fragment_cache, changelog, outbox, jobs,
+                      scores, forecast, parallel, product_sales, cube)
 
 
-def create_app(config_name=None):
-    """Application Factory"""
+def create_app(config_name=None, **overrides):
+    """Application Factory
+
+    `overrides` überschreiben einzelne Config-Werte (z.B. SQLALCHEMY_DATABASE_URI
+    für Benchmarks auf eigenen Datenbanken).
+    """
     if config_name is None:
         config_name = os.environ.get('FLASK_ENV', 'development')
     
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+    app.config.update(overrides)
+    template_cache.init_app(app)
     
     # Initialize extensions
     db.init_app(app)
     migrate = Migrate(app, db)
+    replica.init_app(app, db)
+    archive.init_app(app)
+    user_cache.init_app(app)
+    throttle.init_app(app)
+    assets.init_app(app)
+    compression.init_app(app)
+    conditional.init_app(app)
+    fragment_cache.init_app(app)
+    changelog.init_app(app)
+    outbox.init_app(app)
+    jobs.init_app(app)
+    scores.init_app(app)
+    forecast.init_app(app)
+    parallel.init_app(app)
+    product_sales.init_app(app)
+    cube.init_app(app)
     
     # Setup Flask-Login
     login_manager = LoginManager()
@@ -32,16 +57,21 @@ def create_app(config_name=None):
     
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.get(int(user_id))
+        # Immer von der Primär-DB, damit frisch registrierte User nicht fehlen
+        with replica.use_primary():
+            return user_cache.load_user(user_id)
     
     # Register blueprints
-    from views import main, auth, customers, orders, contacts, reports
+    from views import main, auth, customers, orders, contacts, reports, api
+    from views import jobs as jobs_views
     app.register_blueprint(main.bp)
     app.register_blueprint(auth.bp)
     app.register_blueprint(customers.bp)
     app.register_blueprint(orders.bp)
     app.register_blueprint(contacts.bp)
     app.register_blueprint(reports.bp)
+    app.register_blueprint(api.bp)
+    app.register_blueprint(jobs_views.bp)
     
     # Context processors
     @app.context_processor
@@ -115,6 +145,10 @@ def create_app(config_name=None):
         db.session.rollback()
         return render_template('errors/500.html'), 500
     
+    # Templates vorkompilieren statt beim ersten Request
+    if app.config['TEMPLATE_WARMUP']:
+        template_cache.warm_up(app)
+    
     return app
 
 
@@ -0,0 +1,414 @@
+"""
+Endpoint-Benchmark über mehrere Datenmengen
+Baut pro Skala eine eigene Datenbank mit dem Generator aus `seed.py`, ruft die
+heißen Endpunkte über den Flask-Testclient auf und misst Latenz-Perzentile,
+Anzahl SQL-Statements, Antwortgröße und Spitzen-Speicher (tracemalloc).
+Ergebnisse landen als JSON in `benchmarks/results/` und lassen sich mit
+`--compare` gegen einen früheren Lauf prüfen.
+
+Mit `--login` wird stattdessen der Login-Durchsatz je Hash-Verfahren
+gemessen (Logins pro Sekunde auf einem Kern), um PASSWORD_HASH_METHOD
+bewusst zu wählen.
+
+Aufruf:
+    python benchmark.py                                  # Skalen 1000,10000
+    python benchmark.py --scales 1000,100000,1000000 --requests 30
+    python benchmark.py --compare benchmarks/results/baseline.json --threshold 0.2
+    python benchmark.py --login --hash-methods scrypt:32768:8:1,pbkdf2:sha256:600000
+    python benchmark.py --cold-start                     # Erst-Request mit/ohne Template-Cache
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+from app import create_app
+from config import Config
+from models import db, User, Customer
+from query_plans import capture_statements
+from seed import generate_dataset
+
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+BENCHMARK_DIR = os.path.join(basedir, 'benchmarks')
+
+PERCENTILES = (50, 90, 95, 99)
+
+# Templates mit dem größten Kompilieraufwand
+COLD_START_URLS = ['/', '/reports/', '/customers/1']
+
+COLD_START_VARIANTS = [
+    # (Name, Bytecode-Cache, Cache vorab befüllt, Warm-up in create_app)
+    ('ohne Cache', False, False, False),
+    ('Bytecode-Cache kalt', True, False, False),
+    ('Bytecode-Cache warm', True, True, False),
+    ('Cache warm + Warm-up', True, True, True),
+]
+
+LOGIN_HASH_METHODS = [
+    'scrypt:32768:8:1',       # Werkzeug-Standard
+    'scrypt:16384:8:1',
+    'pbkdf2:sha256:600000',   # Werkzeug-Standard für pbkdf2 (OWASP 2023)
+    'pbkdf2:sha256:260000',
+]
+
+
+def endpoints():
+    """(Name, URL) der gemessenen Endpunkte"""
+    customer = Customer.query.order_by(Customer.id).first()
+    term = customer.last_name[:3] if customer else 'a'
+    return [
+        ('main.index', '/'),
+        ('main.search', f'/search?q={term}'),
+        ('customers.list', '/customers/'),
+        ('orders.list', '/orders/'),
+        ('contacts.list', '/contacts/'),
+        ('reports.index', '/reports/'),
+        ('reports.export_customers_csv', '/reports/export/customers_csv'),
+        ('reports.export_orders_csv', '/reports/export/orders_csv'),
+        ('reports.export_contacts_csv', '/reports/export/contacts_csv'),
+        ('api.orders', '/api/v1/orders?limit=500&fields=order_number,status,total_amount'
+                       '&include=customer&fields[customer]=last_name'),
+        ('api.customers', '/api/v1/customers?limit=500&fields=first_name,last_name,email'),
+    ]
+
+
+def percentile(values, pct):
+    """Perzentil mit linearer Interpolation (wie numpy.percentile)"""
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def database_path(scale, seed, db_dir):
+    return os.path.join(db_dir, f'scale-{scale}-seed{seed}.db')
+
+
+def build_database(scale, seed, db_dir, rebuild=False, workers=1):
+    """SQLite-Datenbank für eine Skala anlegen (wird wiederverwendet)"""
+    path = database_path(scale, seed, db_dir)
+    if os.path.exists(path) and not rebuild:
+        return path
+
+    os.makedirs(db_dir, exist_ok=True)
+    if os.path.exists(path):
+        os.remove(path)
+    print(f'\n🏗  Baue Datenbank für {scale:,} Kunden: {path}')
+    generate_dataset(scale, seed=seed, workers=workers, database_url='sqlite:///' + path)
+    return path
+
+
+def measure_endpoint(app, client, url, requests):
+    """Latenzen (ms), SQL-Anzahl, Antwortgröße und Spitzen-Speicher eines Endpunkts"""
+    # Requests laufen ohne äußeren App-Kontext - sonst teilen sie sich `g`
+    # (inkl. des von Flask-Login geladenen Users) und messen zu wenig
+    with app.app_context():
+        status, statements = capture_statements(app, client, url)  # Aufwärmen + SQL zählen
+    if status != 200:
+        return {'status': status}
+
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get(url)
+        response.get_data()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    # Eigener Durchlauf - tracemalloc verlangsamt die Ausführung deutlich
+    tracemalloc.start()
+    response = client.get(url)
+    size = len(response.get_data())
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    result = {
+        'status': status,
+        'requests': requests,
+        'mean_ms': round(statistics.fmean(timings), 2),
+        'max_ms': round(max(timings), 2),
+        'sql_count': len(statements),
+        'response_bytes': size,
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+    for pct in PERCENTILES:
+        result[f'p{pct}_ms'] = round(percentile(timings, pct), 2)
+    return result
+
+
+def run_scale(scale, path, requests, threads):
+    """Alle Endpunkte auf einer Datenbank messen"""
+    # TestingConfig schaltet die parallelen Dashboard-Abfragen ab (In-Memory-SQLite),
+    # hier liegt die Datenbank in einer Datei - Wert ausdrücklich setzen
+    app = create_app('testing', SQLALCHEMY_DATABASE_URI='sqlite:///' + path,
+                     SQLALCHEMY_ECHO=False, DASHBOARD_QUERY_THREADS=threads)
+    results = {}
+
+    with app.app_context():
+        user = User.query.filter(User.role.in_(['Admin', 'Chef'])).first()
+        user_id = user.get_id()
+        urls = endpoints()
+        db.session.remove()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = user_id
+        session['_fresh'] = True
+
+    print(f'\n📏 Skala {scale:,} Kunden ({requests} Requests je Endpunkt)')
+    for name, url in urls:
+        result = measure_endpoint(app, client, url, requests)
+        results[name] = result
+        if result['status'] != 200:
+            print(f'   {name:30} HTTP {result["status"]}')
+            continue
+        print(f'   {name:30} p50 {result["p50_ms"]:9.1f} ms  p95 {result["p95_ms"]:9.1f} ms  '
+              f'{result["sql_count"]:6} SQL  {result["peak_memory_kb"]:10.0f} KB')
+
+    return results
+
+
+def run_login(methods, requests):
+    """Login-Durchsatz je Hash-Verfahren über auth.login (ein Prozess = ein Kern)"""
+    from werkzeug.security import check_password_hash, generate_password_hash
+
+    results = {}
+    print(f'\n🔐 Login-Benchmark ({requests} Logins je Verfahren, 1 Kern)')
+
+    for method in methods:
+        # In-Memory-SQLite, nur auth.login - parallele Dashboard-Abfragen spielen keine Rolle
+        app = create_app('testing', PASSWORD_HASH_METHOD=method, SQLALCHEMY_ECHO=False)
+        with app.app_context():
+            db.create_all()
+            user = User(name='Benchmark', email='bench@crm.local', role='Mitarbeiter')
+            user.set_password('benchmark123')
+            db.session.add(user)
+            db.session.commit()
+
+            # Reine Hash-Prüfung
+            password_hash = generate_password_hash('benchmark123', method=method)
+            started = time.perf_counter()
+            for _ in range(requests):
+                check_password_hash(password_hash, 'benchmark123')
+            hash_ms = (time.perf_counter() - started) * 1000 / requests
+
+            db.session.remove()
+
+        # Kompletter Login-Request, jeweils mit frischem Client und ohne
+        # äußeren App-Kontext (sonst bleibt der User in `g` angemeldet)
+        timings = []
+        for _ in range(requests):
+            client = app.test_client()
+            started = time.perf_counter()
+            response = client.post('/auth/login', data={'email': 'bench@crm.local',
+                                                        'password': 'benchmark123'})
+            timings.append((time.perf_counter() - started) * 1000)
+            assert response.status_code == 302 and response.headers['Location'] == '/'
+
+        name, *args = method.split(':')
+        memory_mb = 128 * int(args[0]) * int(args[1]) / 2 ** 20 if name == 'scrypt' and args else None
+        result = {
+            'hash_ms': round(hash_ms, 2),
+            'login_p50_ms': round(percentile(timings, 50), 2),
+            'login_p95_ms': round(percentile(timings, 95), 2),
+            'logins_per_second_per_core': round(1000 / statistics.fmean(timings), 1),
+            'memory_per_hash_mb': memory_mb,
+        }
+        results[method] = result
+        memory = f'{memory_mb:5.0f} MB/Hash' if memory_mb else ''
+        print(f'   {method:24} Hash {hash_ms:7.1f} ms  Login p50 {result["login_p50_ms"]:7.1f} ms  '
+              f'{result["logins_per_second_per_core"]:7.1f} Logins/s/Kern  {memory}')
+
+    return results
+
+
+def cold_start_child(database, cache_dir, warmup, threads):
+    """In frischem Prozess: create_app und erster/zweiter Request je URL (ms)"""
+    started = time.perf_counter()
+    app = create_app('testing', SQLALCHEMY_DATABASE_URI='sqlite:///' + database,
+                     SQLALCHEMY_ECHO=False, TEMPLATE_CACHE_DIR=cache_dir, TEMPLATE_WARMUP=warmup,
+                     DASHBOARD_QUERY_THREADS=threads)
+    result = {'create_app_ms': (time.perf_counter() - started) * 1000}
+
+    with app.app_context():
+        user_id = User.query.filter(User.role.in_(['Admin', 'Chef'])).first().get_id()
+        db.session.remove()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['_user_id'] = user_id
+
+    for url in COLD_START_URLS:
+        timings = []
+        for _ in range(2):
+            started = time.perf_counter()
+            client.get(url).get_data()
+            timings.append((time.perf_counter() - started) * 1000)
+        result[url] = {'first_ms': timings[0], 'second_ms': timings[1]}
+    return result
+
+
+def run_cold_start(database, repeats, threads):
+    """Jede Variante `repeats`-mal in neuen Prozessen messen, Median je Wert"""
+    results = {}
+    print(f'\n🧊 Kaltstart ({repeats} Prozesse je Variante)')
+
+    for name, use_cache, prefill, warmup in COLD_START_VARIANTS:
+        runs = []
+        for _ in range(repeats):
+            cache_dir = tempfile.mkdtemp(prefix='jinja-') if use_cache else ''
+            try:
+                if prefill:
+                    _spawn_cold_start(database, cache_dir, False, threads)
+                runs.append(_spawn_cold_start(database, cache_dir, warmup, threads))
+            finally:
+                if cache_dir:
+                    shutil.rmtree(cache_dir, ignore_errors=True)
+
+        result = {'create_app_ms': round(statistics.median(r['create_app_ms'] for r in runs), 1)}
+        for url in COLD_START_URLS:
+            result[url] = {key: round(statistics.median(r[url][key] for r in runs), 1)
+                           for key in ('first_ms', 'second_ms')}
+        # Mehraufwand des ersten gegenüber dem zweiten Request = Template-Kompilierung u.ä.
+        result['first_request_overhead_ms'] = round(
+            sum(result[url]['first_ms'] - result[url]['second_ms'] for url in COLD_START_URLS), 1)
+        results[name] = result
+
+        first = '  '.join(f'{url} {result[url]["first_ms"]:6.1f}' for url in COLD_START_URLS)
+        print(f'   {name:22} create_app {result["create_app_ms"]:6.1f} ms  Erst-Request: {first} ms  '
+              f'Mehraufwand {result["first_request_overhead_ms"]:6.1f} ms')
+
+    return results
+
+
+def _spawn_cold_start(database, cache_dir, warmup, threads):
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--cold-start-child',
+         json.dumps([database, cache_dir, warmup, threads])],
+        cwd=basedir, stderr=subprocess.DEVNULL, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=basedir,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline, threshold):
+    """Regressionen gegenüber einem früheren Lauf, liefert die Anzahl
+
+    Regression: p50 oder p95 um mehr als `threshold` langsamer, oder mehr
+    SQL-Statements als vorher.
+    """
+    regressions = 0
+    print(f'\n🔍 Vergleich mit {baseline["meta"].get("revision") or "?"} '
+          f'vom {baseline["meta"]["timestamp"]} (Toleranz {threshold:.0%})')
+
+    for scale, endpoints_now in current['results'].items():
+        endpoints_before = baseline['results'].get(scale)
+        if endpoints_before is None:
+            continue
+        for name, now in endpoints_now.items():
+            before = endpoints_before.get(name)
+            if not before or now['status'] != 200 or before['status'] != 200:
+                continue
+
+            problems = []
+            for key in ('p50_ms', 'p95_ms'):
+                if now[key] > before[key] * (1 + threshold):
+                    problems.append(f'{key} {before[key]:.1f} → {now[key]:.1f}')
+            if now['sql_count'] > before['sql_count']:
+                problems.append(f'SQL {before["sql_count"]} → {now["sql_count"]}')
+
+            if problems:
+                regressions += 1
+                print(f'   ❌ {scale:>8} {name:30} ' + ', '.join(problems))
+
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Endpoint-Benchmark über mehrere Datenmengen')
+    parser.add_argument('--scales', default='1000,10000',
+                        help='Kommagetrennte Kundenanzahlen (Standard 1000,10000)')
+    parser.add_argument('--requests', type=int, default=20, help='Messungen je Endpunkt')
+    parser.add_argument('--seed', type=int, default=42, help='Seed des Datengenerators')
+    parser.add_argument('--workers', type=int, default=1, help='Prozesse beim Datenbank-Aufbau')
+    parser.add_argument('--db-dir', default=os.path.join(BENCHMARK_DIR, 'db'),
+                        help='Ablage der Benchmark-Datenbanken')
+    parser.add_argument('--rebuild', action='store_true', help='Datenbanken neu generieren')
+    parser.add_argument('--output', help='Ergebnis-Datei (Standard benchmarks/results/<Zeitstempel>.json)')
+    parser.add_argument('--compare', help='Früheres Ergebnis, gegen das geprüft wird')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Erlaubte Verlangsamung beim Vergleich (Standard 0.2 = 20%%)')
+    parser.add_argument('--login', action='store_true',
+                        help='Login-Durchsatz je Hash-Verfahren statt Endpunkt-Benchmark messen')
+    parser.add_argument('--hash-methods', default=','.join(LOGIN_HASH_METHODS),
+                        help='Kommagetrennte Verfahren für --login')
+    parser.add_argument('--cold-start', action='store_true',
+                        help='Erst-Request-Latenz mit/ohne Template-Cache messen (erste Skala)')
+    parser.add_argument('--dashboard-threads', type=int, default=Config.DASHBOARD_QUERY_THREADS,
+                        help='DASHBOARD_QUERY_THREADS (Standard wie Produktion: %(default)s, 0 = nacheinander)')
+    parser.add_argument('--cold-start-child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    if args.cold_start_child:
+        print(json.dumps(cold_start_child(*json.loads(args.cold_start_child))))
+        sys.exit(0)
+    scales = [int(value) for value in args.scales.split(',')]
+    timestamp = datetime.now()
+
+    report = {
+        'meta': {
+            'timestamp': timestamp.isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'requests': args.requests,
+            'dashboard_query_threads': args.dashboard_threads,
+        },
+        'results': {},
+    }
+
+    if args.login:
+        report['login'] = run_login(args.hash_methods.split(','), args.requests)
+    elif args.cold_start:
+        path = build_database(scales[0], args.seed, args.db_dir, args.rebuild, args.workers)
+        report['cold_start'] = run_cold_start(path, min(args.requests, 5), args.dashboard_threads)
+    else:
+        for scale in scales:
+            path = build_database(scale, args.seed, args.db_dir, args.rebuild, args.workers)
+            report['results'][str(scale)] = run_scale(scale, path, args.requests, args.dashboard_threads)
+
+    output = args.output or os.path.join(BENCHMARK_DIR, 'results',
+                                         timestamp.strftime('%Y%m%d-%H%M%S') + '.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'\n💾 Ergebnis gespeichert: {output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        count = compare(report, baseline, args.threshold)
+        if count:
+            print(f'\n❌ {count} Regressionen gefunden')
+            sys.exit(1)
+        print('\n✅ Keine Regressionen')
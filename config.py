@@ -23,6 +23,99 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_ECHO = False
     
+    # Read-Replica (optional) - Dashboard und Reports lesen von hier
+    READ_REPLICA_URL = os.environ.get('READ_REPLICA_URL')
+    SQLALCHEMY_BINDS = {'replica': READ_REPLICA_URL} if READ_REPLICA_URL else {}
+    READ_REPLICA_MAX_LAG = int(os.environ.get('READ_REPLICA_MAX_LAG', 60))  # Sekunden
+    READ_REPLICA_CHECK_INTERVAL = int(os.environ.get('READ_REPLICA_CHECK_INTERVAL', 10))  # Sekunden
+    READ_REPLICA_HEARTBEAT_INTERVAL = int(os.environ.get('READ_REPLICA_HEARTBEAT_INTERVAL', 5))  # Sekunden
+    
+    # Archivierung alter/stornierter Bestellungen (flask archive-orders)
+    ARCHIVE_HORIZON_DAYS = int(os.environ.get('ARCHIVE_HORIZON_DAYS', 730))
+    ARCHIVE_CANCELLED_AFTER_DAYS = int(os.environ.get('ARCHIVE_CANCELLED_AFTER_DAYS', 30))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', 1000))
+    
+    # Passwort-Hashing (Werkzeug-Format, z.B. 'scrypt:32768:8:1' oder 'pbkdf2:sha256:600000')
+    # Bestehende Hashes werden beim nächsten Login auf diese Parameter umgestellt
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    
+    # Login-Throttling (Token-Bucket je IP und E-Mail, vor der Passwortprüfung)
+    LOGIN_THROTTLE_ENABLED = os.environ.get('LOGIN_THROTTLE_ENABLED', 'True').lower() == 'true'
+    LOGIN_THROTTLE_BACKEND = os.environ.get('LOGIN_THROTTLE_BACKEND', 'memory')  # memory | sqlite
+    LOGIN_THROTTLE_DB = os.environ.get('LOGIN_THROTTLE_DB') or os.path.join(basedir, 'throttle.db')
+    LOGIN_THROTTLE_IP_BURST = int(os.environ.get('LOGIN_THROTTLE_IP_BURST', 30))
+    LOGIN_THROTTLE_IP_PER_MINUTE = float(os.environ.get('LOGIN_THROTTLE_IP_PER_MINUTE', 10))
+    LOGIN_THROTTLE_EMAIL_BURST = int(os.environ.get('LOGIN_THROTTLE_EMAIL_BURST', 5))
+    LOGIN_THROTTLE_EMAIL_PER_MINUTE = float(os.environ.get('LOGIN_THROTTLE_EMAIL_PER_MINUTE', 2))
+    
+    # User-Cache für Flask-Login (Sekunden, 0 = aus)
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 60))
+    
+    # Templates: Jinja-Bytecode-Cache (leer = aus) und Vorkompilieren beim Start
+    TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(basedir, '.jinja_cache'))
+    TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', 'False').lower() == 'true'
+    
+    # Static-Assets mit Inhalts-Hash aus static/<ASSETS_DIST> (flask assets-build)
+    ASSETS_FINGERPRINT = os.environ.get('ASSETS_FINGERPRINT', 'True').lower() == 'true'
+    ASSETS_DIST = 'dist'
+    
+    # Response-Kompression (gzip/deflate) für Text-Antworten
+    COMPRESS_ENABLED = os.environ.get('COMPRESS_ENABLED', 'True').lower() == 'true'
+    COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+    COMPRESS_LEVEL = int(os.environ.get('COMPRESS_LEVEL', 6))
+    COMPRESS_MIMETYPES = {
+        'text/html', 'text/css', 'text/csv', 'text/plain', 'text/javascript',
+        'application/json', 'application/javascript', 'image/svg+xml',
+    }
+    
+    # ETag/Last-Modified und 304 für Detailseiten und CSV-Exporte
+    CONDITIONAL_GET = os.environ.get('CONDITIONAL_GET', 'True').lower() == 'true'
+    
+    # Fragment-Cache für Dashboard-Teile: memory, sqlite (mehrere Worker) oder none
+    FRAGMENT_CACHE_BACKEND = os.environ.get('FRAGMENT_CACHE_BACKEND', 'memory')
+    FRAGMENT_CACHE_DB = os.environ.get('FRAGMENT_CACHE_DB') or os.path.join(basedir, 'fragment_cache.db')
+    FRAGMENT_CACHE_TTL = int(os.environ.get('FRAGMENT_CACHE_TTL', 3600))
+    
+    # JSON-API (/api/v1): Standard- und Höchstzahl Zeilen pro Seite bzw. IDs pro Batch
+    API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 50))
+    API_MAX_PAGE_SIZE = int(os.environ.get('API_MAX_PAGE_SIZE', 500))
+    
+    # Change-Feed (/api/v1/changes): Einträge pro Abruf, Kompaktierung nach N Tagen
+    CHANGE_FEED_PAGE_SIZE = int(os.environ.get('CHANGE_FEED_PAGE_SIZE', 1000))
+    CHANGE_LOG_RETENTION_DAYS = int(os.environ.get('CHANGE_LOG_RETENTION_DAYS', 30))
+    
+    # Webhooks für Bestell-Ereignisse (Outbox), mehrere URLs durch Komma getrennt
+    OUTBOX_WEBHOOK_URLS = [url.strip() for url in os.environ.get('OUTBOX_WEBHOOK_URLS', '').split(',')
+                           if url.strip()]
+    OUTBOX_WEBHOOK_SECRET = os.environ.get('OUTBOX_WEBHOOK_SECRET')  # HMAC-Signatur, optional
+    OUTBOX_BATCH_SIZE = int(os.environ.get('OUTBOX_BATCH_SIZE', 100))
+    OUTBOX_MAX_ATTEMPTS = int(os.environ.get('OUTBOX_MAX_ATTEMPTS', 10))
+    OUTBOX_BACKOFF_BASE = float(os.environ.get('OUTBOX_BACKOFF_BASE', 5))  # Sekunden, verdoppelt je Versuch
+    OUTBOX_BACKOFF_MAX = float(os.environ.get('OUTBOX_BACKOFF_MAX', 3600))
+    OUTBOX_TIMEOUT = float(os.environ.get('OUTBOX_TIMEOUT', 10))
+    OUTBOX_POLL_INTERVAL = float(os.environ.get('OUTBOX_POLL_INTERVAL', 2))
+    
+    # Hintergrund-Jobs (flask jobs-worker)
+    JOB_WORKER_THREADS = int(os.environ.get('JOB_WORKER_THREADS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 1))
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    JOB_TIMEOUT = int(os.environ.get('JOB_TIMEOUT', 3600))  # danach gilt ein laufender Job als abgestürzt
+    JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', 7))
+    JOB_RESULT_DIR = os.environ.get('JOB_RESULT_DIR') or os.path.join(basedir, 'job_results')
+    
+    # Parallele Abfragegruppen in Dashboard und Reports, 0 = nacheinander
+    DASHBOARD_QUERY_THREADS = int(os.environ.get('DASHBOARD_QUERY_THREADS', 4))
+    
+    # Kundenkennzahlen (Job customers.compute_scores), 0 = nur manuell
+    CUSTOMER_SCORES_INTERVAL = int(os.environ.get('CUSTOMER_SCORES_INTERVAL', 3600))
+    
+    # Umsatzprognose (Job revenue.forecast), 0 = nur manuell
+    FORECAST_INTERVAL = int(os.environ.get('FORECAST_INTERVAL', 86400))
+    FORECAST_HISTORY_MONTHS = int(os.environ.get('FORECAST_HISTORY_MONTHS', 24))  # abgeschlossene Monate
+    FORECAST_HORIZON = int(os.environ.get('FORECAST_HORIZON', 3))  # Monate ab dem laufenden
+    FORECAST_ALPHA = float(os.environ.get('FORECAST_ALPHA', 0.5))  # Glättung Niveau
+    FORECAST_BETA = float(os.environ.get('FORECAST_BETA', 0.2))  # Glättung Trend
+    
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(hours=24)
     SESSION_COOKIE_SECURE = False  # Set to True in production with HTTPS
@@ -57,12 +150,15 @@ class DevelopmentConfig(Config):
     """Development configuration"""
     DEBUG = True
     SQLALCHEMY_ECHO = True
+    # CSS-Änderungen ohne Build sofort sichtbar
+    ASSETS_FINGERPRINT = os.environ.get('ASSETS_FINGERPRINT', 'False').lower() == 'true'
 
 
 class ProductionConfig(Config):
     """Production configuration"""
     DEBUG = False
     SESSION_COOKIE_SECURE = True
+    TEMPLATE_WARMUP = os.environ.get('TEMPLATE_WARMUP', 'True').lower() == 'true'
     
     # Use stronger secret key in production
     if Config.SECRET_KEY == 'dev-secret-key-change-in-production':
@@ -73,7 +169,10 @@ class TestingConfig(Config):
     """Testing configuration"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-Memory-SQLite: alle Threads teilen eine Connection
+    DASHBOARD_QUERY_THREADS = 0
     WTF_CSRF_ENABLED = False
+    ASSETS_FINGERPRINT = False
 
 
 # Configuration dictionary
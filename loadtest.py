@@ -0,0 +1,401 @@
+"""
+Lasttest mit parallelen Benutzern
+Startet die App lokal unter einem Multi-Prozess-WSGI-Server (Werkzeug-Prefork
+oder gunicorn), meldet virtuelle Benutzer an und spielt aus vielen
+Threads eine gewichtete Mischung von Szenarien ab: Listen blättern, Kunden
+öffnen, suchen, Dashboard laden, Bestellungen anlegen und Positionen hinzufügen.
+Ausgabe: Durchsatz, p50/p95/p99-Latenz und Fehlerraten je Schritt.
+
+Achtung: das Szenario `order` schreibt Bestellungen in die Datenbank -
+am besten auf einer Kopie bzw. einer Generator-Datenbank laufen lassen.
+
+Aufruf:
+    python loadtest.py --threads 20 --duration 30
+    python loadtest.py --mix browse=50,customer=30,search=20 --server-workers 8
+    python loadtest.py --database-url sqlite:////tmp/load.db --output load.json
+    python loadtest.py --url http://127.0.0.1:8000 --threads 50   # laufender Server
+"""
+import argparse
+import http.cookiejar
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import warnings
+from collections import Counter, defaultdict
+
+from app import create_app
+from benchmark import percentile
+from models import db, Customer, Product
+
+
+DEFAULT_MIX = 'browse=35,customer=25,search=20,dashboard=10,order=10'
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+class _PreforkServer:
+    """N Werkzeug-Worker-Prozesse teilen sich einen Listen-Socket (wie gunicorn sync)"""
+
+    def __init__(self, port, processes, overrides):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.socket.bind(('127.0.0.1', port))
+        self.socket.listen(128)
+        self.workers = [
+            multiprocessing.Process(target=_serve_werkzeug,
+                                    args=(port, self.socket.fileno(), overrides), daemon=True)
+            for _ in range(processes)
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def terminate(self):
+        for worker in self.workers:
+            worker.terminate()
+        self.socket.close()
+
+
+def _serve_werkzeug(port, fd, overrides):
+    from werkzeug.serving import make_server
+
+    # Zugriffslog unterdrücken, Fehler der App bleiben sichtbar
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    app = create_app(**overrides)
+    make_server('127.0.0.1', port, app, fd=fd).serve_forever()
+
+
+def start_server(kind, port, processes, database_url=None):
+    """App im Hintergrund starten, liefert ein Objekt mit terminate()"""
+    overrides = {'SQLALCHEMY_ECHO': False, 'DEBUG': False}
+    if database_url:
+        overrides['SQLALCHEMY_DATABASE_URI'] = database_url
+
+    if kind == 'gunicorn':
+        if shutil.which('gunicorn') is None:
+            raise SystemExit('❌ gunicorn ist nicht installiert (pip install gunicorn) - oder --server werkzeug')
+        env = dict(os.environ)
+        if database_url:
+            env['DATABASE_URL'] = database_url
+        return subprocess.Popen(
+            ['gunicorn', '-w', str(processes), '-b', f'127.0.0.1:{port}', '--log-level', 'warning',
+             "app:create_app(SQLALCHEMY_ECHO=False, DEBUG=False)"],
+            cwd=os.path.abspath(os.path.dirname(__file__)), env=env
+        )
+
+    return _PreforkServer(port, processes, overrides)
+
+
+def wait_until_ready(base_url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(base_url + '/auth/login', timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise SystemExit(f'❌ Server unter {base_url} antwortet nicht')
+
+
+# ---------------------------------------------------------------------------
+# Virtuelle Benutzer
+# ---------------------------------------------------------------------------
+
+class LoginError(Exception):
+    pass
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Redirects nicht folgen - jeder Schritt misst genau einen Request"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class VirtualUser:
+    """Ein angemeldeter Benutzer mit eigenem Cookie-Jar"""
+
+    def __init__(self, base_url, stats, timeout):
+        self.base_url = base_url
+        self.stats = stats
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect
+        )
+
+    def request(self, step, path, data=None):
+        """Request ausführen und messen
+
+        Liefert bei Erfolg die URL der Antwort bzw. das Redirect-Ziel, sonst None.
+        Ein Redirect auf die Login-Seite zählt als Fehler (Session verloren).
+        """
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, data=body, timeout=self.timeout) as response:
+                response.read()
+                target, error = response.geturl(), None
+        except urllib.error.HTTPError as exc:
+            exc.read()
+            if exc.code in (301, 302, 303):
+                target = exc.headers.get('Location', '')
+                error = 'session' if '/auth/login' in target else None
+            else:
+                target, error = None, f'HTTP {exc.code}'
+        except (urllib.error.URLError, ConnectionError, TimeoutError) as exc:
+            target, error = None, type(getattr(exc, 'reason', exc)).__name__
+
+        self.stats.record(step, (time.perf_counter() - started) * 1000, error)
+        return target if error is None else None
+
+    def login(self, email, password):
+        # Fehlgeschlagener Login leitet auf /auth/login zurück -> 'session'
+        if self.request('login', '/auth/login', {'email': email, 'password': password}) is None:
+            raise LoginError(f'Login für {email} fehlgeschlagen')
+
+
+# Szenarien: (Benutzer, RNG, Fixtures) - jeder Schritt wird einzeln gemessen
+
+def scenario_browse(user, rng, fixtures):
+    user.request('customers.list', f'/customers/?page={rng.randint(1, 5)}')
+    user.request('orders.list', '/orders/')
+    user.request('contacts.list', '/contacts/')
+
+
+def scenario_customer(user, rng, fixtures):
+    user.request('customers.detail', f'/customers/{rng.choice(fixtures["customers"])}')
+
+
+def scenario_search(user, rng, fixtures):
+    term = urllib.parse.quote(rng.choice(fixtures['terms']))
+    user.request('main.search', f'/search?q={term}')
+
+
+def scenario_dashboard(user, rng, fixtures):
+    user.request('main.index', '/')
+
+
+def scenario_order(user, rng, fixtures):
+    """Bestellung anlegen und Positionen hinzufügen (Bestellnummern-Race, SQLite-Locks)"""
+    final_url = user.request('orders.new', '/orders/new',
+                             {'customer_id': rng.choice(fixtures['customers']), 'notes': 'Lasttest'})
+    if final_url is None:
+        return
+    # Redirect auf /orders/<id>/edit
+    order_id = urllib.parse.urlparse(final_url).path.rstrip('/').split('/')[-2]
+    for _ in range(rng.randint(1, 3)):
+        product_id, price = rng.choice(fixtures['products'])
+        user.request('orders.add_item', f'/orders/{order_id}/add_item',
+                     {'product_id': product_id, 'quantity': rng.randint(1, 5), 'unit_price': price})
+
+
+SCENARIOS = {
+    'browse': scenario_browse,
+    'customer': scenario_customer,
+    'search': scenario_search,
+    'dashboard': scenario_dashboard,
+    'order': scenario_order,
+}
+
+
+def parse_mix(value):
+    """'browse=40,search=20' -> {'browse': 40, 'search': 20}"""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise argparse.ArgumentTypeError(f'Unbekanntes Szenario: {name} ({", ".join(SCENARIOS)})')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# Messung
+# ---------------------------------------------------------------------------
+
+class Stats:
+    """Thread-sichere Sammlung von Latenzen und Fehlern je Schritt"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(Counter)
+
+    def record(self, step, elapsed_ms, error=None):
+        with self.lock:
+            self.timings[step].append(elapsed_ms)
+            if error:
+                self.errors[step][error] += 1
+
+    def summary(self, duration):
+        steps = {}
+        for step, timings in sorted(self.timings.items()):
+            errors = sum(self.errors[step].values())
+            steps[step] = {
+                'requests': len(timings),
+                'throughput': round(len(timings) / duration, 2),
+                'p50_ms': round(percentile(timings, 50), 1),
+                'p95_ms': round(percentile(timings, 95), 1),
+                'p99_ms': round(percentile(timings, 99), 1),
+                'max_ms': round(max(timings), 1),
+                'error_rate': round(errors / len(timings), 4),
+                'errors': dict(self.errors[step]),
+            }
+
+        timings = [t for values in self.timings.values() for t in values]
+        errors = sum(sum(counter.values()) for counter in self.errors.values())
+        total = {
+            'requests': len(timings),
+            'duration_s': round(duration, 1),
+            'throughput': round(len(timings) / duration, 2) if duration else 0,
+            'error_rate': round(errors / len(timings), 4) if timings else 0,
+        }
+        if timings:
+            for pct in (50, 95, 99):
+                total[f'p{pct}_ms'] = round(percentile(timings, pct), 1)
+        return {'total': total, 'steps': steps}
+
+
+def load_fixtures(database_url=None):
+    """IDs und Suchbegriffe aus der Datenbank, die der Server benutzt"""
+    overrides = {'SQLALCHEMY_ECHO': False}
+    if database_url:
+        overrides['SQLALCHEMY_DATABASE_URI'] = database_url
+    app = create_app(**overrides)
+
+    with app.app_context():
+        customers = [row.id for row in db.session.query(Customer.id)
+                     .order_by(db.func.random()).limit(1000)]
+        terms = sorted({row.last_name[:3] for row in db.session.query(Customer.last_name)
+                        .order_by(db.func.random()).limit(200)})
+        products = [(p.id, float(p.base_price)) for p in Product.query.filter_by(is_active=True)]
+        db.session.remove()
+
+    if not customers or not products:
+        raise SystemExit('❌ Datenbank ist leer - zuerst `python seed.py` bzw. `--scale` ausführen')
+    return {'customers': customers, 'terms': terms, 'products': products}
+
+
+def user_loop(index, args, mix, fixtures, stats, deadline, barrier):
+    rng = random.Random(f'{args.seed}:{index}')
+    user = VirtualUser(args.url, stats, args.timeout)
+    try:
+        user.login(args.email, args.password)
+    except LoginError:
+        return
+    finally:
+        # Alle Benutzer starten gleichzeitig - Logins zählen nicht zur Messdauer
+        barrier.wait()
+
+    names, weights = list(mix), list(mix.values())
+    while time.time() < deadline[0]:
+        SCENARIOS[rng.choices(names, weights=weights)[0]](user, rng, fixtures)
+        if args.think_time:
+            time.sleep(rng.expovariate(1 / args.think_time))
+
+
+def run(args):
+    mix = args.mix
+    server = None
+    if not args.url:
+        args.url = f'http://127.0.0.1:{args.port}'
+        server = start_server(args.server, args.port, args.server_workers, args.database_url)
+
+    try:
+        wait_until_ready(args.url)
+        fixtures = load_fixtures(args.database_url)
+        stats = Stats()
+        deadline = [float('inf')]
+        barrier = threading.Barrier(args.threads + 1)
+
+        print(f'🚀 {args.threads} Benutzer gegen {args.url} für {args.duration}s '
+              f'(Mix: {", ".join(f"{k}={v:g}" for k, v in mix.items())})')
+        threads = [threading.Thread(target=user_loop,
+                                    args=(i, args, mix, fixtures, stats, deadline, barrier),
+                                    daemon=True)
+                   for i in range(args.threads)]
+        for thread in threads:
+            thread.start()
+
+        barrier.wait()
+        # Logins aus der Auswertung nehmen, separat ausweisen
+        logins = stats.timings.pop('login', [])
+        login_errors = stats.errors.pop('login', Counter())
+        started = time.time()
+        deadline[0] = started + args.duration
+        for thread in threads:
+            thread.join()
+        duration = time.time() - started
+    finally:
+        if server is not None:
+            server.terminate()
+
+    report = stats.summary(duration)
+    report['logins'] = {'count': len(logins), 'errors': sum(login_errors.values())}
+    report['config'] = {'threads': args.threads, 'duration': args.duration, 'mix': mix,
+                        'server': None if server is None else args.server,
+                        'server_workers': args.server_workers, 'seed': args.seed}
+    return report
+
+
+def print_report(report):
+    total = report['total']
+    print(f'\n{"Schritt":20} {"Requests":>9} {"req/s":>8} {"p50":>8} {"p95":>8} {"p99":>8} {"Fehler":>8}')
+    for step, row in report['steps'].items():
+        print(f'{step:20} {row["requests"]:>9} {row["throughput"]:>8.1f} {row["p50_ms"]:>8.1f} '
+              f'{row["p95_ms"]:>8.1f} {row["p99_ms"]:>8.1f} {row["error_rate"]:>8.1%}')
+        for error, count in row['errors'].items():
+            print(f'{"":20}   └ {error}: {count}')
+
+    print(f'\nGesamt: {total["requests"]} Requests in {total["duration_s"]}s '
+          f'= {total["throughput"]:.1f} req/s, Fehlerrate {total["error_rate"]:.2%}')
+    if total['requests']:
+        print(f'Latenz: p50 {total["p50_ms"]} ms, p95 {total["p95_ms"]} ms, p99 {total["p99_ms"]} ms')
+    if report['logins']['errors']:
+        print(f'⚠️  {report["logins"]["errors"]} von {report["logins"]["count"]} Logins fehlgeschlagen')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Lasttest mit parallelen Benutzern')
+    parser.add_argument('--threads', type=int, default=20, help='Virtuelle Benutzer (Standard 20)')
+    parser.add_argument('--duration', type=float, default=30, help='Messdauer in Sekunden')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f'Gewichtete Szenarien (Standard {DEFAULT_MIX})')
+    parser.add_argument('--think-time', type=float, default=0,
+                        help='Mittlere Pause zwischen Szenarien in Sekunden')
+    parser.add_argument('--url', help='Bereits laufenden Server verwenden statt selbst zu starten')
+    parser.add_argument('--server', choices=['werkzeug', 'gunicorn'], default='werkzeug',
+                        help='WSGI-Server: Werkzeug-Prefork (Standard) oder gunicorn')
+    parser.add_argument('--server-workers', type=int, default=4, help='Server-Prozesse')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--database-url', help='Datenbank für Server und Fixtures (Standard DATABASE_URL)')
+    parser.add_argument('--email', default='admin@crm.local')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--timeout', type=float, default=30, help='Timeout je Request in Sekunden')
+    parser.add_argument('--seed', type=int, default=42, help='Seed für die Szenario-Auswahl')
+    parser.add_argument('--output', help='Ergebnis zusätzlich als JSON speichern')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    report = run(args)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f'\n💾 Ergebnis gespeichert: {args.output}')
+
+    sys.exit(1 if report['total']['error_rate'] else 0)
@@ -2,12 +2,39 @@
 CRM Database Models
 Alle Tabellen entsprechend der Lehrerangabe
 """
+import json
 from datetime import datetime
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
 
-db = SQLAlchemy()
+from services.replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+def password_hash_method():
+    """Konfiguriertes Hash-Verfahren, außerhalb der App die Werkzeug-Vorgabe"""
+    if has_app_context():
+        return current_app.config['PASSWORD_HASH_METHOD']
+    return 'scrypt'
+
+
+def normalize_hash_method(method):
+    """Verfahren mit Werkzeugs Standardwerten ergänzen, wie es im Hash gespeichert wird
+
+    'scrypt' -> 'scrypt:32768:8:1', 'pbkdf2' -> 'pbkdf2:sha256:600000'
+    """
+    name, *args = method.split(':')
+    if name == 'scrypt' and not args:
+        return 'scrypt:32768:8:1'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = args[1] if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
 
 
 class User(UserMixin, db.Model):
@@ -18,6 +45,8 @@ class User(UserMixin, db.Model):
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(255), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
+    # Zählt Passwortwechsel (nicht Rehashes) - Teil der Session-Kennung
+    password_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     role = db.Column(db.Enum('Schüler', 'Lehrer', 'Admin', 'Chef', 'Mitarbeiter', 
                              name='user_role'), default='Mitarbeiter')
     is_active = db.Column(db.Boolean, default=True)
@@ -27,17 +56,31 @@ class User(UserMixin, db.Model):
     contacts = db.relationship('Contact', backref='user', lazy='dynamic')
     
     def set_password(self, password):
-        """Hash und speichere Passwort"""
-        self.password_hash = generate_password_hash(password)
+        """Neues Passwort setzen - beendet alle bestehenden Sessions"""
+        self.rehash_password(password)
+        self.password_version = (self.password_version or 0) + 1
+    
+    def rehash_password(self, password):
+        """Hash und speichere Passwort (Verfahren aus PASSWORD_HASH_METHOD), Sessions bleiben gültig"""
+        self.password_hash = generate_password_hash(password, method=password_hash_method())
     
     def check_password(self, password):
         """Überprüfe Passwort"""
         return check_password_hash(self.password_hash, password)
     
+    def needs_rehash(self):
+        """Wurde der Hash mit anderen als den konfigurierten Parametern erzeugt?"""
+        stored_method = self.password_hash.split('$', 1)[0]
+        return stored_method != normalize_hash_method(password_hash_method())
+    
     def is_chef(self):
         """Prüfe ob User Chef ist"""
         return self.role in ['Chef', 'Admin']
     
+    def get_id(self):
+        """Session-Kennung '<id>:<passwort-version>' - Passwortwechsel beendet alte Sessions"""
+        return f'{self.id}:{self.password_version}'
+    
     def __repr__(self):
         return f'<User {self.email}>'
 
@@ -59,12 +102,19 @@ class Customer(db.Model):
     notes = db.Column(db.Text)
     rating = db.Column(db.Integer)  # Kundenbewertung 1-5
     created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     orders = db.relationship('Order', backref='customer', lazy='dynamic', 
                             cascade='all, delete-orphan')
     contacts = db.relationship('Contact', backref='customer', lazy='dynamic',
                               cascade='all, delete-orphan')
+    archived_orders = db.relationship('ArchivedOrder', backref='customer', lazy='dynamic',
+                                     cascade='all, delete-orphan')
+    archive_summary = db.relationship('ArchivedOrderSummary', lazy='dynamic',
+                                     cascade='all, delete-orphan')
+    scores = db.relationship('CustomerScore', uselist=False, backref='customer',
+                            cascade='all, delete-orphan')
     
     @property
     def full_name(self):
@@ -77,13 +127,23 @@ class Customer(db.Model):
         return f"{self.last_name}, {self.first_name}"
     
     def get_total_revenue(self, start_date=None, end_date=None):
-        """Berechne Gesamtumsatz"""
+        """Berechne Gesamtumsatz (inkl. archivierter Bestellungen)"""
         query = self.orders.filter(Order.status != 'Storniert')
         if start_date:
             query = query.filter(Order.order_date >= start_date)
         if end_date:
             query = query.filter(Order.order_date <= end_date)
-        return sum(order.total_amount for order in query.all()) or 0
+        
+        archived = db.session.query(func.sum(ArchivedOrder.total_amount)).filter(
+            ArchivedOrder.customer_id == self.id,
+            ArchivedOrder.status != 'Storniert'
+        )
+        if start_date:
+            archived = archived.filter(ArchivedOrder.order_date >= start_date)
+        if end_date:
+            archived = archived.filter(ArchivedOrder.order_date <= end_date)
+        
+        return (sum(order.total_amount for order in query.all()) or 0) + (archived.scalar() or 0)
     
     def get_last_contact_date(self):
         """Letztes Kontaktdatum"""
@@ -106,6 +166,7 @@ class Product(db.Model):
     category = db.Column(db.String(100))
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     order_items = db.relationship('OrderItem', backref='product', lazy='dynamic')
@@ -128,6 +189,7 @@ class Order(db.Model):
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     notes = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     items = db.relationship('OrderItem', backref='order', lazy='dynamic',
@@ -136,11 +198,20 @@ class Order(db.Model):
     # Composite Index für bessere Performance
     __table_args__ = (
         db.Index('idx_orders_customer_date', 'customer_id', 'order_date'),
+        # Covering Index für Umsatzsummen nach Status (kein Zugriff auf die Tabelle)
+        db.Index('idx_orders_status_amount', 'status', 'total_amount'),
+        # IDs nie wiederverwenden - archivierte Bestellungen behalten ihre ID
+        {'sqlite_autoincrement': True},
     )
     
-    def calculate_total(self):
-        """Berechne Gesamtsumme aus Positionen"""
-        return sum(item.quantity * item.unit_price for item in self.items.all()) or 0
+    def calculate_total(self, items=None):
+        """Berechne Gesamtsumme aus Positionen (nach Rabatt, auf Cent gerundet)
+
+        `items`: bereits geladene Positionen (z.B. im Batch-Job), sonst aus der Datenbank.
+        """
+        if items is None:
+            items = self.items.all()
+        return round(sum(item.line_total for item in items), 2)
     
     def __repr__(self):
         return f'<Order {self.order_number}>'
@@ -152,11 +223,14 @@ class OrderItem(db.Model):
     
     id = db.Column(db.Integer, primary_key=True)
     order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), 
-                        nullable=False)
-    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False)
+                        nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     unit_price = db.Column(db.Numeric(10, 2), nullable=False)
     discount = db.Column(db.Numeric(5, 2), default=0)  # Rabatt in %
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = {'sqlite_autoincrement': True}
     
     @property
     def line_total(self):
@@ -171,6 +245,144 @@ class OrderItem(db.Model):
         return f'<OrderItem {self.id}>'
 
 
+class ArchivedOrder(db.Model):
+    """Archivierte Bestellungen (älter als der Archiv-Horizont oder storniert)"""
+    __tablename__ = 'orders_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)  # ID der Originalbestellung
+    order_number = db.Column(db.String(50), nullable=False, index=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'),
+                           nullable=False)
+    order_date = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(20), nullable=False)
+    total_amount = db.Column(db.Numeric(10, 2), nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    
+    # Relationships
+    items = db.relationship('ArchivedOrderItem', backref='order', lazy='dynamic',
+                           cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('idx_orders_archive_customer_date', 'customer_id', 'order_date'),
+        # Zeitreihen je Tag/Woche (Covering Index, Archiv wächst nur)
+        db.Index('idx_orders_archive_date', 'order_date', 'status', 'total_amount'),
+    )
+    
+    def __repr__(self):
+        return f'<ArchivedOrder {self.order_number}>'
+
+
+class ArchivedOrderItem(db.Model):
+    """Positionen archivierter Bestellungen"""
+    __tablename__ = 'order_items_archive'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders_archive.id', ondelete='CASCADE'),
+                        nullable=False, index=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'), nullable=False, index=True)
+    quantity = db.Column(db.Integer, nullable=False, default=1)
+    unit_price = db.Column(db.Numeric(10, 2), nullable=False)
+    discount = db.Column(db.Numeric(5, 2), default=0)
+    
+    product = db.relationship('Product')
+    
+    line_total = OrderItem.line_total
+    
+    def __repr__(self):
+        return f'<ArchivedOrderItem {self.id}>'
+
+
+class ArchivedOrderSummary(db.Model):
+    """Monatliche Umsatzsummen der archivierten Bestellungen je Kunde und Status"""
+    __tablename__ = 'orders_archive_summary'
+    
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'),
+                           primary_key=True)
+    month = db.Column(db.DateTime, primary_key=True)  # Erster Tag des Monats, 00:00
+    status = db.Column(db.String(20), primary_key=True)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    last_order_date = db.Column(db.DateTime)
+    
+    def __repr__(self):
+        return f'<ArchivedOrderSummary {self.customer_id} {self.month:%Y-%m} {self.status}>'
+
+
+class ProductSalesDaily(db.Model):
+    """Verkaufte Menge und Umsatz je Produkt und Tag (ohne Stornos, inkl. Archiv)
+
+    Gepflegt von services.product_sales bei jedem Flush von Bestellungen und
+    Positionen, neu aufbaubar mit `flask product-sales-rebuild`.
+    """
+    __tablename__ = 'product_sales_daily'
+    
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'),
+                          primary_key=True)
+    day = db.Column(db.Date, primary_key=True)  # Bestelldatum
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # nach Rabatt
+    
+    __table_args__ = (
+        # Zeitraumfilter über alle Produkte
+        db.Index('idx_product_sales_daily_day', 'day', 'product_id'),
+    )
+    
+    def __repr__(self):
+        return f'<ProductSalesDaily {self.product_id} {self.day}>'
+
+
+class SalesCubeMember(db.Model):
+    """Umsatz-Würfel, feinste Ebene: je Monat, Land, Stadt, Kategorie, Status und Kunde
+
+    Zeilen mit Kategorie '*' fassen alle Kategorien zusammen (Bestellungen mit
+    mehreren Kategorien zählen dort einmal). Gepflegt von services.cube.
+    """
+    __tablename__ = 'sales_cube_members'
+    
+    month = db.Column(db.Date, primary_key=True)  # Monatsanfang
+    country = db.Column(db.String(100), primary_key=True)  # '' = ohne Angabe
+    city = db.Column(db.String(100), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    # Ohne Fremdschlüssel: gelöschte Kunden räumt services.cube über die Differenzen ab
+    customer_id = db.Column(db.Integer, primary_key=True)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)  # nach Rabatt
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Distinct-Kunden je Kategorie bzw. über '*'
+        db.Index('idx_sales_cube_members_category', 'category', 'month'),
+    )
+    
+    def __repr__(self):
+        return f'<SalesCubeMember {self.month} {self.city} {self.category} {self.customer_id}>'
+
+
+class SalesCubeCell(db.Model):
+    """Umsatz-Würfel: Summen der Mitglieder ohne Kunde (für Pivot-Abfragen)"""
+    __tablename__ = 'sales_cube_cells'
+    
+    month = db.Column(db.Date, primary_key=True)
+    country = db.Column(db.String(100), primary_key=True)
+    city = db.Column(db.String(100), primary_key=True)
+    category = db.Column(db.String(100), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    revenue = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    quantity = db.Column(db.Integer, nullable=False, default=0)
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        # Slices je Kategorie bzw. über '*' ohne die übrigen Zeilen zu lesen
+        db.Index('idx_sales_cube_cells_category', 'category', 'month'),
+    )
+    
+    def __repr__(self):
+        return f'<SalesCubeCell {self.month} {self.city} {self.category} {self.status}>'
+
+
 class Contact(db.Model):
     """Kontakte/Interaktionen-Modell"""
     __tablename__ = 'contacts'
@@ -187,16 +399,198 @@ class Contact(db.Model):
     duration_minutes = db.Column(db.Integer)  # Dauer in Minuten
     rating = db.Column(db.Integer)  # Bewertung durch Kunde (1-5) - nur für Chef sichtbar
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Composite Index für bessere Performance
     __table_args__ = (
         db.Index('idx_contacts_customer_time', 'customer_id', 'contact_time'),
+        # Kontakte je Mitarbeiter (Profil), auch nach Kanal gefiltert
+        db.Index('idx_contacts_user_channel', 'user_id', 'channel'),
     )
     
     def __repr__(self):
         return f'<Contact {self.channel} - {self.subject}>'
 
 
+class ChangeLog(db.Model):
+    """Änderungsprotokoll für den Change-Feed (/api/v1/changes)
+
+    Eine Zeile je Anlegen/Ändern/Löschen, geschrieben in derselben Transaktion
+    wie die Änderung selbst. Die fortlaufende ID ist der Cursor.
+    """
+    __tablename__ = 'change_log'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    entity = db.Column(db.String(30), nullable=False)  # Ressourcenname der API, z.B. 'orders'
+    entity_id = db.Column(db.Integer, nullable=False)
+    operation = db.Column(db.String(10), nullable=False)  # create, update, delete
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        # Kompaktierung: jüngster Eintrag je Datensatz
+        db.Index('idx_change_log_entity', 'entity', 'entity_id', 'id'),
+        # Datenversion je Tabelle (services.fragment_cache): MAX(id) je Entität
+        db.Index('idx_change_log_entity_id', 'entity', 'id'),
+        # IDs nie wiederverwenden, sonst springen Cursor zurück
+        {'sqlite_autoincrement': True},
+    )
+    
+    def __repr__(self):
+        return f'<ChangeLog {self.id} {self.operation} {self.entity}/{self.entity_id}>'
+
+
+class OutboxEvent(db.Model):
+    """Ausgehende Webhook-Ereignisse (Transactional Outbox)
+
+    Wird in derselben Transaktion wie die Bestellung geschrieben und von
+    `flask outbox-dispatch` je Endpunkt gebündelt zugestellt.
+    """
+    __tablename__ = 'outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    endpoint = db.Column(db.String(500), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)  # z.B. order.created
+    aggregate_id = db.Column(db.Integer, nullable=False)  # Bestell-ID
+    dedup_key = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False)  # JSON
+    status = db.Column(db.Enum('pending', 'sent', 'failed', 'superseded', name='outbox_status'),
+                      nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.String(500))
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+    
+    __table_args__ = (
+        # Dispatcher und Lag-Metriken: offene Ereignisse je Endpunkt, älteste zuerst
+        db.Index('idx_outbox_status_endpoint', 'status', 'endpoint', 'id'),
+        # Deduplizierung offener Ereignisse
+        db.Index('idx_outbox_dedup', 'endpoint', 'dedup_key', 'status'),
+        {'sqlite_autoincrement': True},
+    )
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type} {self.status}>'
+
+
+class Job(db.Model):
+    """Hintergrund-Job (Warteschlange für `flask jobs-worker`)"""
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # registrierte Aufgabe, z.B. reports.export_csv
+    params = db.Column(db.Text, nullable=False, default='{}')  # JSON
+    priority = db.Column(db.Integer, nullable=False, default=0)  # höher = früher
+    status = db.Column(db.Enum('queued', 'running', 'done', 'failed', name='job_status'),
+                      nullable=False, default='queued')
+    dedup_key = db.Column(db.String(200))
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    result = db.Column(db.Text)  # JSON
+    error = db.Column(db.Text)
+    worker = db.Column(db.String(100))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), index=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    
+    user = db.relationship('User')
+    
+    __table_args__ = (
+        # Worker: nächster fälliger Job nach Priorität
+        db.Index('idx_jobs_status_priority', 'status', 'priority', 'id'),
+        db.Index('idx_jobs_dedup', 'dedup_key', 'status'),
+    )
+    
+    @property
+    def result_data(self):
+        return json.loads(self.result) if self.result else None
+    
+    @property
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+    
+    def __repr__(self):
+        return f'<Job {self.id} {self.name} {self.status}>'
+
+
+class CustomerScore(db.Model):
+    """Vorberechnete Kundenkennzahlen (Job customers.compute_scores)"""
+    __tablename__ = 'customer_scores'
+    
+    # Nächste Aktion -> Anzeigetext
+    ACTIONS = {
+        'follow_up': 'Offene Bestellungen nachfassen',
+        'reactivate': 'Reaktivieren',
+        'reward': 'Belohnen',
+        'upsell': 'Upselling anbieten',
+    }
+    
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'),
+                           primary_key=True)
+    total_revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # ohne Stornos, inkl. Archiv
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    open_orders = db.Column(db.Integer, nullable=False, default=0)
+    last_order_date = db.Column(db.DateTime)
+    score = db.Column(db.Integer, nullable=False, default=0)  # 0-100: Umsatz 40 / Frequenz 30 / Aktualität 30
+    health_score = db.Column(db.Integer)  # 0-100, None ohne Bestellungen
+    segment = db.Column(db.String(20))  # RFM: Champions, Loyal, Potential, At Risk, Lost (oder keins)
+    at_risk = db.Column(db.Boolean, nullable=False, default=False)
+    next_action = db.Column(db.String(20))  # Schlüssel aus ACTIONS
+    computed_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        # Dashboard (Top-Kunden, gefährdete Kunden, Segmente) und gefilterte Kundenliste
+        db.Index('idx_customer_scores_revenue', 'total_revenue'),
+        db.Index('idx_customer_scores_risk', 'at_risk', 'total_revenue'),
+        db.Index('idx_customer_scores_segment', 'segment', 'total_revenue'),
+    )
+    
+    @property
+    def days_inactive(self):
+        """Tage seit der letzten Bestellung (tagesaktuell, nicht Stand der Berechnung)"""
+        if self.last_order_date is None:
+            return None
+        return (datetime.now() - self.last_order_date).days
+    
+    @property
+    def next_action_label(self):
+        return self.ACTIONS.get(self.next_action)
+    
+    def __repr__(self):
+        return f'<CustomerScore {self.customer_id} {self.score} {self.segment}>'
+
+
+class RevenueForecast(db.Model):
+    """Umsatzprognose je Kunde und Monat (Job revenue.forecast), ohne Kunde = gesamt"""
+    __tablename__ = 'revenue_forecasts'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    customer_id = db.Column(db.Integer, db.ForeignKey('customers.id', ondelete='CASCADE'))  # None = alle Kunden
+    month = db.Column(db.Date, nullable=False)  # Monatsanfang
+    revenue = db.Column(db.Numeric(12, 2), nullable=False, default=0)  # ohne Stornos
+    computed_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    __table_args__ = (
+        db.Index('idx_revenue_forecasts_customer', 'customer_id', 'month'),
+    )
+    
+    def __repr__(self):
+        return f'<RevenueForecast {self.customer_id} {self.month} {self.revenue}>'
+
+
+class ReplicaHeartbeat(db.Model):
+    """Replikationsmarke: `flask replica-heartbeat` schreibt beat_at regelmäßig auf der Primär-DB"""
+    __tablename__ = 'replica_heartbeat'
+    
+    id = db.Column(db.Integer, primary_key=True)  # immer 1
+    beat_at = db.Column(db.DateTime, nullable=False)
+    
+    def __repr__(self):
+        return f'<ReplicaHeartbeat {self.beat_at}>'
+
+
 # Hilfsfunktion für Datenbankinitialisierung
 def init_db(app):
     """Initialisiere Datenbank"""
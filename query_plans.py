@@ -0,0 +1,213 @@
+"""
+Query-Plan Regression Suite
+Ruft die heißen Endpunkte der Blueprints über den Flask-Testclient auf,
+zeichnet alle dabei ausgeführten SELECTs auf und prüft sie mit
+EXPLAIN QUERY PLAN (SQLite) bzw. EXPLAIN (PostgreSQL) auf Full Table Scans.
+
+Aufruf (auf einer befüllten Datenbank, z.B. nach `python seed.py`):
+    python query_plans.py            # Bericht + Exit-Code 1 bei Verstößen
+    python query_plans.py --verbose  # zusätzlich alle Pläne ausgeben
+"""
+import argparse
+import re
+import sys
+import warnings
+
+from sqlalchemy import event
+
+from app import create_app
+from models import db, User, Customer, Order, Contact
+
+
+# Tabellen, die in Produktion groß werden - ein Full Scan ist hier ein Fehler
+LARGE_TABLES = {'customers', 'orders', 'order_items', 'contacts'}
+
+# Bewusst akzeptierte Full Scans je Endpunkt (Tabelle -> Begründung)
+ALLOWED_SCANS = {
+    'main.search': {
+        'customers': "ilike '%q%' kann keinen B-Tree-Index nutzen",
+        'orders': "ilike '%q%' kann keinen B-Tree-Index nutzen",
+        'contacts': "ilike '%q%' kann keinen B-Tree-Index nutzen",
+    },
+    'customers.list?q': {
+        'customers': "ilike '%q%' kann keinen B-Tree-Index nutzen",
+    },
+    'orders.list?q': {
+        'orders': "ilike '%q%' kann keinen B-Tree-Index nutzen",
+    },
+    'contacts.list?customer': {
+        'customers': "ilike '%q%' kann keinen B-Tree-Index nutzen",
+    },
+    'main.index': {
+        'customers': 'Lifecycle-Zählung über alle Kunden (Health/RFM sind vorberechnet)',
+        'orders': 'Umsatz-Rollup über Hot-Tabelle + Archiv-Summen, Hot-Tabelle durch Archivierung begrenzt',
+    },
+    'reports.index': {
+        'customers': 'Top-10-Ranking aggregiert über alle Kunden',
+        'orders': 'Umsatz-Rollup über Hot-Tabelle + Archiv-Summen, Hot-Tabelle durch Archivierung begrenzt',
+    },
+    'reports.customers': {
+        'customers': 'Rankings und Kunden ohne Bestellungen über alle Kunden',
+        'orders': 'Umsatz-Rollup über Hot-Tabelle + Archiv-Summen, Hot-Tabelle durch Archivierung begrenzt',
+    },
+    'reports.export_customers_csv': {
+        'customers': 'Vollständiger Export',
+    },
+}
+
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: AS \w+)?$')
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def hot_endpoints():
+    """(Name, URL) der zu prüfenden Endpunkte - IDs aus der befüllten DB"""
+    customer = Customer.query.order_by(Customer.id).first()
+    order = Order.query.order_by(Order.id).first()
+    contact = Contact.query.order_by(Contact.id).first()
+
+    if customer is None or order is None or contact is None:
+        raise SystemExit('Datenbank ist leer - bitte zuerst `python seed.py` ausführen.')
+
+    term = customer.last_name[:3]
+    return [
+        ('main.index', '/'),
+        ('main.search', f'/search?q={term}'),
+        ('customers.list', '/customers/'),
+        ('customers.list?q', f'/customers/?q={term}'),
+        ('customers.list?segment', '/customers/?segment=Champions'),
+        ('customers.list?at_risk', '/customers/?at_risk=1'),
+        ('customers.detail', f'/customers/{customer.id}'),
+        ('orders.list', '/orders/'),
+        ('orders.list?q', f'/orders/?q={term}'),
+        ('orders.detail', f'/orders/{order.id}'),
+        ('contacts.list', '/contacts/'),
+        ('contacts.list?customer', f'/contacts/?customer={term}'),
+        ('contacts.detail', f'/contacts/{contact.id}'),
+        ('auth.profile', '/auth/profile'),
+        ('reports.index', '/reports/'),
+        ('reports.customers', '/reports/customers'),
+        ('reports.products', '/reports/products'),
+        ('reports.cohorts', '/reports/cohorts'),
+        ('reports.cohorts_json', '/reports/cohorts.json'),
+        ('reports.timeseries_json', '/reports/timeseries/revenue?granularity=day'),
+        ('reports.timeseries_json?month', '/reports/timeseries/orders?granularity=month'),
+        ('reports.timeseries_json?customers', '/reports/timeseries/customers?granularity=week'),
+        ('reports.timeseries_json?contacts', '/reports/timeseries/contacts?granularity=quarter'),
+        ('reports.cube_pivot', '/reports/cube?by=city,category,month'),
+        ('reports.cube_pivot?filter', '/reports/cube?by=quarter&status=Bezahlt&measures=customers'),
+        ('reports.forecast_json', '/reports/forecast'),
+        ('reports.forecast_json?customer', '/reports/forecast/1'),
+        ('reports.export_customers_csv', '/reports/export/customers_csv'),
+        ('reports.export_orders_csv', '/reports/export/orders_csv'),
+        ('reports.export_contacts_csv', '/reports/export/contacts_csv'),
+        ('api.list_resource', '/api/v1/orders?limit=100&include=customer,items'),
+        ('api.list_resource?ids', '/api/v1/customers?ids=1,2,3&include=orders,contacts'),
+        ('api.changes', '/api/v1/changes?since=0&entity=orders,contacts'),
+    ]
+
+
+def capture_statements(app, client, url):
+    """Führe einen Request aus und liefere alle SELECT-Statements mit Parametern"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        response = client.get(url)
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return response.status_code, statements
+
+
+def full_scans(statement, parameters):
+    """Liefere (Tabellen mit Full Scan, Plan-Zeilen) für ein Statement"""
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).all()
+        plan = [row[-1] for row in rows]
+        tables = {m.group(1) for m in map(SQLITE_SCAN.match, plan) if m}
+    else:
+        rows = connection.exec_driver_sql('EXPLAIN ' + statement, parameters).all()
+        plan = [row[0] for row in rows]
+        tables = {m.group(1) for line in plan for m in POSTGRES_SCAN.finditer(line)}
+
+    return tables & LARGE_TABLES, plan
+
+
+def run(verbose=False):
+    """Prüfe alle Endpunkte, liefere die Anzahl der Verstöße"""
+    app = create_app()
+    # Fehlerhafte Views als HTTP 500 melden (und als Verstoß zählen) statt
+    # abzubrechen - die Abfragen vor dem Fehler werden trotzdem geprüft
+    app.config['PROPAGATE_EXCEPTIONS'] = False
+    violations = 0
+
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.echo = False
+
+        user = User.query.filter(User.role.in_(['Admin', 'Chef'])).first()
+        if user is None:
+            raise SystemExit('Kein Admin/Chef-Benutzer vorhanden.')
+
+        endpoints = hot_endpoints()
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['_user_id'] = str(user.get_id())
+            session['_fresh'] = True
+
+        for name, url in endpoints:
+            status, statements = capture_statements(app, client, url)
+            allowed = ALLOWED_SCANS.get(name, {})
+            seen = set()
+            print(f'{name:32} {url:40} HTTP {status}, {len(statements)} SELECTs')
+            # Fehlerhafte Endpunkte zählen als Verstoß - sonst bestehen sie mit halbem Plan
+            if not (200 <= status < 300 or status == 304):
+                violations += 1
+                print(f'    FEHLER: HTTP {status}')
+
+            for statement, parameters in statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+
+                tables, plan = full_scans(statement, parameters)
+                for table in sorted(tables):
+                    if table in allowed:
+                        if verbose:
+                            print(f'    erlaubt: SCAN {table} ({allowed[table]})')
+                        continue
+                    violations += 1
+                    print(f'    FEHLER: Full Scan auf {table}')
+                    print('      ' + ' '.join(statement.split())[:300])
+
+                if verbose:
+                    for line in plan:
+                        print(f'      | {line}')
+
+        db.session.rollback()
+
+    return violations
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='EXPLAIN-Prüfung der heißen Abfragen')
+    parser.add_argument('--verbose', action='store_true', help='Alle Pläne ausgeben')
+    args = parser.parse_args()
+
+    warnings.simplefilter('ignore')
+    count = run(verbose=args.verbose)
+
+    if count:
+        print(f'\n❌ {count} Verstöße (unerlaubte Full Scans oder HTTP-Fehler) gefunden')
+        sys.exit(1)
+    print('\n✅ Keine unerlaubten Full Scans, keine HTTP-Fehler')
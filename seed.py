@@ -1,13 +1,91 @@
 """
 Seeder Script - Generiert Beispieldaten für das CRM
 Erstellt: >10 Kunden, >50 Bestellungen, >50 Kontakte
+
+Generator-Modus für Lasttests (deterministisch, Bulk-Inserts in Chunks):
+    python seed.py --scale 1000000 --orders-per-customer 10 --workers 4
+    python seed.py --scale 50000 --append --seed 7
 """
 from datetime import datetime, timedelta
+import argparse
 import random
+import time
+import unicodedata
+from multiprocessing import Pool
 from faker import Faker
 
 from app import create_app
-from models import db, User, Customer, Product, Order, OrderItem, Contact
+from models import db, User, Customer, Product, Order, OrderItem, ArchivedOrder, Contact
+from services import product_sales, cube
+
+
+PRODUCTS_DATA = [
+    ('PROD-001', 'Software-Lizenz Enterprise', 499.00, 'Software'),
+    ('PROD-002', 'Consulting Stunde', 120.00, 'Dienstleistung'),
+    ('PROD-003', 'Server-Hosting Monat', 89.00, 'Hosting'),
+    ('PROD-004', 'Website-Design Paket', 1500.00, 'Webdesign'),
+    ('PROD-005', 'SEO Optimierung', 750.00, 'Marketing'),
+    ('PROD-006', 'Hardware Workstation', 2500.00, 'Hardware'),
+    ('PROD-007', 'Wartungsvertrag Jahr', 1200.00, 'Wartung'),
+    ('PROD-008', 'Schulung Tag', 800.00, 'Training'),
+    ('PROD-009', 'Cloud Storage 100GB', 29.00, 'Cloud'),
+    ('PROD-010', 'Backup-Service Monat', 45.00, 'Backup'),
+]
+
+CITIES = ['Wien', 'Graz', 'Linz', 'Salzburg', 'Innsbruck', 'Klagenfurt', 'Wels', 'St. Pölten']
+CHANNELS = ['Telefon', 'E-Mail', 'Meeting', 'Chat']
+SUBJECTS = [
+    'Angebotsnachfrage',
+    'Rückfrage zur Rechnung',
+    'Technischer Support',
+    'Terminvereinbarung',
+    'Projektbesprechung',
+    'Feedback zur Dienstleistung',
+    'Verlängerung Vertrag',
+    'Liefertermin',
+    'Produktinformation',
+    'Reklamation'
+]
+
+
+def create_users():
+    """Standard-Benutzer anlegen"""
+    admin = User(name='Admin', email='admin@crm.local', role='Admin')
+    admin.set_password('admin123')
+    db.session.add(admin)
+    
+    chef = User(name='Mag. Sarah König', email='koenig@crm.local', role='Chef')
+    chef.set_password('chef123')
+    db.session.add(chef)
+    
+    mitarbeiter1 = User(name='Lukas Graf', email='graf@crm.local', role='Mitarbeiter')
+    mitarbeiter1.set_password('user123')
+    db.session.add(mitarbeiter1)
+    
+    mitarbeiter2 = User(name='Anna Weber', email='weber@crm.local', role='Mitarbeiter')
+    mitarbeiter2.set_password('user123')
+    db.session.add(mitarbeiter2)
+    
+    db.session.commit()
+    return [admin, chef, mitarbeiter1, mitarbeiter2]
+
+
+def create_products():
+    """Produktkatalog anlegen"""
+    products = []
+    for sku, name, price, category in PRODUCTS_DATA:
+        product = Product(
+            sku=sku,
+            name=name,
+            base_price=price,
+            category=category,
+            is_active=True
+        )
+        db.session.add(product)
+        products.append(product)
+    
+    db.session.commit()
+    return products
 
 
 def seed_database():
@@ -26,63 +104,19 @@ def seed_database():
         
         # 1. Benutzer erstellen
         print("   Erstelle Benutzer...")
-        admin = User(name='Admin', email='admin@crm.local', role='Admin')
-        admin.set_password('admin123')
-        db.session.add(admin)
-        
-        chef = User(name='Mag. Sarah König', email='koenig@crm.local', role='Chef')
-        chef.set_password('chef123')
-        db.session.add(chef)
-        
-        mitarbeiter1 = User(name='Lukas Graf', email='graf@crm.local', role='Mitarbeiter')
-        mitarbeiter1.set_password('user123')
-        db.session.add(mitarbeiter1)
-        
-        mitarbeiter2 = User(name='Anna Weber', email='weber@crm.local', role='Mitarbeiter')
-        mitarbeiter2.set_password('user123')
-        db.session.add(mitarbeiter2)
-        
-        db.session.commit()
-        users = [admin, chef, mitarbeiter1, mitarbeiter2]
+        users = create_users()
         print(f"   ✓ {len(users)} Benutzer erstellt")
         
         # 2. Produkte erstellen
         print("   Erstelle Produkte...")
-        products_data = [
-            ('PROD-001', 'Software-Lizenz Enterprise', 499.00, 'Software'),
-            ('PROD-002', 'Consulting Stunde', 120.00, 'Dienstleistung'),
-            ('PROD-003', 'Server-Hosting Monat', 89.00, 'Hosting'),
-            ('PROD-004', 'Website-Design Paket', 1500.00, 'Webdesign'),
-            ('PROD-005', 'SEO Optimierung', 750.00, 'Marketing'),
-            ('PROD-006', 'Hardware Workstation', 2500.00, 'Hardware'),
-            ('PROD-007', 'Wartungsvertrag Jahr', 1200.00, 'Wartung'),
-            ('PROD-008', 'Schulung Tag', 800.00, 'Training'),
-            ('PROD-009', 'Cloud Storage 100GB', 29.00, 'Cloud'),
-            ('PROD-010', 'Backup-Service Monat', 45.00, 'Backup'),
-        ]
-        
-        products = []
-        for sku, name, price, category in products_data:
-            product = Product(
-                sku=sku,
-                name=name,
-                base_price=price,
-                category=category,
-                is_active=True
-            )
-            db.session.add(product)
-            products.append(product)
-        
-        db.session.commit()
+        products = create_products()
         print(f"   ✓ {len(products)} Produkte erstellt")
         
         # 3. Kunden erstellen (15 Kunden)
         print("   Erstelle Kunden...")
         customers = []
-        cities = ['Wien', 'Graz', 'Linz', 'Salzburg', 'Innsbruck', 'Klagenfurt', 'Wels', 'St. Pölten']
-        
         for i in range(15):
-            city = random.choice(cities)
+            city = random.choice(CITIES)
             customer = Customer(
                 first_name=fake.first_name(),
                 last_name=fake.last_name(),
@@ -153,20 +187,6 @@ def seed_database():
         
         # 5. Kontakte erstellen (70 Kontakte)
         print("   Erstelle Kontakte...")
-        channels = ['Telefon', 'E-Mail', 'Meeting', 'Chat']
-        subjects = [
-            'Angebotsnachfrage',
-            'Rückfrage zur Rechnung',
-            'Technischer Support',
-            'Terminvereinbarung',
-            'Projektbesprechung',
-            'Feedback zur Dienstleistung',
-            'Verlängerung Vertrag',
-            'Liefertermin',
-            'Produktinformation',
-            'Reklamation'
-        ]
-        
         contacts = []
         for i in range(70):
             customer = random.choice(customers)
@@ -176,8 +196,8 @@ def seed_database():
             contact = Contact(
                 customer_id=customer.id,
                 user_id=user.id,
-                channel=random.choice(channels),
-                subject=random.choice(subjects),
+                channel=random.choice(CHANNELS),
+                subject=random.choice(SUBJECTS),
                 notes=fake.text(max_nb_chars=150) if random.random() > 0.3 else None,
                 contact_time=contact_time,
                 duration_minutes=random.randint(5, 60) if random.random() > 0.5 else None,
@@ -204,13 +224,337 @@ def seed_database():
         print(f"   Mitarbeiter: weber@crm.local / user123")
 
 
+# ---------------------------------------------------------------------------
+# Generator-Modus für Lasttests
+# ---------------------------------------------------------------------------
+
+# Verteilungen - angelehnt an typische B2B-Bestandsdaten
+ITEMS_PER_ORDER_WEIGHTS = [35, 30, 20, 10, 5]          # 1-5 Positionen
+PRODUCT_WEIGHTS = [30, 20, 15, 10, 8, 6, 4, 3, 2, 2]   # Long Tail im Katalog
+DISCOUNTS = [0, 0, 0, 0, 0, 0, 5, 5, 10, 15]
+LEAD_SHARE = 20                                        # % Kunden ohne Bestellung
+POOL_SIZE = 500                                        # Faker-Werte je Pool
+RNG_BLOCK = 1000                                       # Zeilen je RNG-Seed
+
+# Pro Worker-Prozess gesetzt (siehe _init_worker)
+_pools = None
+
+
+def build_pools(seed):
+    """Namens-, Firmen- und Adresspools einmalig mit Faker erzeugen
+
+    Faker pro Zeile ist für Millionen Datensätze zu langsam; die Zeilen
+    wählen deterministisch aus diesen Pools.
+    """
+    fake = Faker('de_AT')
+    fake.seed_instance(seed)
+    return {
+        'first_names': [fake.first_name() for _ in range(POOL_SIZE)],
+        'last_names': [fake.last_name() for _ in range(POOL_SIZE)],
+        'companies': [fake.company() for _ in range(POOL_SIZE)],
+        'streets': [fake.street_address() for _ in range(POOL_SIZE)],
+        'postcodes': [fake.postcode() for _ in range(POOL_SIZE)],
+        'phones': [fake.phone_number() for _ in range(POOL_SIZE)],
+        'texts': [fake.text(max_nb_chars=150) for _ in range(50)],
+    }
+
+
+def _init_worker(pools):
+    global _pools
+    _pools = pools
+
+
+def _slug(value):
+    """ASCII-Kleinbuchstaben für E-Mail-Adressen"""
+    value = unicodedata.normalize('NFKD', value).encode('ascii', 'ignore').decode()
+    return ''.join(c for c in value.lower() if c.isalnum())
+
+
+def customer_created_at(index, plan):
+    """Anlagedatum des n-ten generierten Kunden (0-basiert)
+
+    Deterministisch aus dem Index, damit Bestellungen und Kontakte ohne
+    Datenbankabfrage nach dem Anlagedatum ihres Kunden liegen.
+    Wachstum: neuere Kunden sind häufiger als alte.
+    """
+    fraction = index / plan['customers']
+    days_ago = plan['years'] * 365 * (1 - fraction) ** 2
+    return plan['until'] - timedelta(days=days_ago, seconds=(index * 7919) % 86400)
+
+
+def _pick_customer(rng, plan):
+    """Schiefe Verteilung: ältere Kunden bestellen und kommunizieren öfter"""
+    return int(plan['customers'] * rng.random() ** 2)
+
+
+def _is_lead(index):
+    """Fester Anteil der Kunden bestellt nie (Leads/Interessenten)"""
+    return (index * 7919) % 100 < LEAD_SHARE
+
+
+def _event_date(rng, index, plan):
+    """Zeitpunkt zwischen Kundenanlage und Stichtag, gehäuft in jüngerer Zeit"""
+    start = customer_created_at(index, plan)
+    return start + (plan['until'] - start) * rng.random() ** 0.7
+
+
+def _block_rngs(plan, table, start, stop):
+    """(Index, RNG) - neuer Seed je RNG_BLOCK Zeilen
+
+    Damit hängen die Daten nur von Seed und Mengen ab, nicht von Chunk-Größe
+    oder Worker-Anzahl. String-Seeds sind über Prozesse hinweg stabil.
+    """
+    rng = None
+    for index in range(start, stop):
+        if rng is None or index % RNG_BLOCK == 0:
+            rng = random.Random(f"{plan['seed']}:{table}:{index - index % RNG_BLOCK}")
+        yield index, rng
+
+
+def generate_customers(plan, start, stop):
+    """Kundenzeilen für die Indizes [start, stop)"""
+    pools = _pools
+    rows = []
+    for index, rng in _block_rngs(plan, 'customers', start, stop):
+        first = rng.choice(pools['first_names'])
+        last = rng.choice(pools['last_names'])
+        customer_id = plan['customer_base'] + index
+        created_at = customer_created_at(index, plan)
+        rows.append({
+            'id': customer_id,
+            'first_name': first,
+            'last_name': last,
+            'email': f'{_slug(first)}.{_slug(last)}.{customer_id}@example.at',
+            'phone': rng.choice(pools['phones']),
+            'company': rng.choice(pools['companies']) if rng.random() > 0.3 else None,
+            'address': rng.choice(pools['streets']),
+            'city': rng.choice(CITIES),
+            'postal_code': rng.choice(pools['postcodes']),
+            'country': 'Österreich',
+            'notes': rng.choice(pools['texts']) if rng.random() > 0.8 else None,
+            'rating': rng.randint(1, 5) if rng.random() > 0.3 else None,
+            'created_at': created_at,
+            'updated_at': created_at,
+        })
+    return rows
+
+
+def generate_orders(plan, start, stop):
+    """Bestellungen und Positionen für die Indizes [start, stop)"""
+    products = plan['products']
+    orders, items = [], []
+    for index, rng in _block_rngs(plan, 'orders', start, stop):
+        order_id = plan['order_base'] + index
+        customer_index = _pick_customer(rng, plan)
+        # Leads überspringen - höchstens ein Durchlauf (generate_dataset prüft vorab)
+        for _ in range(plan['customers']):
+            if not _is_lead(customer_index):
+                break
+            customer_index = (customer_index + 1) % plan['customers']
+        else:
+            raise ValueError('Kein Kunde ohne Lead-Status für Bestellungen')
+        order_date = _event_date(rng, customer_index, plan)
+
+        # Jüngere Bestellungen sind noch häufiger offen
+        roll = rng.random()
+        if (plan['until'] - order_date).days < 30:
+            status = 'Offen' if roll < 0.5 else ('Storniert' if roll > 0.95 else 'Bezahlt')
+        else:
+            status = 'Storniert' if roll < 0.08 else ('Offen' if roll < 0.12 else 'Bezahlt')
+
+        num_items = rng.choices(range(1, 6), weights=ITEMS_PER_ORDER_WEIGHTS)[0]
+        total = 0
+        for product_id, price in rng.choices(products, weights=PRODUCT_WEIGHTS[:len(products)],
+                                             k=num_items):
+            quantity = min(int(rng.expovariate(0.4)) + 1, 20)
+            discount = rng.choice(DISCOUNTS)
+            total += quantity * price * (100 - discount) / 100
+            items.append({
+                'order_id': order_id,
+                'product_id': product_id,
+                'quantity': quantity,
+                'unit_price': price,
+                'discount': discount,
+                'updated_at': order_date,
+            })
+
+        orders.append({
+            'id': order_id,
+            'order_number': f'G-{order_id:09d}',
+            'customer_id': plan['customer_base'] + customer_index,
+            'order_date': order_date,
+            'status': status,
+            'total_amount': round(total, 2),
+            'notes': None,
+            'created_at': order_date,
+            'updated_at': order_date,
+        })
+    return orders, items
+
+
+def generate_contacts(plan, start, stop):
+    """Kontaktzeilen für die Indizes [start, stop)"""
+    pools = _pools
+    rows = []
+    for index, rng in _block_rngs(plan, 'contacts', start, stop):
+        customer_index = _pick_customer(rng, plan)
+        contact_time = _event_date(rng, customer_index, plan)
+        rows.append({
+            'customer_id': plan['customer_base'] + customer_index,
+            'user_id': rng.choice(plan['users']),
+            'channel': rng.choices(CHANNELS, weights=[35, 40, 15, 10])[0],
+            'subject': rng.choice(SUBJECTS),
+            'notes': rng.choice(pools['texts']) if rng.random() > 0.3 else None,
+            'contact_time': contact_time,
+            'duration_minutes': rng.randint(5, 60) if rng.random() > 0.5 else None,
+            'rating': rng.randint(1, 5) if rng.random() > 0.7 else None,
+            'created_at': contact_time,
+            'updated_at': contact_time,
+        })
+    return rows
+
+
+def _generate(task):
+    """Worker-Einstieg: (Tabelle, Plan, Start, Ende) -> Zeilen"""
+    table, plan, start, stop = task
+    generator = {'customers': generate_customers, 'orders': generate_orders,
+                 'contacts': generate_contacts}[table]
+    return table, generator(plan, start, stop)
+
+
+def _insert(table, rows):
+    if table == 'orders':
+        orders, items = rows
+        db.session.execute(Order.__table__.insert(), orders)
+        if items:
+            db.session.execute(OrderItem.__table__.insert(), items)
+        return len(orders)
+    db.session.execute({'customers': Customer, 'contacts': Contact}[table].__table__.insert(), rows)
+    return len(rows)
+
+
+def generate_dataset(scale, orders_per_customer=10, contacts_per_customer=3, seed=42,
+                     chunk_size=10000, workers=1, append=False, years=5, until=None,
+                     database_url=None):
+    """Synthetischen Datenbestand erzeugen (Generator-Modus)
+
+    `scale` ist die Anzahl der Kunden; Bestellungen und Kontakte skalieren
+    mit. Gleicher Seed + gleiche Parameter ergeben identische Daten. Mit
+    `append` werden Daten an einen bestehenden Bestand angehängt, sonst wird
+    die Datenbank neu angelegt. `database_url` überschreibt DATABASE_URL.
+    """
+    # Vor dem Löschen prüfen; _is_lead() wiederholt sich alle 100 Indizes
+    if int(scale * orders_per_customer) and all(_is_lead(index) for index in range(min(scale, 100))):
+        raise ValueError(f'Bei scale={scale} sind alle Kunden Leads - für Bestellungen mindestens 3 Kunden')
+    
+    overrides = {'SQLALCHEMY_ECHO': False}
+    if database_url:
+        overrides['SQLALCHEMY_DATABASE_URI'] = database_url
+    app = create_app('development', **overrides)
+    
+    with app.app_context():
+        
+        if not append:
+            print("   Lösche alte Daten...")
+            db.drop_all()
+            db.create_all()
+            create_users()
+            create_products()
+        elif not User.query.first() or not Product.query.first():
+            raise SystemExit('❌ --append braucht bestehende Benutzer und Produkte (zuerst ohne --append ausführen)')
+        
+        if db.engine.dialect.name == 'sqlite':
+            # Nur für den Ladevorgang: weniger fsyncs
+            db.session.execute(db.text('PRAGMA synchronous = OFF'))
+        
+        max_id = lambda model: db.session.query(db.func.max(model.id)).scalar() or 0
+        plan = {
+            'seed': seed,
+            'years': years,
+            'until': until or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0),
+            'customers': scale,
+            'customer_base': max_id(Customer) + 1,
+            'order_base': max(max_id(Order), db.session.query(db.func.max(ArchivedOrder.id)).scalar() or 0) + 1,
+            'products': [(p.id, float(p.base_price)) for p in Product.query.order_by(Product.id)
+                         if p.is_active],
+            'users': [u.id for u in User.query.filter(User.role != 'Admin').order_by(User.id)],
+        }
+        if not plan['users']:
+            plan['users'] = [u.id for u in User.query.order_by(User.id)]
+        
+        counts = {
+            'customers': scale,
+            'orders': int(scale * orders_per_customer),
+            'contacts': int(scale * contacts_per_customer),
+        }
+        chunk_size = max(RNG_BLOCK, chunk_size - chunk_size % RNG_BLOCK)
+        tasks = [(table, plan, start, min(start + chunk_size, total))
+                 for table, total in counts.items()
+                 for start in range(0, total, chunk_size)]
+        
+        print(f"🌱 Generiere {counts['customers']:,} Kunden, {counts['orders']:,} Bestellungen, "
+              f"{counts['contacts']:,} Kontakte (Seed {seed}, {workers} Worker)...")
+        
+        pools = build_pools(seed)
+        started = time.perf_counter()
+        inserted = dict.fromkeys(counts, 0)
+        
+        if workers > 1:
+            pool = Pool(workers, initializer=_init_worker, initargs=(pools,))
+            # imap hält die Reihenfolge ein - Kunden stehen vor ihren Bestellungen
+            results = pool.imap(_generate, tasks)
+        else:
+            pool = None
+            _init_worker(pools)
+            results = map(_generate, tasks)
+        
+        try:
+            for table, rows in results:
+                inserted[table] += _insert(table, rows)
+                db.session.commit()
+                elapsed = time.perf_counter() - started
+                print(f"   {table:10} {inserted[table]:>12,} / {counts[table]:,}  ({elapsed:.1f}s)")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+        
+        # Bulk-Inserts umgehen die Flush-Events -> Produktumsätze und Würfel neu aufbauen
+        product_sales.rebuild()
+        cube.rebuild()
+        db.session.commit()
+        
+        elapsed = time.perf_counter() - started
+        total = sum(inserted.values())
+        print(f"\n✅ {total:,} Datensätze in {elapsed:.1f}s ({total / max(elapsed, 0.001):,.0f}/s)")
+
+
 if __name__ == '__main__':
-    # Faker installieren falls nicht vorhanden
-    try:
-        from faker import Faker
-    except ImportError:
-        print("❌ Faker ist nicht installiert!")
-        print("   Bitte installieren mit: pip install faker")
-        exit(1)
+    parser = argparse.ArgumentParser(description='Beispieldaten bzw. synthetische Lasttest-Daten erzeugen')
+    parser.add_argument('--scale', type=int, help='Generator-Modus: Anzahl Kunden (z.B. 1000000)')
+    parser.add_argument('--orders-per-customer', type=float, default=10, help='Bestellungen je Kunde (Standard 10)')
+    parser.add_argument('--contacts-per-customer', type=float, default=3, help='Kontakte je Kunde (Standard 3)')
+    parser.add_argument('--seed', type=int, default=42, help='Seed für reproduzierbare Daten')
+    parser.add_argument('--chunk-size', type=int, default=10000, help='Zeilen pro Bulk-Insert/Transaktion')
+    parser.add_argument('--workers', type=int, default=1, help='Prozesse für die Datengenerierung')
+    parser.add_argument('--years', type=float, default=5, help='Zeitraum der Historie in Jahren')
+    parser.add_argument('--until', type=lambda v: datetime.strptime(v, '%Y-%m-%d'),
+                        help='Stichtag YYYY-MM-DD (Standard: heute) - für identische Läufe fixieren')
+    parser.add_argument('--append', action='store_true', help='Bestehende Daten behalten und anhängen')
+    args = parser.parse_args()
     
-    seed_database()
+    if args.scale:
+        try:
+            generate_dataset(args.scale,
+                             orders_per_customer=args.orders_per_customer,
+                             contacts_per_customer=args.contacts_per_customer,
+                             seed=args.seed,
+                             chunk_size=args.chunk_size,
+                             workers=args.workers,
+                             append=args.append,
+                             years=args.years,
+                             until=args.until)
+        except ValueError as error:
+            raise SystemExit(f'❌ {error}')
+    else:
+        seed_database()
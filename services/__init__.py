@@ -0,0 +1 @@
+"""Services Package - Hilfsdienste für Datenbank, Caching und Hintergrundverarbeitung"""
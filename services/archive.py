@@ -0,0 +1,175 @@
+"""
+Archivierung alter und stornierter Bestellungen
+Verschiebt Bestellungen samt Positionen batchweise in die Archivtabellen,
+damit `orders` und `order_items` klein bleiben. Umsatz-Rollups bleiben über
+die monatliche Archiv-Zusammenfassung korrekt.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import select, insert, delete, literal, union_all, or_, and_
+
+from models import (db, Order, OrderItem, ArchivedOrder, ArchivedOrderItem,
+                    ArchivedOrderSummary)
+from services import changelog
+
+
+ORDER_COLUMNS = ['id', 'order_number', 'customer_id', 'order_date', 'status',
+                 'total_amount', 'notes', 'created_at']
+ITEM_COLUMNS = ['id', 'order_id', 'product_id', 'quantity', 'unit_price', 'discount']
+
+
+def archive_candidates(now=None, horizon_days=None, cancelled_after_days=None):
+    """Filter für archivierbare Bestellungen
+
+    - abgeschlossene Bestellungen (nicht 'Offen') älter als der Horizont
+    - stornierte Bestellungen nach einer kurzen Schonfrist
+    """
+    now = now or datetime.utcnow()
+    if horizon_days is None:
+        horizon_days = current_app.config['ARCHIVE_HORIZON_DAYS']
+    if cancelled_after_days is None:
+        cancelled_after_days = current_app.config['ARCHIVE_CANCELLED_AFTER_DAYS']
+
+    return or_(
+        and_(Order.status != 'Offen',
+             Order.order_date < now - timedelta(days=horizon_days)),
+        and_(Order.status == 'Storniert',
+             Order.order_date < now - timedelta(days=cancelled_after_days))
+    )
+
+
+def archive_orders(now=None, horizon_days=None, cancelled_after_days=None, batch_size=None):
+    """Verschiebe archivierbare Bestellungen in Batches, liefert die Anzahl"""
+    if batch_size is None:
+        batch_size = current_app.config['ARCHIVE_BATCH_SIZE']
+    criteria = archive_candidates(now, horizon_days, cancelled_after_days)
+    archived = 0
+
+    while True:
+        rows = db.session.execute(
+            select(Order.id, Order.customer_id, Order.order_date, Order.status, Order.total_amount)
+            .where(criteria).order_by(Order.id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+
+        ids = [row.id for row in rows]
+        _move_batch(ids)
+        _add_to_summary(rows)
+        db.session.commit()
+
+        archived += len(ids)
+        current_app.logger.info('Archiviert: %d Bestellungen (gesamt %d)', len(ids), archived)
+
+    return archived
+
+
+def _move_batch(ids):
+    """INSERT ... SELECT in die Archivtabellen, danach aus den Hot-Tabellen löschen"""
+    order_cols = [getattr(Order, name) for name in ORDER_COLUMNS]
+    item_cols = [getattr(OrderItem, name) for name in ITEM_COLUMNS]
+
+    db.session.execute(insert(ArchivedOrder).from_select(
+        ORDER_COLUMNS + ['archived_at'],
+        select(*order_cols, literal(datetime.utcnow())).where(Order.id.in_(ids))
+    ))
+    db.session.execute(insert(ArchivedOrderItem).from_select(
+        ITEM_COLUMNS, select(*item_cols).where(OrderItem.order_id.in_(ids))
+    ))
+    db.session.execute(delete(OrderItem).where(OrderItem.order_id.in_(ids)))
+    db.session.execute(delete(Order).where(Order.id.in_(ids)))
+    # Core-Statements lösen keine ORM-Events aus -> Change-Log selbst schreiben
+    changelog.record('orders', ids, 'delete')
+    changelog.record('archived_orders', ids, 'create')
+
+
+def _add_to_summary(rows):
+    """Monatssummen der verschobenen Bestellungen in die Zusammenfassung addieren"""
+    totals = {}
+    for row in rows:
+        month = row.order_date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        key = (row.customer_id, month, row.status)
+        count, revenue, last = totals.get(key, (0, 0, None))
+        totals[key] = (count + 1, revenue + row.total_amount,
+                       max(last, row.order_date) if last else row.order_date)
+
+    for (customer_id, month, status), (count, revenue, last) in totals.items():
+        summary = db.session.get(ArchivedOrderSummary, (customer_id, month, status))
+        if summary is None:
+            summary = ArchivedOrderSummary(customer_id=customer_id, month=month, status=status,
+                                           order_count=0, revenue=0)
+            db.session.add(summary)
+        summary.order_count += count
+        summary.revenue += revenue
+        summary.last_order_date = max(summary.last_order_date or last, last)
+
+
+def order_rollup():
+    """Hot-Bestellungen und Archiv-Monatssummen als gemeinsame Subquery
+
+    Spalten: customer_id, status, period, order_count, revenue, last_order_date.
+    `period` ist bei Hot-Bestellungen das Bestelldatum, bei Archivzeilen der
+    Monatsanfang - Filter auf Monats- oder Jahresgrenzen sind daher exakt.
+    Zählen über sum(order_count), nicht count().
+    """
+    hot = select(
+        Order.customer_id.label('customer_id'),
+        Order.status.label('status'),
+        Order.order_date.label('period'),
+        literal(1).label('order_count'),
+        Order.total_amount.label('revenue'),
+        Order.order_date.label('last_order_date')
+    )
+    archived = select(
+        ArchivedOrderSummary.customer_id,
+        ArchivedOrderSummary.status,
+        ArchivedOrderSummary.month,
+        ArchivedOrderSummary.order_count,
+        ArchivedOrderSummary.revenue,
+        ArchivedOrderSummary.last_order_date
+    )
+    return union_all(hot, archived).subquery('order_rollup')
+
+
+def order_history():
+    """Hot- und archivierte Bestellungen zeilengenau (für Exporte und Produktberichte)"""
+    hot = select(*[getattr(Order, name).label(name) for name in ORDER_COLUMNS],
+                 literal(False).label('archived'))
+    archived = select(*[getattr(ArchivedOrder, name) for name in ORDER_COLUMNS],
+                      literal(True).label('archived'))
+    return union_all(hot, archived).subquery('order_history')
+
+
+def order_item_history():
+    """Hot- und archivierte Bestellpositionen
+
+    Join mit order_history über order_id genügt: Bestellungen behalten beim
+    Archivieren ihre ID und `orders` vergibt IDs nie neu (sqlite_autoincrement).
+    """
+    hot = select(*[getattr(OrderItem, name).label(name) for name in ITEM_COLUMNS],
+                 literal(False).label('archived'))
+    archived = select(*[getattr(ArchivedOrderItem, name) for name in ITEM_COLUMNS],
+                      literal(True).label('archived'))
+    return union_all(hot, archived).subquery('order_item_history')
+
+
+def init_app(app):
+    app.cli.add_command(archive_orders_command)
+
+
+@click.command('archive-orders')
+@click.option('--horizon-days', type=int, default=None,
+              help='Abgeschlossene Bestellungen älter als N Tage archivieren')
+@click.option('--cancelled-after-days', type=int, default=None,
+              help='Stornierte Bestellungen älter als N Tage archivieren')
+@click.option('--batch-size', type=int, default=None, help='Bestellungen pro Transaktion')
+@with_appcontext
+def archive_orders_command(horizon_days, cancelled_after_days, batch_size):
+    """Alte und stornierte Bestellungen ins Archiv verschieben"""
+    count = archive_orders(horizon_days=horizon_days,
+                           cancelled_after_days=cancelled_after_days,
+                           batch_size=batch_size)
+    click.echo(f'{count} Bestellungen archiviert.')
@@ -0,0 +1,155 @@
+"""
+Asset-Pipeline
+`flask assets-build` kopiert alle Dateien aus static/ mit Inhalts-Hash im
+Namen nach static/dist/ (z.B. css/style.3f2a9c1b0d.css), legt gzip- und -
+falls das Paket `brotli` installiert ist - Brotli-Varianten daneben und
+schreibt ein Manifest. `asset_url()` in Templates löst Namen über das
+Manifest auf; /assets/ liefert die vorkomprimierte Variante passend zu
+Accept-Encoding mit `Cache-Control: immutable` aus.
+
+Ohne Manifest (oder mit ASSETS_FINGERPRINT = False, z.B. in der Entwicklung)
+verweist `asset_url()` auf die normale static-Route.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+import click
+from flask import current_app, request, send_from_directory, url_for
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:  # optional
+    brotli = None
+
+MANIFEST = 'manifest.json'
+COMPRESS_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+ONE_YEAR = 365 * 24 * 3600
+
+
+def dist_dir(app):
+    return os.path.join(app.static_folder, app.config['ASSETS_DIST'])
+
+
+def build_assets(app, clean=False):
+    """Assets fingerprinten und vorkomprimieren, liefert das Manifest"""
+    target = dist_dir(app)
+    manifest = {}
+
+    for root, dirs, files in os.walk(app.static_folder):
+        if os.path.abspath(root).startswith(os.path.abspath(target)):
+            continue
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            logical = os.path.relpath(source, app.static_folder).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                data = f.read()
+
+            stem, ext = os.path.splitext(logical)
+            hashed = f'{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}'
+            manifest[logical] = hashed
+
+            path = os.path.join(target, hashed)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _write(path, data)
+            if ext in COMPRESS_EXTENSIONS:
+                _write_compressed(path, data)
+
+    os.makedirs(target, exist_ok=True)
+    with open(os.path.join(target, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if clean:
+        _remove_stale(target, manifest)
+    return manifest
+
+
+def _write(path, data):
+    # Gleicher Hash = gleicher Inhalt, vorhandene Dateien nicht neu schreiben
+    if not os.path.exists(path):
+        with open(path, 'wb') as f:
+            f.write(data)
+
+
+def _write_compressed(path, data):
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data, quality=11)
+    for suffix, compressed in variants.items():
+        # Nur ablegen, wenn es tatsächlich kleiner ist
+        if len(compressed) < len(data):
+            _write(path + suffix, compressed)
+
+
+def _remove_stale(target, manifest):
+    """Dateien früherer Builds entfernen, die nicht mehr im Manifest stehen"""
+    keep = {MANIFEST}
+    for hashed in manifest.values():
+        keep.update({hashed, hashed + '.gz', hashed + '.br'})
+    for root, dirs, files in os.walk(target):
+        for name in files:
+            relative = os.path.relpath(os.path.join(root, name), target).replace(os.sep, '/')
+            if relative not in keep:
+                os.remove(os.path.join(root, name))
+
+
+def load_manifest(app):
+    path = os.path.join(dist_dir(app), MANIFEST)
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(filename):
+    """URL eines Assets - mit Fingerprint, sofern gebaut"""
+    hashed = current_app.extensions['assets'].get(filename)
+    if hashed is None:
+        return url_for('static', filename=filename)
+    return url_for('assets', filename=hashed)
+
+
+def serve_asset(filename):
+    """Fingerprint-Asset ausliefern, vorkomprimiert wenn der Client es akzeptiert"""
+    directory = dist_dir(current_app)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encoding = None
+
+    for name, suffix in ENCODINGS:
+        if name in request.accept_encodings and os.path.isfile(os.path.join(directory, filename + suffix)):
+            encoding, filename = name, filename + suffix
+            break
+
+    response = send_from_directory(directory, filename, mimetype=mimetype, max_age=ONE_YEAR)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    manifest = load_manifest(app) if app.config['ASSETS_FINGERPRINT'] else {}
+    if app.config['ASSETS_FINGERPRINT'] and not manifest:
+        app.logger.warning('Kein Asset-Manifest gefunden - `flask assets-build` ausführen')
+
+    app.extensions['assets'] = manifest
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.add_template_global(asset_url)
+    app.cli.add_command(assets_build_command)
+
+
+@click.command('assets-build')
+@click.option('--clean', is_flag=True, help='Dateien früherer Builds entfernen')
+@with_appcontext
+def assets_build_command(clean):
+    """Static-Assets mit Inhalts-Hash und gzip/Brotli-Varianten bauen"""
+    manifest = build_assets(current_app, clean=clean)
+    click.echo(f'{len(manifest)} Assets gebaut nach {dist_dir(current_app)}'
+               + ('' if brotli else ' (ohne Brotli - Paket `brotli` nicht installiert)'))
@@ -0,0 +1,123 @@
+"""
+Änderungsprotokoll (Change-Feed)
+Jedes Anlegen, Ändern und Löschen von Kunden, Bestellungen und Kontakten
+landet als Zeile in `change_log` - im selben Flush und damit in derselben
+Transaktion wie die Änderung. Rollback der Änderung = kein Eintrag.
+
+Änderungen an Bestellpositionen erscheinen als 'update' der Bestellung
+(`updated_at` wird in services.conditional nachgezogen). Massenoperationen
+mit Core-Statements umgehen die ORM-Events und tragen selbst per `record()`
+ein (z.B. die Archivierung).
+
+Der Feed (GET /api/v1/changes?since=<cursor>) liefert die Einträge nach dem
+Cursor. Die IDs sind in Commit-Reihenfolge, weil SQLite Schreibtransaktionen
+serialisiert.
+
+Kompaktierung (`flask changes-compact`) entfernt Einträge älter als die
+Aufbewahrungsfrist, wenn es für denselben Datensatz einen jüngeren gibt.
+Lösch-Einträge bleiben so erhalten, und ein Abnehmer mit altem Cursor
+bekommt weiterhin den letzten Stand jedes Datensatzes.
+"""
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, select
+
+from models import db, ArchivedOrder, ChangeLog, Contact, Customer, Order
+
+# Modell -> Ressourcenname der API
+TRACKED = {
+    Customer: 'customers',
+    Order: 'orders',
+    Contact: 'contacts',
+    ArchivedOrder: 'archived_orders',
+}
+
+
+def _entries(db_session):
+    """Einträge für new/dirty/deleted - nach after_flush noch im Stand vor dem Flush"""
+    now = datetime.utcnow()
+    entries = []
+    for objects, operation in ((db_session.new, 'create'), (db_session.dirty, 'update'),
+                               (db_session.deleted, 'delete')):
+        for obj in objects:
+            entity = TRACKED.get(type(obj))
+            if entity is None:
+                continue
+            # dirty enthält auch Objekte ohne tatsächliche Änderung
+            if operation == 'update' and not db_session.is_modified(obj, include_collections=False):
+                continue
+            entries.append({'entity': entity, 'entity_id': obj.id,
+                            'operation': operation, 'changed_at': now})
+    return entries
+
+
+def _after_flush(db_session, flush_context):
+    entries = _entries(db_session)
+    if entries:
+        # Über die Connection: kein erneuter Flush, gleiche Transaktion
+        db_session.connection().execute(ChangeLog.__table__.insert(), entries)
+
+
+def record(entity, ids, operation):
+    """Einträge für Änderungen an den ORM-Events vorbei (Core-Statements)"""
+    if not ids:
+        return
+    now = datetime.utcnow()
+    db.session.execute(ChangeLog.__table__.insert(), [
+        {'entity': entity, 'entity_id': ident, 'operation': operation, 'changed_at': now}
+        for ident in ids
+    ])
+
+
+def compact(retention_days=None, now=None):
+    """Überholte Einträge älter als die Frist löschen, liefert die Anzahl"""
+    if retention_days is None:
+        retention_days = current_app.config['CHANGE_LOG_RETENTION_DAYS']
+    horizon = (now or datetime.utcnow()) - timedelta(days=retention_days)
+
+    latest = select(func.max(ChangeLog.id)).group_by(ChangeLog.entity, ChangeLog.entity_id)
+    result = db.session.execute(
+        delete(ChangeLog).where(ChangeLog.changed_at < horizon, ChangeLog.id.not_in(latest))
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def compact_page(rows):
+    """Mehrere Einträge je Datensatz zu einem zusammenfassen
+
+    Reihenfolge nach dem jeweils letzten Eintrag. create + update bleibt
+    'create', create + delete entfällt ganz (der Abnehmer kannte den Datensatz
+    nie).
+    """
+    merged = {}
+    for row in rows:
+        key = (row.entity, row.entity_id)
+        previous = merged.pop(key, None)
+        operation = row.operation
+        if previous is not None and previous['operation'] == 'create':
+            if operation == 'delete':
+                continue
+            operation = 'create'
+        merged[key] = {'cursor': row.id, 'entity': row.entity, 'id': row.entity_id,
+                       'operation': operation, 'changed_at': row.changed_at.isoformat()}
+    return list(merged.values())
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(changes_compact_command)
+
+
+@click.command('changes-compact')
+@click.option('--retention-days', type=int, default=None,
+              help='Überholte Einträge älter als N Tage entfernen')
+@with_appcontext
+def changes_compact_command(retention_days):
+    """Change-Log kompaktieren (nur jüngster Eintrag je Datensatz)"""
+    count = compact(retention_days)
+    click.echo(f'{count} Einträge entfernt.')
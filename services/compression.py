@@ -0,0 +1,157 @@
+"""
+Response-Kompression
+after_request-Hook, der HTML, JSON, CSV & Co. per gzip oder deflate
+komprimiert, wenn der Client es akzeptiert. Bereits komprimierte Antworten
+(z.B. vorkomprimierte Assets) und kleine Antworten bleiben unverändert;
+gestreamte Antworten werden blockweise komprimiert.
+
+Jede komprimierte Antwort trägt einen `Server-Timing`-Header mit CPU-Zeit und
+Größen, die Summen je Prozess liefert GET /stats/compression (Admin/Chef).
+"""
+import threading
+import time
+import zlib
+
+from flask import current_app, request
+from flask_login import current_user, login_required
+
+# wbits: gzip-Container bzw. zlib-Container (HTTP "deflate")
+WBITS = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+SKIP_STATUS = {204, 206, 304}
+
+
+class CompressionStats:
+    """Zähler je Prozess"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.responses = 0
+        self.streamed = 0
+        self.skipped_small = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.cpu_seconds = 0.0
+
+    def record(self, bytes_in, bytes_out, cpu_seconds, streamed=False):
+        with self._lock:
+            self.responses += 1
+            self.streamed += streamed
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+            self.cpu_seconds += cpu_seconds
+
+    def skip_small(self):
+        with self._lock:
+            self.skipped_small += 1
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'responses': self.responses,
+                'streamed': self.streamed,
+                'skipped_small': self.skipped_small,
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+                'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else None,
+                'cpu_ms': round(self.cpu_seconds * 1000, 1),
+                'cpu_ms_per_mb': round(self.cpu_seconds * 1000 / (self.bytes_in / 2 ** 20), 2)
+                                 if self.bytes_in else None,
+            }
+
+
+def _compressor(encoding, level):
+    return zlib.compressobj(level, zlib.DEFLATED, WBITS[encoding])
+
+
+def _should_compress(response):
+    config = current_app.config
+    return (
+        request.method != 'HEAD'
+        and 200 <= response.status_code < 300 and response.status_code not in SKIP_STATUS
+        and 'Content-Encoding' not in response.headers
+        and not response.direct_passthrough
+        and response.mimetype in config['COMPRESS_MIMETYPES']
+    )
+
+
+def compress_response(response):
+    if not current_app.config['COMPRESS_ENABLED'] or not _should_compress(response):
+        return response
+
+    encoding = request.accept_encodings.best_match(['gzip', 'deflate'])
+    response.vary.add('Accept-Encoding')
+    if encoding is None:
+        return response
+
+    stats = current_app.extensions['compression']
+    level = current_app.config['COMPRESS_LEVEL']
+
+    if response.is_streamed:
+        response.response = _compress_stream(response.response, encoding, level, stats)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESS_MIN_SIZE']:
+            stats.skip_small()
+            return response
+
+        started = time.thread_time()
+        compressor = _compressor(encoding, level)
+        compressed = compressor.compress(data) + compressor.flush()
+        cpu = time.thread_time() - started
+
+        response.set_data(compressed)
+        stats.record(len(data), len(compressed), cpu)
+        response.headers['Server-Timing'] = (
+            f'compress;dur={cpu * 1000:.2f};desc="{encoding} {len(data)}->{len(compressed)}"'
+        )
+
+    response.headers['Content-Encoding'] = encoding
+    # Komprimierte Bytes sind nicht identisch mit den unkomprimierten
+    if response.headers.get('ETag') and not response.headers['ETag'].startswith('W/'):
+        response.headers['ETag'] = 'W/' + response.headers['ETag']
+    return response
+
+
+def _compress_stream(chunks, encoding, level, stats):
+    compressor = _compressor(encoding, level)
+    bytes_in = bytes_out = 0
+    cpu = 0.0
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode()
+            started = time.thread_time()
+            # Sync-Flush je Block: der Client bekommt Daten, sobald sie erzeugt werden
+            block = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            cpu += time.thread_time() - started
+            bytes_in += len(chunk)
+            bytes_out += len(block)
+            if block:
+                yield block
+
+        started = time.thread_time()
+        tail = compressor.flush()
+        cpu += time.thread_time() - started
+        bytes_out += len(tail)
+        yield tail
+    finally:
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+    stats.record(bytes_in, bytes_out, cpu, streamed=True)
+
+
+@login_required
+def compression_stats():
+    """Kompressions-Zähler dieses Prozesses (JSON, nur Admin/Chef)"""
+    if not current_user.is_chef():
+        return {'error': 'Keine Berechtigung'}, 403
+    return {'enabled': current_app.config['COMPRESS_ENABLED'],
+            **current_app.extensions['compression'].as_dict()}
+
+
+def init_app(app):
+    app.extensions['compression'] = CompressionStats()
+    app.after_request(compress_response)
+    app.add_url_rule('/stats/compression', 'compression_stats', compression_stats)
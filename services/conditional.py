@@ -0,0 +1,113 @@
+"""
+Conditional GET
+Detailseiten und CSV-Exporte berechnen vor dem Rendern eine Version aus den
+`updated_at`-Zeitstempeln und Zeilenanzahlen der beteiligten Zeilen (inkl.
+Kindzeilen wie Bestellpositionen). Daraus entstehen ein schwaches ETag und
+Last-Modified; hat der Browser die Version schon, gibt es `304 Not Modified`
+ohne Template und ohne CSV.
+
+Die Anzahl im ETag erkennt gelöschte Zeilen, die keinen Zeitstempel
+hinterlassen - aber nur für gefilterte Zeilen (Details). Ganze Tabellen
+(Exporte, services.fragment_cache.DATA_SOURCES) zählen nicht, sondern
+nehmen den jüngsten Eintrag im Änderungsprotokoll (auch Löschungen).
+Zusätzlich bekommt beim Löschen von Bestellungen, Kontakten und Positionen
+das Elternobjekt ein neues `updated_at`.
+"""
+import hashlib
+from datetime import date, datetime
+from functools import wraps
+
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from sqlalchemy import event, func, select
+from werkzeug.http import is_resource_modified
+
+from models import db, Contact, Customer, Order, OrderItem
+
+
+def version_of(column, *criteria):
+    """Skalare Unterabfragen (Anzahl, jüngster Zeitstempel) der Zeilen zu `column`"""
+    count = select(func.count()).select_from(column.table).where(*criteria).scalar_subquery()
+    # Eigene Unterabfrage: so kann die Datenbank MAX() über den Index beantworten
+    latest = select(func.max(column)).where(*criteria).scalar_subquery()
+    return count, latest
+
+
+def latest_of(column, *criteria):
+    """Nur der jüngste Wert (MAX() über den Index), ohne Anzahl - für ganze Tabellen"""
+    return (select(func.max(column)).where(*criteria).scalar_subquery(),)
+
+
+def load_version(*versions):
+    """Alle Versionen in einer Abfrage auswerten -> (Werte, last_modified)"""
+    row = db.session.execute(select(*[part for version in versions for part in version])).one()
+    stamps = [value for value in row if isinstance(value, datetime)]
+    return tuple(row), max(stamps, default=None)
+
+
+def make_etag(values):
+    """ETag aus Datenversion, Benutzer, URL, Tag und Template-Stand"""
+    key = repr((
+        values,
+        request.full_path,
+        current_user.get_id(), current_user.name, current_user.role,
+        # Seiten mit "letztes Jahr" u.ä. hängen vom Datum ab
+        date.today().isoformat(),
+        current_app.extensions['template_version'],
+    ))
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def conditional(version_func):
+    """Decorator: 304 ohne View-Aufruf, wenn sich die Daten nicht geändert haben
+
+    `version_func` bekommt die URL-Parameter des Views und liefert eine Liste
+    von `version_of(...)`-Paaren.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(**kwargs):
+            # Flash-Meldungen stehen im Seiteninhalt, dann immer neu rendern
+            if not current_app.config['CONDITIONAL_GET'] or session.get('_flashes'):
+                return view(**kwargs)
+
+            values, last_modified = load_version(*version_func(**kwargs))
+            etag = make_etag(values)
+
+            if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+                response = current_app.response_class(status=304)
+            else:
+                response = make_response(view(**kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag, weak=True)
+            response.last_modified = last_modified
+            # Browser darf speichern, muss aber jedes Mal nachfragen
+            response.cache_control.private = True
+            response.cache_control.no_cache = True
+            return response
+        return wrapper
+    return decorator
+
+
+def _touch_parents(db_session, flush_context, instances):
+    """Gelöschte/geänderte Kindzeilen als Änderung des Elternobjekts markieren"""
+    now = datetime.utcnow()
+    parents = set()
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, OrderItem) and obj.order_id:
+            parents.add((Order, obj.order_id))
+    for obj in db_session.deleted:
+        if isinstance(obj, (Order, Contact)):
+            parents.add((Customer, obj.customer_id))
+
+    for model, ident in parents:
+        parent = db_session.get(model, ident)
+        if parent is not None and parent not in db_session.deleted:
+            parent.updated_at = now
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_flush', _touch_parents):
+        event.listen(db.session, 'before_flush', _touch_parents)
@@ -0,0 +1,314 @@
+"""
+Umsatz-Würfel (OLAP) für Stadt × Kategorie × Monat & Co.
+Vorberechnete Kennzahlen - Umsatz nach Rabatt, Menge, Bestellungen,
+Kunden - über die Dimensionen Land, Stadt, Kategorie, Status und Monat,
+aktive und archivierte Bestellungen. Pivot-Abfragen (`pivot()`,
+GET /reports/cube) lesen nur die Würfel-Tabellen:
+
+- `sales_cube_members`: feinste Ebene, zusätzlich je Kunde - daraus die
+  Anzahl verschiedener Kunden für jeden Ausschnitt
+- `sales_cube_cells`: dieselben Summen ohne Kunde, für Umsatz, Menge und
+  Bestellungen
+
+Kunden und Bestellungen lassen sich nicht über Kategorien aufsummieren (eine
+Bestellung kann mehrere Kategorien enthalten). Beide Tabellen haben deshalb
+zusätzlich Zeilen mit Kategorie '*' für "alle Kategorien"; Abfragen ohne
+Kategorie lesen nur diese, Abfragen mit Kategorie nur die übrigen.
+
+Gepflegt wird im Flush wie bei services.product_sales: Beiträge der
+betroffenen Bestellungen vor und nach dem Flush, die Differenz wird addiert.
+Betroffen sind geänderte Bestellungen und Positionen, alle Bestellungen eines
+Kunden mit geänderter Stadt bzw. geändertem Land und alle Bestellungen mit
+einem Produkt, dessen Kategorie sich ändert. Nach Importen am ORM vorbei:
+`flask cube-rebuild`.
+"""
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import (and_, bindparam, delete, distinct, event, extract, func, insert, inspect,
+                        literal, or_, select, type_coerce, union_all)
+from sqlalchemy.dialects import postgresql, sqlite
+
+from models import (db, ArchivedOrder, ArchivedOrderItem, Customer, Order, OrderItem, Product,
+                    SalesCubeCell, SalesCubeMember)
+from services import timeseries
+from services.product_sales import affected_orders, line_revenue
+
+ALL = '*'
+STATE_KEY = 'cube_before'
+
+# Dimensionen der Pivot-Abfragen (quarter/year aus dem Monat abgeleitet)
+DIMENSIONS = ('country', 'city', 'category', 'status', 'month', 'quarter', 'year')
+FILTERS = ('country', 'city', 'category', 'status')
+MEASURES = ('revenue', 'quantity', 'orders', 'customers')
+
+KEY_COLUMNS = ['month', 'country', 'city', 'category', 'status']
+MEMBER_COLUMNS = KEY_COLUMNS + ['customer_id']
+
+
+def _lines(order, item, all_categories, order_ids, customer_ids, product_ids, categories):
+    """Positionen einer Quelle (aktiv bzw. Archiv) mit Würfel-Schlüssel, None = keine"""
+    category = literal(ALL) if all_categories else func.coalesce(Product.category, '')
+    criteria = []
+    if order_ids and order is Order:
+        criteria.append(order.id.in_(order_ids))
+    if customer_ids:
+        criteria.append(order.customer_id.in_(customer_ids))
+    if product_ids:
+        # Nur Positionen der alten und neuen Kategorien - nur deren Zeilen ändern sich
+        criteria.append(and_(
+            order.id.in_(select(item.order_id).where(item.product_id.in_(product_ids))),
+            category.in_(categories),
+        ))
+    filtered = order_ids is not None or customer_ids is not None or product_ids is not None
+    if filtered and not criteria:
+        return None
+
+    query = select(
+        type_coerce(timeseries.bucket(order.order_date, 'month'), db.Date).label('month'),
+        func.coalesce(Customer.country, '').label('country'),
+        func.coalesce(Customer.city, '').label('city'),
+        category.label('category'),
+        order.status.label('status'),
+        order.customer_id.label('customer_id'),
+        order.order_number.label('order_number'),
+        item.quantity.label('quantity'),
+        line_revenue(item.quantity, item.unit_price, item.discount).label('revenue'),
+    ).select_from(order).join(item, item.order_id == order.id).join(
+        Customer, Customer.id == order.customer_id
+    ).join(Product, Product.id == item.product_id)
+    return query.where(or_(*criteria)) if criteria else query
+
+
+def _contributions(order_ids=None, customer_ids=None, product_ids=None, categories=(),
+                   all_categories=False):
+    """Mitglieder-Zeilen (Schlüssel, Umsatz, Menge, Bestellungen) aus der Historie
+
+    Ohne IDs alle Bestellungen, sonst die Bestellungen mit einer der
+    Bestell-IDs (aktiv), einem der Kunden oder einem der Produkte (dann nur
+    Positionen der Kategorien `categories`). Je Quelle
+    ein eigener Join, damit die Indizes der Tabellen greifen (nicht über
+    archive.order_history()).
+    """
+    branches = [
+        _lines(order, item, all_categories, order_ids, customer_ids, product_ids, categories)
+        for order, item in ((Order, OrderItem), (ArchivedOrder, ArchivedOrderItem))
+    ]
+    lines = union_all(*[branch for branch in branches if branch is not None]).subquery('lines')
+    keys = [lines.c[name] for name in MEMBER_COLUMNS]
+    return select(
+        *keys,
+        func.sum(lines.c.revenue),
+        func.sum(lines.c.quantity),
+        # Bestellnummern sind auch über das Archiv hinweg eindeutig
+        func.count(distinct(lines.c.order_number)),
+    ).group_by(*keys)
+
+
+def _member_rows(connection, order_ids, customer_ids, product_ids, categories):
+    """{Mitglied-Schlüssel: [Umsatz, Menge, Bestellungen]} laut Datenbank, inkl. '*'-Zeilen"""
+    if not (order_ids or customer_ids or product_ids):
+        return {}
+    order_ids, customer_ids = list(order_ids), list(customer_ids)
+    queries = [_contributions(order_ids, customer_ids, list(product_ids), list(categories))]
+    # Die Kategorie eines Produkts ändert die '*'-Zeilen nicht
+    if order_ids or customer_ids:
+        queries.append(_contributions(order_ids, customer_ids, all_categories=True))
+    rows = connection.execute(union_all(*queries)).all()
+    return {tuple(key): [Decimal(str(revenue or 0)), int(quantity or 0), int(orders)]
+            for *key, revenue, quantity, orders in rows}
+
+
+def _affected(db_session, order_ids=()):
+    """(Bestell-IDs, Kunden-IDs, Produkt-IDs, alte und neue Kategorien der Produkte)"""
+    order_ids = set(order_ids) | affected_orders(db_session)
+    customer_ids, product_ids, categories = set(), set(), set()
+    for obj in db_session.dirty:
+        attrs = inspect(obj).attrs
+        if isinstance(obj, Customer) and (attrs.city.history.has_changes()
+                                          or attrs.country.history.has_changes()):
+            customer_ids.add(obj.id)
+        elif isinstance(obj, Product) and attrs.category.history.has_changes():
+            product_ids.add(obj.id)
+            history = attrs.category.history
+            categories.update(value or '' for value in list(history.added) + list(history.deleted))
+    # Produkte mit Positionen lassen sich nicht löschen (Fremdschlüssel)
+    for obj in db_session.deleted:
+        if isinstance(obj, Customer):
+            customer_ids.add(obj.id)
+    return order_ids, customer_ids, product_ids, categories
+
+
+def _before_flush(db_session, flush_context, instances):
+    affected = _affected(db_session)
+    # Stand vor dem Flush; Connection statt Query - kein Autoflush
+    db_session.info[STATE_KEY] = (affected, _member_rows(db_session.connection(), *affected)
+                                  if any(affected) else {})
+
+
+def _after_flush(db_session, flush_context):
+    (order_ids, *changed), before = db_session.info.pop(STATE_KEY, (((),) * 4, {}))
+    # Neue Bestellungen haben erst jetzt eine ID; Kunden/Produkte wie vor dem Flush
+    affected = (_affected(db_session, order_ids)[0], *changed)
+    if not any(affected):
+        return
+
+    connection = db_session.connection()
+    after = _member_rows(connection, *affected)
+    deltas = {}
+    for key in set(before) | set(after):
+        old = before.get(key, [Decimal(0), 0, 0])
+        new = after.get(key, [Decimal(0), 0, 0])
+        if old != new:
+            deltas[key] = [new[i] - old[i] for i in range(3)]
+    if deltas:
+        apply(connection, deltas)
+
+
+def _apply(connection, table, columns, deltas):
+    """Differenzen als Upsert (SQLite und PostgreSQL: ON CONFLICT), ein executemany"""
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    upsert = dialect.insert(table)
+    upsert = upsert.on_conflict_do_update(index_elements=columns, set_={
+        'revenue': table.c.revenue + upsert.excluded.revenue,
+        'quantity': table.c.quantity + upsert.excluded.quantity,
+        'order_count': table.c.order_count + upsert.excluded.order_count,
+    })
+    connection.execute(upsert, [
+        {**dict(zip(columns, key)), 'revenue': revenue, 'quantity': quantity, 'order_count': orders}
+        for key, (revenue, quantity, orders) in deltas.items()
+    ])
+
+    # Ausschnitte ohne Bestellungen nicht aufheben
+    emptied = [{f'key_{name}': value for name, value in zip(columns, key)}
+               for key, (_, _, orders) in deltas.items() if orders < 0]
+    if emptied:
+        connection.execute(delete(table).where(
+            *[table.c[name] == bindparam(f'key_{name}') for name in columns], table.c.order_count == 0
+        ), emptied)
+
+
+def apply(connection, deltas):
+    """Differenzen {Mitglied-Schlüssel: [Umsatz, Menge, Bestellungen]} in beide Tabellen addieren"""
+    cells = {}
+    for key, values in deltas.items():
+        cell = cells.setdefault(key[:-1], [Decimal(0), 0, 0])
+        for i in range(3):
+            cell[i] += values[i]
+    _apply(connection, SalesCubeMember.__table__, MEMBER_COLUMNS, deltas)
+    cells = {key: values for key, values in cells.items() if any(values)}
+    if cells:
+        _apply(connection, SalesCubeCell.__table__, KEY_COLUMNS, cells)
+
+
+def rebuild():
+    """Würfel aus aktiven und archivierten Bestellungen neu aufbauen (ohne Commit)"""
+    columns = MEMBER_COLUMNS + ['revenue', 'quantity', 'order_count']
+    db.session.execute(delete(SalesCubeCell))
+    db.session.execute(delete(SalesCubeMember))
+    for all_categories in (False, True):
+        db.session.execute(insert(SalesCubeMember).from_select(
+            columns, _contributions(all_categories=all_categories)
+        ))
+
+    keys = [getattr(SalesCubeMember, name) for name in KEY_COLUMNS]
+    db.session.execute(insert(SalesCubeCell).from_select(
+        KEY_COLUMNS + ['revenue', 'quantity', 'order_count'],
+        select(*keys, func.sum(SalesCubeMember.revenue), func.sum(SalesCubeMember.quantity),
+               func.sum(SalesCubeMember.order_count)).group_by(*keys)
+    ))
+    return db.session.query(func.count()).select_from(SalesCubeCell).scalar()
+
+
+def _dimension(model, name):
+    if name == 'quarter':
+        return type_coerce(timeseries.bucket(model.month, 'quarter'), db.Date)
+    if name == 'year':
+        return extract('year', model.month)
+    return getattr(model, name)
+
+
+def _criteria(model, by_category, filters, start, end):
+    # '*'-Zeilen nur, wenn weder nach Kategorie gruppiert noch gefiltert wird
+    criteria = [model.category != ALL if by_category else model.category == ALL]
+    criteria += [getattr(model, name).in_(values) for name, values in filters.items()]
+    if start:
+        criteria.append(model.month >= start)
+    if end:
+        criteria.append(model.month <= end)
+    return criteria
+
+
+def _label(name, value):
+    if name in ('month', 'quarter'):
+        return timeseries.label(value, name)
+    if name == 'year':
+        return int(value)
+    # '' = ohne Angabe
+    return value or None
+
+
+def pivot(dimensions, measures, filters=None, start=None, end=None):
+    """Kennzahlen je Kombination der Dimensionen, nur aus dem Würfel
+
+    `filters`: {Dimension: [Werte]} für country, city, category, status;
+    `start`/`end`: Monatsanfänge (inklusive). Ohne Dimensionen eine Gesamtzeile.
+    """
+    filters = filters or {}
+    by_category = 'category' in dimensions or 'category' in filters
+    rows = {}
+
+    def merge(result, names):
+        for values in result:
+            key, values = tuple(values[:len(dimensions)]), values[len(dimensions):]
+            row = rows.setdefault(key, {
+                name: _label(name, value) for name, value in zip(dimensions, key)
+            })
+            row.update(zip(names, values))
+
+    cell_measures = [name for name in measures if name != 'customers']
+    if cell_measures:
+        keys = [_dimension(SalesCubeCell, name) for name in dimensions]
+        merge(db.session.execute(
+            select(*keys, func.sum(SalesCubeCell.revenue), func.sum(SalesCubeCell.quantity),
+                   func.sum(SalesCubeCell.order_count))
+            .where(*_criteria(SalesCubeCell, by_category, filters, start, end))
+            .group_by(*keys)
+        ).all(), ['revenue', 'quantity', 'orders'])
+
+    if 'customers' in measures:
+        keys = [_dimension(SalesCubeMember, name) for name in dimensions]
+        merge(db.session.execute(
+            select(*keys, func.count(distinct(SalesCubeMember.customer_id)))
+            .where(*_criteria(SalesCubeMember, by_category, filters, start, end))
+            .group_by(*keys)
+        ).all(), ['customers'])
+
+    result = []
+    for key in sorted(rows, key=lambda key: tuple((value is None, str(value)) for value in key)):
+        row = rows[key]
+        # Leere Summen (keine Zeilen) als 0, Umsatz als Betrag
+        for name in measures:
+            value = row.get(name) or 0
+            row[name] = float(value) if name == 'revenue' else int(value)
+        for name in set(row) - set(dimensions) - set(measures):
+            del row[name]
+        result.append(row)
+    return result
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(cube_rebuild_command)
+
+
+@click.command('cube-rebuild')
+@with_appcontext
+def cube_rebuild_command():
+    """Umsatz-Würfel aus der Bestellhistorie neu aufbauen"""
+    count = rebuild()
+    db.session.commit()
+    click.echo(f'{count} Würfelzellen aufgebaut.')
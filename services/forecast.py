@@ -0,0 +1,146 @@
+"""
+Umsatzprognose je Kunde und gesamt
+Der Job `revenue.forecast` lädt die Monatsumsätze aller Kunden (ohne Stornos,
+inkl. Archiv) mit einer gruppierten Abfrage in eine Matrix Kunden × Monate
+und glättet alle Reihen gleichzeitig (Holt: Niveau + Trend, NumPy - eine
+Schleife über die Monate, keine über die Kunden). Die Prognosen ab dem
+laufenden Monat landen in `revenue_forecasts`; Dashboard, Kundendetail und
+GET /reports/forecast lesen nur diese Tabelle.
+
+- Der Worker (`flask jobs-worker`) reiht den Job alle FORECAST_INTERVAL
+  Sekunden ein (0 = nur manuell)
+- Ohne Worker: `flask forecast-compute`
+
+Die Gesamtprognose (customer_id None) glättet die Summe aller Reihen. Kunden
+ohne Umsatz in den letzten FORECAST_HISTORY_MONTHS Monaten bzw. mit
+Prognose 0 bekommen keine Zeilen. Die Tabelle wird in einer Transaktion
+komplett ersetzt.
+"""
+from datetime import date, datetime
+
+import click
+import numpy as np
+from dateutil.relativedelta import relativedelta
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, extract, func, or_, select, type_coerce
+
+from models import db, RevenueForecast
+from services import archive, jobs
+
+TASK = 'revenue.forecast'
+CHUNK_SIZE = 5000
+
+
+def _month_index(column):
+    return extract('year', column) * 12 + extract('month', column) - 1
+
+
+def load(first, end):
+    """(Kunden-IDs, Matrix Kunden × Monate) der Umsätze von `first` bis vor `end`"""
+    history = archive.order_rollup()
+    month = _month_index(history.c.period).label('month')
+    rows = db.session.execute(
+        select(history.c.customer_id, month, type_coerce(func.sum(history.c.revenue), db.Float))
+        .where(history.c.status != 'Storniert',
+               history.c.period >= datetime.combine(first, datetime.min.time()),
+               history.c.period < datetime.combine(end, datetime.min.time()))
+        .group_by(history.c.customer_id, month)
+    ).all()
+
+    months = (end.year - first.year) * 12 + end.month - first.month
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, months))
+    # Spaltenweise - np.array() über Row-Objekte ist um ein Vielfaches langsamer
+    customers, indexes, revenues = (np.array(column) for column in zip(*rows))
+    customer_ids, rows_index = np.unique(customers.astype(np.int64), return_inverse=True)
+    matrix = np.zeros((len(customer_ids), months))
+    matrix[rows_index, indexes.astype(np.int64) - (first.year * 12 + first.month - 1)] = revenues
+    return customer_ids, matrix
+
+
+def smooth(matrix, alpha, beta, horizon):
+    """Holt-Prognose aller Zeilen für 1..horizon Schritte, Matrix n × horizon (nicht negativ)"""
+    if matrix.shape[1] == 0:
+        return np.zeros((len(matrix), horizon))
+    level = matrix[:, 0].copy()
+    trend = matrix[:, 1] - matrix[:, 0] if matrix.shape[1] > 1 else np.zeros(len(matrix))
+    for column in range(1, matrix.shape[1]):
+        previous = level
+        level = alpha * matrix[:, column] + (1 - alpha) * (level + trend)
+        trend = beta * (level - previous) + (1 - beta) * trend
+    steps = np.arange(1, horizon + 1)
+    return np.maximum(level[:, None] + trend[:, None] * steps, 0)
+
+
+def compute(today=None):
+    """Prognosen aller Kunden neu berechnen (ohne Commit), liefert die Anzahl Kunden"""
+    config = current_app.config
+    current = (today or date.today()).replace(day=1)
+    first = current - relativedelta(months=config['FORECAST_HISTORY_MONTHS'])
+    horizon = config['FORECAST_HORIZON']
+    computed_at = datetime.utcnow()
+
+    customer_ids, matrix = load(first, current)
+    # Gesamtreihe als zusätzliche Zeile - eine Glättung für alles
+    matrix = np.vstack([matrix, matrix.sum(axis=0)])
+    predictions = np.round(smooth(matrix, config['FORECAST_ALPHA'], config['FORECAST_BETA'], horizon), 2)
+
+    months = [current + relativedelta(months=step) for step in range(horizon)]
+    owners = customer_ids.tolist() + [None]
+    keep = np.flatnonzero(predictions.any(axis=1))
+    keep = np.union1d(keep, [len(owners) - 1])  # Gesamtzeile immer
+    forecasts = [
+        {'customer_id': owners[index], 'month': month, 'revenue': revenue, 'computed_at': computed_at}
+        for index, values in zip(keep.tolist(), predictions[keep].tolist())
+        for month, revenue in zip(months, values)
+    ]
+
+    db.session.execute(delete(RevenueForecast))
+    for start in range(0, len(forecasts), CHUNK_SIZE):
+        db.session.execute(RevenueForecast.__table__.insert(), forecasts[start:start + CHUNK_SIZE])
+    return len(keep) - 1
+
+
+def series(customer_id=None):
+    """[(Monat, Umsatz)] der Prognose eines Kunden bzw. gesamt (None), leer ohne Berechnung
+
+    Kunden ohne eigene Zeilen bekommen 0 für die Monate der Gesamtprognose.
+    """
+    rows = db.session.execute(
+        select(RevenueForecast.month, RevenueForecast.customer_id, RevenueForecast.revenue)
+        .where(or_(RevenueForecast.customer_id.is_(None), RevenueForecast.customer_id == customer_id))
+        .order_by(RevenueForecast.month)
+    ).all()
+    values = {month: revenue for month, owner, revenue in rows if owner == customer_id}
+    return [(month, values.get(month, 0)) for month, owner, _ in rows if owner is None]
+
+
+def computed_at():
+    """Stand der Prognosen oder None, wenn noch nie berechnet"""
+    return db.session.execute(select(func.max(RevenueForecast.computed_at))).scalar()
+
+
+@jobs.task(TASK)
+def forecast_job():
+    """Umsatzprognosen neu berechnen"""
+    return {'customers': compute()}
+
+
+def init_app(app):
+    for name in ('FORECAST_HISTORY_MONTHS', 'FORECAST_HORIZON'):
+        if app.config[name] < 1:
+            raise ValueError(f'{name} muss mindestens 1 sein')
+    interval = app.config['FORECAST_INTERVAL']
+    if interval:
+        jobs.schedule(TASK, interval)
+    app.cli.add_command(forecast_compute_command)
+
+
+@click.command('forecast-compute')
+@with_appcontext
+def forecast_compute_command():
+    """Umsatzprognosen sofort berechnen (ohne Worker)"""
+    count = compute()
+    db.session.commit()
+    click.echo(f'Prognosen für {count} Kunden berechnet.')
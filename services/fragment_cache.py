@@ -0,0 +1,242 @@
+"""
+Fragment-Cache
+Jinja-Tag für teure Teile einer Seite, die sich unterschiedlich schnell ändern:
+
+    {% cache 'top_customers', data_version('orders', 'customers'), now.date() %}
+        ...
+    {% endcache %}
+
+Der Schlüssel besteht aus Name, den Schlüsselteilen, der Rolle des Benutzers
+(Bewertungen sieht nur der Chef) und dem Template-Stand. `data_version()`
+liefert jüngsten Änderungsprotokoll-Eintrag und jüngstes `updated_at` der
+genannten Tabellen - ändert sich nichts, wird das gespeicherte HTML ausgegeben.
+
+Damit bei einem Treffer auch die Abfragen entfallen, übergibt der View die
+Daten als `deferred(...)`: berechnet wird erst beim ersten Zugriff im
+Template, also nur, wenn das Fragment neu gerendert wird.
+
+Für Berichte, die als Seite und als JSON ausgeliefert werden, legt
+`cached_value()` das Ergebnis selbst (als JSON) im selben Backend ab.
+
+Backends:
+- memory: pro Prozess (Standard)
+- sqlite: gemeinsame SQLite-Datei für mehrere Worker-Prozesse
+- none: aus
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g
+from flask_login import current_user
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+from models import (ArchivedOrder, ChangeLog, Contact, Customer, CustomerScore, Order, Product,
+                    RevenueForecast)
+from services.conditional import latest_of, load_version
+
+# Welche Zeilen gehören zu einer Datenquelle in data_version()
+# Ohne count(*) über ganze Tabellen - nur MAX() über Indizes: der jüngste
+# Eintrag im Änderungsprotokoll erfasst Anlegen, Ändern und Löschen über das
+# ORM und die Archivierung, der jüngste Zeitstempel Importe am ORM vorbei
+# (Generator in seed.py). Scores und Prognosen werden komplett ersetzt.
+DATA_SOURCES = {
+    'customers': lambda: [latest_of(ChangeLog.id, ChangeLog.entity == 'customers'),
+                          latest_of(Customer.updated_at)],
+    'orders': lambda: [latest_of(ChangeLog.id, ChangeLog.entity == 'orders'),
+                       latest_of(ChangeLog.id, ChangeLog.entity == 'archived_orders'),
+                       latest_of(Order.updated_at), latest_of(ArchivedOrder.archived_at)],
+    'contacts': lambda: [latest_of(ChangeLog.id, ChangeLog.entity == 'contacts'),
+                         latest_of(Contact.updated_at)],
+    # Produkte werden nicht gelöscht (nur deaktiviert)
+    'products': lambda: [latest_of(Product.id), latest_of(Product.updated_at)],
+    'scores': lambda: [latest_of(CustomerScore.computed_at)],
+    'forecasts': lambda: [latest_of(RevenueForecast.computed_at)],
+}
+
+
+class deferred:
+    """Wert, der erst beim ersten Zugriff berechnet wird"""
+
+    def __init__(self, func, *args, **kwargs):
+        self._call = (func, args, kwargs)
+        self._loaded = False
+        self._value = None
+
+    @property
+    def value(self):
+        if not self._loaded:
+            func, args, kwargs = self._call
+            self._value = func(*args, **kwargs)
+            self._loaded = True
+        return self._value
+
+    def __getattr__(self, name):
+        return getattr(self.value, name)
+
+    def __getitem__(self, key):
+        return self.value[key]
+
+    def __iter__(self):
+        return iter(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __bool__(self):
+        return bool(self.value)
+
+    def __contains__(self, item):
+        return item in self.value
+
+
+class MemoryBackend:
+    """Fragmente im Prozessspeicher"""
+
+    MAX_ENTRIES = 1000
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or entry[0] < time.time():
+            return None
+        return entry[1]
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        with self._lock:
+            if len(self._entries) >= self.MAX_ENTRIES:
+                self._entries = {k: e for k, e in self._entries.items() if e[0] >= now}
+                if len(self._entries) >= self.MAX_ENTRIES:
+                    self._entries.clear()
+            self._entries[key] = (now + ttl, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """Fragmente in einer SQLite-Datei, gemeinsam für alle Worker-Prozesse"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute('CREATE TABLE IF NOT EXISTS fragment_cache '
+                                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute('SELECT value FROM fragment_cache WHERE key = ? AND expires >= ?',
+                                      (key, time.time())).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        now = time.time()
+        conn = self._connect()
+        conn.execute('INSERT OR REPLACE INTO fragment_cache (key, value, expires) VALUES (?, ?, ?)',
+                     (key, value, now + ttl))
+        conn.execute('DELETE FROM fragment_cache WHERE expires < ?', (now,))
+
+    def clear(self):
+        self._connect().execute('DELETE FROM fragment_cache')
+
+
+class FragmentCache:
+    """Backend, Lebensdauer und Treffer-Zähler"""
+
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, location, name, parts):
+        role = current_user.role if current_user.is_authenticated else None
+        key = repr((location, name, parts, role, current_app.extensions['template_version']))
+        return 'fragment:' + hashlib.sha1(key.encode()).hexdigest()
+
+    def fetch(self, key, render, ttl=None):
+        value = self.backend.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = render()
+        self.backend.set(key, value, ttl or self.ttl)
+        return value
+
+
+class FragmentCacheExtension(Extension):
+    """{% cache name, schlüssel... %} ... {% endcache %}"""
+
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [nodes.Const(f'{parser.name}:{lineno}'), parser.parse_expression()]
+        while parser.stream.skip_if('comma'):
+            args.append(parser.parse_expression())
+
+        body = parser.parse_statements(('name:endcache',), drop_needle=True)
+        return nodes.CallBlock(self.call_method('_render', args), [], [], body).set_lineno(lineno)
+
+    def _render(self, location, name, *parts, caller):
+        cache = current_app.extensions.get('fragment_cache')
+        if cache is None:
+            return caller()
+        return Markup(cache.fetch(cache.make_key(location, name, parts), lambda: str(caller())))
+
+
+def data_version(*sources):
+    """Version der genannten Datenquellen, einmal je Request und Quelle abgefragt"""
+    versions = g.setdefault('data_versions', {})
+    missing = [source for source in sources if source not in versions]
+    if missing:
+        queries = {source: DATA_SOURCES[source]() for source in missing}
+        values, _ = load_version(*[v for source in missing for v in queries[source]])
+        offset = 0
+        for source in missing:
+            width = sum(len(version) for version in queries[source])
+            versions[source] = values[offset:offset + width]
+            offset += width
+    return tuple(versions[source] for source in sources)
+
+
+def cached_value(name, parts, compute, ttl=None):
+    """JSON-serialisierbares Ergebnis von compute() unter (name, parts) cachen"""
+    cache = current_app.extensions.get('fragment_cache')
+    if cache is None:
+        return compute()
+    key = 'value:' + hashlib.sha1(repr((name, parts)).encode()).hexdigest()
+    value = cache.fetch(key, lambda: json.dumps(compute()), ttl)
+    return json.loads(value)
+
+
+def init_app(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.add_template_global(data_version)
+
+    kind = app.config['FRAGMENT_CACHE_BACKEND']
+    if kind == 'none':
+        return
+    if kind == 'sqlite':
+        backend = SQLiteBackend(app.config['FRAGMENT_CACHE_DB'])
+    else:
+        backend = MemoryBackend()
+    app.extensions['fragment_cache'] = FragmentCache(backend, app.config['FRAGMENT_CACHE_TTL'])
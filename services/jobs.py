@@ -0,0 +1,295 @@
+"""
+Hintergrund-Jobs
+Schwere Arbeit (große Exporte, Neuberechnungen, Testdaten) läuft nicht im
+Request, sondern in `flask jobs-worker`. Die Warteschlange ist die Tabelle
+`jobs` in der normalen Datenbank - kein zusätzlicher Dienst nötig.
+
+Aufgaben registrieren sich per Decorator:
+
+    @jobs.task('reports.export_csv')
+    def export_csv(kind):
+        ...
+        return jobs.write_result(filename, text)
+
+und werden aus Blueprints eingereiht:
+
+    job = jobs.enqueue('reports.export_csv', {'kind': 'orders'}, dedup_key='export:orders')
+    db.session.commit()
+
+- Priorität: höher = früher, bei Gleichstand in Reihenfolge des Einreihens
+- Wiederholung mit wachsender Wartezeit bis `max_attempts`
+- `dedup_key`: solange ein Job mit gleichem Schlüssel wartet oder läuft, wird
+  kein zweiter angelegt, sondern der bestehende zurückgegeben
+- Übernahme per bedingtem UPDATE - mehrere Worker-Prozesse sind möglich
+- Wiederkehrende Aufgaben: `jobs.schedule(name, interval)` - der Worker reiht
+  sie ein, wenn seit dem letzten Job gleichen Namens `interval` Sekunden
+  vergangen sind
+"""
+import json
+import os
+import shutil
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, g
+from flask.cli import with_appcontext
+from sqlalchemy import select, update
+
+from models import db, Job
+
+TASKS = {}
+SCHEDULE = {}
+
+RETRY_DELAY = 30  # Sekunden, verdoppelt je Fehlversuch
+MAINTENANCE_INTERVAL = 3600
+SCHEDULE_CHECK_INTERVAL = 60
+
+
+def task(name):
+    """Decorator: Funktion als Job-Aufgabe registrieren"""
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def schedule(name, interval):
+    """Aufgabe alle `interval` Sekunden einreihen (prüft der Worker)"""
+    SCHEDULE[name] = interval
+
+
+def enqueue(name, params=None, priority=0, dedup_key=None, max_attempts=None, run_after=None, user=None):
+    """Job einreihen (ohne Commit - läuft in der Transaktion des Aufrufers)"""
+    if name not in TASKS:
+        raise ValueError(f'Unbekannte Aufgabe: {name}')
+
+    if dedup_key:
+        existing = db.session.execute(
+            select(Job).where(Job.dedup_key == dedup_key, Job.status.in_(['queued', 'running']))
+            .order_by(Job.id).limit(1)
+        ).scalar()
+        if existing is not None:
+            return existing
+
+    job = Job(
+        name=name,
+        params=json.dumps(params or {}),
+        priority=priority,
+        dedup_key=dedup_key,
+        max_attempts=max_attempts or current_app.config['JOB_MAX_ATTEMPTS'],
+        run_after=run_after or datetime.utcnow(),
+        user_id=user.id if user is not None else None,
+    )
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def claim(worker, now=None):
+    """Nächsten fälligen Job übernehmen oder None"""
+    now = now or datetime.utcnow()
+    # Mehrere Versuche: ein anderer Worker kann schneller gewesen sein
+    for _ in range(3):
+        job_id = db.session.execute(
+            select(Job.id).where(Job.status == 'queued', Job.run_after <= now)
+            .order_by(Job.priority.desc(), Job.id).limit(1)
+        ).scalar()
+        if job_id is None:
+            return None
+
+        claimed = db.session.execute(
+            update(Job).where(Job.id == job_id, Job.status == 'queued')
+            .values(status='running', worker=worker, started_at=now, attempts=Job.attempts + 1)
+        ).rowcount
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+    return None
+
+
+def execute(job):
+    """Job ausführen und Ergebnis bzw. Fehler speichern"""
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Unbekannte Aufgabe: {job.name}')
+        # Eigener App-Kontext = eigene Session: Fehler der Aufgabe rollen nur ihre Änderungen zurück
+        with current_app.app_context():
+            g.job = job
+            result = func(**json.loads(job.params))
+            db.session.commit()
+    except Exception:
+        job.error = traceback.format_exc()[-4000:]
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=RETRY_DELAY * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+            job.finished_at = datetime.utcnow()
+        current_app.logger.warning('Job %d (%s) fehlgeschlagen, Versuch %d/%d', job.id, job.name,
+                                   job.attempts, job.max_attempts)
+    else:
+        job.status = 'done'
+        job.result = json.dumps(result) if result is not None else None
+        job.error = None
+        job.finished_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def enqueue_due(now=None):
+    """Fällige geplante Aufgaben einreihen, liefert ihre Namen
+
+    Dedup-Schlüssel ist der Aufgabenname: ein manuell eingereihter Job
+    (gleicher Schlüssel) zählt als Lauf und verschiebt den nächsten.
+    """
+    now = now or datetime.utcnow()
+    due = []
+    for name, interval in SCHEDULE.items():
+        last = db.session.execute(
+            select(Job.status, Job.created_at).where(Job.dedup_key == name)
+            .order_by(Job.id.desc()).limit(1)
+        ).first()
+        if last is not None and (last.status in ('queued', 'running')
+                                 or last.created_at > now - timedelta(seconds=interval)):
+            continue
+        enqueue(name, dedup_key=name)
+        due.append(name)
+    db.session.commit()
+    return due
+
+
+def result_dir(job_id):
+    return os.path.join(current_app.config['JOB_RESULT_DIR'], str(job_id))
+
+
+def write_result(filename, text, mimetype='text/csv'):
+    """Ergebnisdatei des laufenden Jobs schreiben, liefert das Job-Ergebnis"""
+    directory = result_dir(g.job.id)
+    os.makedirs(directory, exist_ok=True)
+    # utf-8-sig: Excel erkennt Umlaute
+    with open(os.path.join(directory, filename), 'w', encoding='utf-8-sig', newline='') as handle:
+        handle.write(text)
+    return {'file': filename, 'mimetype': mimetype, 'size': os.path.getsize(os.path.join(directory, filename))}
+
+
+def requeue_stale(now=None):
+    """Jobs abgestürzter Worker wieder einreihen (bzw. aufgeben)"""
+    now = now or datetime.utcnow()
+    horizon = now - timedelta(seconds=current_app.config['JOB_TIMEOUT'])
+    stale = Job.status == 'running', Job.started_at < horizon
+    failed = db.session.execute(
+        update(Job).where(*stale, Job.attempts >= Job.max_attempts)
+        .values(status='failed', finished_at=now, error='Zeitüberschreitung (Worker abgestürzt?)')
+    ).rowcount
+    requeued = db.session.execute(update(Job).where(*stale).values(status='queued', run_after=now)).rowcount
+    db.session.commit()
+    return requeued, failed
+
+
+def purge(now=None):
+    """Abgeschlossene Jobs und ihre Dateien nach JOB_RETENTION_DAYS löschen"""
+    now = now or datetime.utcnow()
+    horizon = now - timedelta(days=current_app.config['JOB_RETENTION_DAYS'])
+    old = db.session.execute(
+        select(Job).where(Job.status.in_(['done', 'failed']), Job.finished_at < horizon)
+    ).scalars().all()
+    for job in old:
+        shutil.rmtree(result_dir(job.id), ignore_errors=True)
+        db.session.delete(job)
+    db.session.commit()
+    return len(old)
+
+
+def work(app, threads=None, burst=False):
+    """Worker-Pool: Threads holen Jobs, bis Strg+C (bzw. bis die Warteschlange leer ist)"""
+    threads = threads or app.config['JOB_WORKER_THREADS']
+    interval = app.config['JOB_POLL_INTERVAL']
+    name = f'{socket.gethostname()}:{os.getpid()}'
+    stop = threading.Event()
+    done = []
+
+    def loop(number):
+        maintained = scheduled = None
+        while not stop.is_set():
+            with app.app_context():
+                if number == 0 and (maintained is None or time.monotonic() - maintained > MAINTENANCE_INTERVAL):
+                    requeue_stale()
+                    purge()
+                    maintained = time.monotonic()
+                if number == 0 and (scheduled is None or time.monotonic() - scheduled > SCHEDULE_CHECK_INTERVAL):
+                    enqueue_due()
+                    scheduled = time.monotonic()
+                job = claim(f'{name}/{number}')
+                if job is not None:
+                    execute(job)
+                    done.append(job.id)
+                    continue
+            if burst:
+                return
+            stop.wait(interval)
+
+    workers = [threading.Thread(target=loop, args=(number,), daemon=True) for number in range(threads)]
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(0.5)
+    except KeyboardInterrupt:
+        # Laufende Jobs fertig machen, keine neuen übernehmen
+        stop.set()
+        for worker in workers:
+            worker.join()
+    return len(done)
+
+
+@task('seed.generate')
+def seed_generate(scale, orders_per_customer=10, contacts_per_customer=3, seed=42):
+    """Testdaten an die aktuelle Datenbank anhängen"""
+    from seed import generate_dataset
+
+    generate_dataset(scale, orders_per_customer, contacts_per_customer, seed, append=True,
+                     database_url=current_app.config['SQLALCHEMY_DATABASE_URI'])
+    return {'customers': scale}
+
+
+def init_app(app):
+    app.cli.add_command(jobs_worker_command)
+    app.cli.add_command(jobs_enqueue_command)
+
+
+@click.command('jobs-worker')
+@click.option('--threads', type=int, default=None, help='Parallele Jobs (Standard JOB_WORKER_THREADS)')
+@click.option('--burst', is_flag=True, help='Beenden, sobald die Warteschlange leer ist')
+@with_appcontext
+def jobs_worker_command(threads, burst):
+    """Hintergrund-Jobs ausführen"""
+    count = work(current_app._get_current_object(), threads, burst)
+    click.echo(f'{count} Jobs ausgeführt.')
+
+
+@click.command('jobs-enqueue')
+@click.argument('name')
+@click.option('--param', 'params', multiple=True, help='Parameter als key=value (Wert als JSON, sonst Text)')
+@click.option('--priority', type=int, default=0)
+@with_appcontext
+def jobs_enqueue_command(name, params, priority):
+    """Job von der Kommandozeile einreihen, z.B. seed.generate --param scale=10000"""
+    values = {}
+    for param in params:
+        key, _, raw = param.partition('=')
+        try:
+            values[key] = json.loads(raw)
+        except ValueError:
+            values[key] = raw
+    try:
+        job = enqueue(name, values, priority=priority)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    db.session.commit()
+    click.echo(f'Job {job.id} ({name}) eingereiht.')
@@ -0,0 +1,255 @@
+"""
+Transactional Outbox für Bestell-Webhooks
+Anlegen, Statuswechsel und geänderte Summen von Bestellungen werden im selben
+Flush wie die Bestellung in `outbox` geschrieben (eine Zeile je konfiguriertem
+Endpunkt). Der Request wartet also nie auf HTTP; geht die Transaktion
+schief, gibt es auch kein Ereignis.
+
+`flask outbox-dispatch` stellt zu: je Endpunkt die ältesten offenen Ereignisse
+als ein POST {"events": [...]}. Bei Fehlern wartet der Endpunkt mit
+exponentiellem Backoff, nach OUTBOX_MAX_ATTEMPTS Versuchen wird das Ereignis
+als 'failed' abgelegt. Die Reihenfolge je Endpunkt bleibt erhalten.
+
+Deduplizierung: kommt für denselben Schlüssel (z.B. Summe von Bestellung 17)
+ein neues Ereignis, bevor das alte zugestellt ist, wird das alte 'superseded'.
+Zustellung ist "at least once" - Empfänger erkennen Wiederholungen an der
+Ereignis-ID.
+
+Lag-Metriken je Endpunkt: GET /stats/outbox (Admin/Chef).
+"""
+import hashlib
+import hmac
+import json
+import random
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from flask_login import current_user, login_required
+from sqlalchemy import delete, event, func, inspect, select, update
+
+from models import db, Order, OutboxEvent
+
+# Zugestellte Ereignisse so lange aufheben (Nachvollziehbarkeit)
+RETENTION_DAYS = 7
+PURGE_INTERVAL = 3600
+
+
+def _order_payload(order, previous_status=None):
+    payload = {
+        'order_id': order.id,
+        'order_number': order.order_number,
+        'customer_id': order.customer_id,
+        'status': order.status,
+        'total_amount': str(order.total_amount) if order.total_amount is not None else None,
+    }
+    if previous_status is not None:
+        payload['previous_status'] = previous_status
+    return payload
+
+
+def _order_events(db_session):
+    """(Typ, Bestell-ID, Dedup-Schlüssel, Payload) für neue und geänderte Bestellungen"""
+    for obj in db_session.new:
+        if isinstance(obj, Order):
+            yield 'order.created', obj.id, f'order.created:{obj.id}', _order_payload(obj)
+
+    for obj in db_session.dirty:
+        if not isinstance(obj, Order):
+            continue
+        attrs = inspect(obj).attrs
+        status = attrs.status.history
+        if status.has_changes():
+            previous = status.deleted[0] if status.deleted else None
+            if previous != obj.status:
+                yield ('order.status_changed', obj.id, f'order.status_changed:{obj.id}:{obj.status}',
+                       _order_payload(obj, previous))
+        total = attrs.total_amount.history
+        if total.has_changes() and (not total.deleted or total.deleted[0] != obj.total_amount):
+            yield 'order.total_changed', obj.id, f'order.total_changed:{obj.id}', _order_payload(obj)
+
+
+def _after_flush(db_session, flush_context):
+    endpoints = current_app.config['OUTBOX_WEBHOOK_URLS']
+    if not endpoints:
+        return
+    events = list(_order_events(db_session))
+    if not events:
+        return
+
+    now = datetime.utcnow()
+    table = OutboxEvent.__table__
+    # Über die Connection: kein erneuter Flush, gleiche Transaktion
+    connection = db_session.connection()
+    for endpoint in endpoints:
+        for event_type, order_id, dedup_key, payload in events:
+            connection.execute(
+                update(table).where(table.c.endpoint == endpoint, table.c.dedup_key == dedup_key,
+                                    table.c.status == 'pending')
+                .values(status='superseded')
+            )
+            connection.execute(table.insert().values(
+                endpoint=endpoint, event_type=event_type, aggregate_id=order_id,
+                dedup_key=dedup_key, payload=json.dumps(payload), status='pending',
+                attempts=0, next_attempt_at=now, created_at=now,
+            ))
+
+
+def backoff(attempts):
+    """Wartezeit nach `attempts` Fehlversuchen, mit etwas Jitter"""
+    config = current_app.config
+    delay = config['OUTBOX_BACKOFF_BASE'] * 2 ** (attempts - 1) * random.uniform(1.0, 1.2)
+    return timedelta(seconds=min(delay, config['OUTBOX_BACKOFF_MAX']))
+
+
+def _post(endpoint, events):
+    """Batch zustellen, liefert None oder die Fehlermeldung"""
+    body = json.dumps({'events': [{
+        'id': entry.id,
+        'type': entry.event_type,
+        'created_at': entry.created_at.isoformat(),
+        'data': json.loads(entry.payload),
+    } for entry in events]}).encode()
+
+    headers = {'Content-Type': 'application/json', 'User-Agent': 'CRM-Outbox/1.0'}
+    secret = current_app.config['OUTBOX_WEBHOOK_SECRET']
+    if secret:
+        headers['X-Signature'] = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+    request = urllib.request.Request(endpoint, data=body, headers=headers, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=current_app.config['OUTBOX_TIMEOUT']) as response:
+            response.read()
+    except urllib.error.HTTPError as exc:
+        return f'HTTP {exc.code}'
+    except (urllib.error.URLError, OSError) as exc:
+        return str(getattr(exc, 'reason', exc))[:500]
+    return None
+
+
+def dispatch_once(now=None):
+    """Je Endpunkt einen Batch zustellen, liefert Zähler"""
+    now = now or datetime.utcnow()
+    batch_size = current_app.config['OUTBOX_BATCH_SIZE']
+    max_attempts = current_app.config['OUTBOX_MAX_ATTEMPTS']
+    result = {'sent': 0, 'retry': 0, 'failed': 0}
+
+    endpoints = db.session.execute(
+        select(OutboxEvent.endpoint).where(OutboxEvent.status == 'pending').distinct()
+    ).scalars().all()
+
+    for endpoint in endpoints:
+        events = db.session.execute(
+            select(OutboxEvent)
+            .where(OutboxEvent.status == 'pending', OutboxEvent.endpoint == endpoint)
+            .order_by(OutboxEvent.id).limit(batch_size)
+        ).scalars().all()
+        # Backoff gilt für den ganzen Endpunkt, sonst überholen neue Ereignisse alte
+        if not events or events[0].next_attempt_at > now:
+            continue
+
+        error = _post(endpoint, events)
+        if error is None:
+            for entry in events:
+                entry.status = 'sent'
+                entry.sent_at = now
+            result['sent'] += len(events)
+            current_app.logger.info('Outbox: %d Ereignisse an %s, Lag %.1f s', len(events), endpoint,
+                                    (now - events[0].created_at).total_seconds())
+        else:
+            retry_at = now + backoff(events[0].attempts + 1)
+            for entry in events:
+                entry.attempts += 1
+                entry.last_error = error
+                if entry.attempts >= max_attempts:
+                    entry.status = 'failed'
+                    result['failed'] += 1
+                else:
+                    entry.next_attempt_at = retry_at
+                    result['retry'] += 1
+            current_app.logger.warning('Outbox: Zustellung an %s fehlgeschlagen (%s), nächster Versuch %s',
+                                       endpoint, error, retry_at)
+        db.session.commit()
+
+    return result
+
+
+def purge(retention_days=RETENTION_DAYS, now=None):
+    """Zugestellte und überholte Ereignisse nach der Aufbewahrungsfrist löschen"""
+    horizon = (now or datetime.utcnow()) - timedelta(days=retention_days)
+    result = db.session.execute(
+        delete(OutboxEvent).where(OutboxEvent.status.in_(['sent', 'superseded']),
+                                  OutboxEvent.created_at < horizon)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def lag_metrics(now=None):
+    """Offene/fehlgeschlagene Ereignisse und Verzögerung je Endpunkt"""
+    now = now or datetime.utcnow()
+    metrics = {}
+    rows = db.session.execute(
+        select(OutboxEvent.endpoint, OutboxEvent.status, func.count(), func.min(OutboxEvent.created_at))
+        .where(OutboxEvent.status.in_(['pending', 'failed']))
+        .group_by(OutboxEvent.endpoint, OutboxEvent.status)
+    ).all()
+    for endpoint, status, count, oldest in rows:
+        entry = metrics.setdefault(endpoint, {'pending': 0, 'failed': 0, 'lag_seconds': 0.0})
+        entry[status] = count
+        if status == 'pending':
+            # Alter des ältesten noch nicht zugestellten Ereignisses
+            entry['lag_seconds'] = round((now - oldest).total_seconds(), 1)
+    return metrics
+
+
+@login_required
+def outbox_stats():
+    """Outbox-Lag je Endpunkt (JSON, nur Admin/Chef)"""
+    if not current_user.is_chef():
+        return {'error': 'Keine Berechtigung'}, 403
+    return {'endpoints': lag_metrics()}
+
+
+def init_app(app):
+    if not event.contains(db.session, 'after_flush', _after_flush):
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.add_url_rule('/stats/outbox', 'outbox_stats', outbox_stats)
+    app.cli.add_command(outbox_dispatch_command)
+
+
+@click.command('outbox-dispatch')
+@click.option('--once', is_flag=True, help='Nur einen Durchlauf (z.B. per Cronjob)')
+@click.option('--retry-failed', is_flag=True, help="'failed'-Ereignisse erneut zustellen")
+@with_appcontext
+def outbox_dispatch_command(once, retry_failed):
+    """Webhook-Ereignisse aus der Outbox zustellen (Hintergrundprozess)"""
+    if retry_failed:
+        count = db.session.execute(
+            update(OutboxEvent).where(OutboxEvent.status == 'failed')
+            .values(status='pending', attempts=0, next_attempt_at=datetime.utcnow())
+        ).rowcount
+        db.session.commit()
+        click.echo(f'{count} fehlgeschlagene Ereignisse erneut eingeplant.')
+
+    interval = current_app.config['OUTBOX_POLL_INTERVAL']
+    purged_at = None
+    while True:
+        if purged_at is None or time.monotonic() - purged_at > PURGE_INTERVAL:
+            purge()
+            purged_at = time.monotonic()
+
+        result = dispatch_once()
+        if once:
+            click.echo(f"{result['sent']} zugestellt, {result['retry']} erneut geplant, "
+                       f"{result['failed']} fehlgeschlagen.")
+            break
+        # Solange zugestellt wird, sofort weiter - sonst warten
+        if not result['sent']:
+            time.sleep(interval)
+        # Neue Transaktion: sonst sieht SQLite keine neuen Ereignisse
+        db.session.remove()
@@ -0,0 +1,66 @@
+"""
+Parallele Abfragegruppen für Dashboards
+Dashboard und Reports bestehen aus voneinander unabhängigen Abfragen (KPIs,
+Pipeline, letzte Bestellungen, ...). `gather()` führt solche Gruppen auf einem
+begrenzten Thread-Pool gleichzeitig aus - die Antwortzeit nähert sich der
+langsamsten Gruppe statt der Summe aller.
+
+    results = parallel.gather(
+        kpis=(_kpis, history, now),
+        recent_orders=(_recent_orders,),
+    )
+
+- Jede Gruppe läuft in einem eigenen App-Kontext, also mit eigener Session
+  und eigener Connection aus dem Pool
+- Das Replica-Routing des Requests (`g.use_read_replica`) wird übernommen
+- Geladene Modellobjekte werden in die Session des Requests übernommen,
+  Lazy-Loads im Template funktionieren wie gewohnt (besser: vorab joinedload)
+- Gruppen dürfen nicht selbst `gather()` aufrufen (fester Pool)
+
+DASHBOARD_QUERY_THREADS = 0 führt alles nacheinander im Request aus.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from flask import current_app, g
+
+from models import db
+
+
+def _run(app, use_replica, func, args):
+    with app.app_context():
+        g.use_read_replica = use_replica
+        return func(*args)
+
+
+def _attach(value):
+    """Modellobjekte aus dem Worker-Thread an die Request-Session hängen"""
+    if isinstance(value, db.Model):
+        return db.session.merge(value, load=False)
+    if isinstance(value, list) and value and isinstance(value[0], db.Model):
+        return [db.session.merge(obj, load=False) for obj in value]
+    return value
+
+
+def gather(**groups):
+    """Gruppen name=(funktion, *args) ausführen, liefert {name: Ergebnis}"""
+    executor = current_app.extensions.get('parallel_queries')
+    if executor is None or len(groups) < 2:
+        return {name: func(*args) for name, (func, *args) in groups.items()}
+
+    app = current_app._get_current_object()
+    use_replica = g.get('use_read_replica', False)
+    futures = {
+        name: executor.submit(_run, app, use_replica, func, args)
+        for name, (func, *args) in groups.items()
+    }
+    # Erst alle abwarten, dann ggf. die erste Exception weiterreichen
+    wait(futures.values())
+    return {name: _attach(future.result()) for name, future in futures.items()}
+
+
+def init_app(app):
+    threads = app.config['DASHBOARD_QUERY_THREADS']
+    if threads > 0:
+        app.extensions['parallel_queries'] = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='dashboard-query'
+        )
@@ -0,0 +1,148 @@
+"""
+Tägliche Produktumsätze
+`product_sales_daily` hält je (Produkt, Tag) Menge und Umsatz nach Rabatt
+aller nicht stornierten Bestellungen - aktive und archivierte. Produktbericht
+und Kategorie-Auswertungen lesen nur diese Zeilen statt der Historie.
+
+Gepflegt wird im Flush: vor dem Flush werden die Beiträge der betroffenen
+Bestellungen aus der Datenbank gelesen, danach erneut; die Differenz wird
+addiert. Damit sind neue, geänderte und gelöschte Positionen ebenso abgedeckt
+wie Statuswechsel (Storno), geändertes Bestelldatum und gelöschte
+Bestellungen - in derselben Transaktion wie die Änderung.
+
+Die Archivierung verschiebt Bestellungen nur (Core-Statements, keine Events)
+und ändert die Summen nicht. Massenimporte am ORM vorbei (Generator in
+seed.py) bauen die Tabelle danach neu auf: `flask product-sales-rebuild`.
+"""
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import and_, delete, event, func, insert, inspect, select, tuple_, update
+
+from models import db, Order, OrderItem, ProductSalesDaily
+from services import archive
+
+STATE_KEY = 'product_sales_before'
+
+
+def line_revenue(quantity, unit_price, discount):
+    """Zeilenumsatz nach Rabatt (Rabatt in %), auf Cent gerundet"""
+    return func.round(quantity * unit_price * (100 - func.coalesce(discount, 0)) / 100, 2)
+
+
+def _day(column):
+    return func.date(column, type_=db.Date)
+
+
+def affected_orders(db_session):
+    """IDs der Bestellungen, deren Positionen oder Kopfdaten sich ändern"""
+    ids = set()
+    for obj in list(db_session.new) + list(db_session.dirty) + list(db_session.deleted):
+        if isinstance(obj, Order):
+            ids.add(obj.id)
+        elif isinstance(obj, OrderItem):
+            ids.add(obj.order_id)
+            # Über die Beziehung zugeordnet, order_id erst nach dem Flush gesetzt
+            order = inspect(obj).attrs.order.loaded_value
+            if isinstance(order, Order):
+                ids.add(order.id)
+            # Position in eine andere Bestellung verschoben
+            ids.update(inspect(obj).attrs.order_id.history.deleted)
+    ids.discard(None)
+    return ids
+
+
+def _contributions(connection, order_ids):
+    """{(product_id, day): [Menge, Umsatz]} der Bestellungen laut Datenbank"""
+    if not order_ids:
+        return {}
+    day = _day(Order.order_date)
+    rows = connection.execute(
+        select(OrderItem.product_id, day,
+               func.sum(OrderItem.quantity),
+               func.sum(line_revenue(OrderItem.quantity, OrderItem.unit_price, OrderItem.discount)))
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(Order.id.in_(order_ids), Order.status != 'Storniert')
+        .group_by(OrderItem.product_id, day)
+    ).all()
+    return {(product_id, day): [int(quantity), Decimal(str(revenue or 0))]
+            for product_id, day, quantity, revenue in rows}
+
+
+def _before_flush(db_session, flush_context, instances):
+    ids = affected_orders(db_session)
+    # Stand vor dem Flush; Connection statt Query - kein Autoflush
+    db_session.info[STATE_KEY] = (ids, _contributions(db_session.connection(), ids) if ids else {})
+
+
+def _after_flush(db_session, flush_context):
+    before_ids, before = db_session.info.pop(STATE_KEY, (set(), {}))
+    # Neue Bestellungen haben erst jetzt eine ID
+    ids = before_ids | affected_orders(db_session)
+    if not ids:
+        return
+
+    connection = db_session.connection()
+    after = _contributions(connection, ids)
+    deltas = {}
+    for key in set(before) | set(after):
+        old = before.get(key, [0, Decimal(0)])
+        new = after.get(key, [0, Decimal(0)])
+        if old != new:
+            deltas[key] = (new[0] - old[0], new[1] - old[1])
+    if deltas:
+        apply(connection, deltas)
+
+
+def apply(connection, deltas):
+    """Differenzen {(product_id, day): (Menge, Umsatz)} addieren"""
+    table = ProductSalesDaily.__table__
+    for (product_id, day), (quantity, revenue) in deltas.items():
+        key = and_(table.c.product_id == product_id, table.c.day == day)
+        updated = connection.execute(
+            update(table).where(key)
+            .values(quantity=table.c.quantity + quantity, revenue=table.c.revenue + revenue)
+        ).rowcount
+        if not updated:
+            connection.execute(table.insert().values(
+                product_id=product_id, day=day, quantity=quantity, revenue=revenue
+            ))
+    # Tage ohne Verkäufe nicht aufheben
+    connection.execute(delete(table).where(
+        tuple_(table.c.product_id, table.c.day).in_(list(deltas)), table.c.quantity == 0
+    ))
+
+
+def rebuild():
+    """Tabelle aus aktiven und archivierten Bestellungen neu aufbauen (ohne Commit)"""
+    orders = archive.order_history()
+    items = archive.order_item_history()
+    day = _day(orders.c.order_date)
+
+    db.session.execute(delete(ProductSalesDaily))
+    db.session.execute(insert(ProductSalesDaily).from_select(
+        ['product_id', 'day', 'quantity', 'revenue'],
+        select(items.c.product_id, day, func.sum(items.c.quantity),
+               func.sum(line_revenue(items.c.quantity, items.c.unit_price, items.c.discount)))
+        .join(orders, orders.c.id == items.c.order_id)
+        .where(orders.c.status != 'Storniert')
+        .group_by(items.c.product_id, day)
+    ))
+    return db.session.query(func.count()).select_from(ProductSalesDaily).scalar()
+
+
+def init_app(app):
+    if not event.contains(db.session, 'before_flush', _before_flush):
+        event.listen(db.session, 'before_flush', _before_flush)
+        event.listen(db.session, 'after_flush', _after_flush)
+    app.cli.add_command(product_sales_rebuild_command)
+
+
+@click.command('product-sales-rebuild')
+@with_appcontext
+def product_sales_rebuild_command():
+    """Tägliche Produktumsätze aus der Bestellhistorie neu aufbauen"""
+    count = rebuild()
+    db.session.commit()
+    click.echo(f'{count} Tageszeilen aufgebaut.')
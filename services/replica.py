@@ -0,0 +1,218 @@
+"""
+Read-Replica Routing
+Leitet Lesezugriffe der rein lesenden Views (Dashboard, Reports) auf eine
+zweite Datenbank um. Fällt automatisch auf die Primärdatenbank zurück, wenn
+das Replica nicht erreichbar ist oder zu weit hinterherhinkt.
+
+Lag-Messung:
+- PostgreSQL-Standby: `pg_last_xact_replay_timestamp()` (0, wenn alles
+  Empfangene eingespielt ist)
+- sonst: Heartbeat-Zeile `replica_heartbeat`, die `flask replica-heartbeat`
+  auf der Primär-DB alle READ_REPLICA_HEARTBEAT_INTERVAL Sekunden schreibt;
+  Lag = Primär-Marke - Replica-Marke. Ohne (aktuellen) Heartbeat gilt das
+  Replica als nicht verwendbar.
+"""
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import click
+from flask import current_app, g, has_app_context
+from flask.cli import with_appcontext
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, insert, select, text, update
+
+REPLICA_BIND = 'replica'
+
+
+class ReplicaState:
+    """Zwischengespeicherter Gesundheitszustand des Replicas"""
+
+    def __init__(self, max_lag, check_interval):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.healthy = False
+        self.lag = None
+        self.checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def mark_down(self):
+        """Replica bis zur nächsten Prüfung sperren"""
+        with self._lock:
+            self.healthy = False
+            self.checked_at = time.monotonic()
+
+    def is_available(self, db):
+        """Prüfe (höchstens alle check_interval Sekunden) Erreichbarkeit und Lag"""
+        if time.monotonic() - self.checked_at < self.check_interval:
+            return self.healthy
+
+        with self._lock:
+            if time.monotonic() - self.checked_at < self.check_interval:
+                return self.healthy
+            self.lag = _measure_lag(db, self.max_lag)
+            self.healthy = self.lag is not None and self.lag <= self.max_lag
+            self.checked_at = time.monotonic()
+            if not self.healthy:
+                current_app.logger.warning('Read-Replica nicht verwendbar (Lag: %s)', self.lag)
+            return self.healthy
+
+
+# Auf einem Standby: 0, wenn alles Empfangene eingespielt ist, sonst Alter der
+# letzten eingespielten Transaktion. Auf einer Primär-DB NULL.
+PG_REPLAY_LAG = text(
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) END'
+)
+
+
+def _native_lag(connection):
+    """Lag laut Datenbank (PostgreSQL-Standby) oder None"""
+    if connection.dialect.name != 'postgresql':
+        return None
+    value = connection.execute(PG_REPLAY_LAG).scalar()
+    return None if value is None else float(value)
+
+
+def _heartbeat(connection):
+    """Letzte Heartbeat-Marke oder None"""
+    from models import ReplicaHeartbeat
+
+    value = connection.execute(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)).scalar()
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    return value
+
+
+def beat(db, now=None):
+    """Heartbeat auf der Primär-DB schreiben"""
+    from models import ReplicaHeartbeat
+
+    table = ReplicaHeartbeat.__table__
+    now = now or datetime.utcnow()
+    with db.engines[None].begin() as conn:
+        if not conn.execute(update(table).where(table.c.id == 1).values(beat_at=now)).rowcount:
+            conn.execute(insert(table).values(id=1, beat_at=now))
+
+
+def _measure_lag(db, max_lag):
+    """Lag in Sekunden zwischen Primär-DB und Replica, None wenn nicht messbar"""
+    try:
+        with db.engines[REPLICA_BIND].connect() as conn:
+            lag = _native_lag(conn)
+            if lag is not None:
+                return max(lag, 0)
+            replica_mark = _heartbeat(conn)
+        with db.engines[None].connect() as conn:
+            primary_mark = _heartbeat(conn)
+    except Exception as exc:
+        current_app.logger.warning('Read-Replica Prüfung fehlgeschlagen: %s', exc)
+        return None
+
+    if primary_mark is None or replica_mark is None:
+        current_app.logger.warning('Kein Replica-Heartbeat - läuft `flask replica-heartbeat`?')
+        return None
+    # Steht der Heartbeat, sind gleiche Marken kein Beleg für ein aktuelles Replica
+    if (datetime.utcnow() - primary_mark).total_seconds() > max_lag:
+        current_app.logger.warning('Replica-Heartbeat veraltet (%s)', primary_mark)
+        return None
+    return max((primary_mark - replica_mark).total_seconds(), 0)
+
+
+class RoutingSession(Session):
+    """Session, die Lesezugriffe bei aktivem Replica-Routing umleitet"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _replica_requested():
+            db = current_app.extensions['sqlalchemy']
+            state = current_app.extensions.get('read_replica')
+            if state is not None and state.is_available(db):
+                return db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _replica_requested():
+    return has_app_context() and g.get('use_read_replica', False)
+
+
+def route_to_replica():
+    """before_request-Hook für rein lesende Blueprints"""
+    g.use_read_replica = True
+
+
+@contextmanager
+def use_primary():
+    """Replica-Routing für einen Block deaktivieren (z.B. User-Laden nach Login)"""
+    previous = g.get('use_read_replica', False)
+    g.use_read_replica = False
+    try:
+        yield
+    finally:
+        g.use_read_replica = previous
+
+
+def init_app(app, db):
+    """Replica-Routing aktivieren, falls READ_REPLICA_URL gesetzt ist"""
+    app.cli.add_command(replica_sync_command)
+    app.cli.add_command(replica_heartbeat_command)
+
+    if not app.config.get('READ_REPLICA_URL'):
+        return
+
+    state = ReplicaState(app.config['READ_REPLICA_MAX_LAG'],
+                         app.config['READ_REPLICA_CHECK_INTERVAL'])
+    app.extensions['read_replica'] = state
+
+    with app.app_context():
+        engine = db.engines[REPLICA_BIND]
+
+    @event.listens_for(engine, 'handle_error')
+    def _on_replica_error(context):
+        if context.is_disconnect or context.connection is None:
+            state.mark_down()
+
+
+@click.command('replica-sync')
+@with_appcontext
+def replica_sync_command():
+    """Kopiere die SQLite-Primärdatenbank in die Replica-Datei (lokales Testen)"""
+    if not current_app.config.get('READ_REPLICA_URL'):
+        raise click.ClickException('READ_REPLICA_URL ist nicht gesetzt.')
+
+    db = current_app.extensions['sqlalchemy']
+    primary = db.engines[None].url
+    replica = db.engines[REPLICA_BIND].url
+    if primary.get_backend_name() != 'sqlite' or replica.get_backend_name() != 'sqlite':
+        raise click.ClickException('replica-sync unterstützt nur SQLite-Dateien.')
+
+    # Frische Marke mitkopieren: Lag 0 bis zum nächsten Heartbeat
+    beat(db)
+    source = sqlite3.connect(primary.database)
+    target = sqlite3.connect(replica.database)
+    with target:
+        source.backup(target)
+    source.close()
+    target.close()
+
+    state = current_app.extensions.get('read_replica')
+    if state is not None:
+        state.checked_at = 0.0
+
+    click.echo(f'Replica aktualisiert: {replica.database}')
+
+
+@click.command('replica-heartbeat')
+@click.option('--once', is_flag=True, help='Nur einen Heartbeat schreiben (z.B. per Cronjob)')
+@with_appcontext
+def replica_heartbeat_command(once):
+    """Replikationsmarke auf der Primär-DB schreiben (Hintergrundprozess)"""
+    db = current_app.extensions['sqlalchemy']
+    interval = current_app.config['READ_REPLICA_HEARTBEAT_INTERVAL']
+    while True:
+        beat(db)
+        if once:
+            click.echo('Heartbeat geschrieben.')
+            break
+        time.sleep(interval)
@@ -0,0 +1,170 @@
+"""
+Vorberechnete Kundenkennzahlen
+Customer Score, Health Score, RFM-Segment und nächste Aktion werden nicht je
+Dashboard-Aufruf, sondern vom Job `customers.compute_scores` für alle Kunden
+berechnet und in `customer_scores` abgelegt. Dashboard, Kundenliste und
+Kundendetail lesen nur noch diese Tabelle.
+
+- Der Worker (`flask jobs-worker`) reiht den Job alle CUSTOMER_SCORES_INTERVAL
+  Sekunden ein (0 = nur manuell)
+- Chef/Admin: "Jetzt neu berechnen" im Dashboard
+- Einmalig bzw. per Cronjob ohne Worker: `flask scores-compute`
+
+Die Tabelle wird in einer Transaktion komplett ersetzt - Leser sehen entweder
+den alten oder den neuen Stand.
+"""
+from datetime import datetime
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import case, delete, func, select
+
+from models import db, Customer, CustomerScore
+from services import archive, jobs
+
+TASK = 'customers.compute_scores'
+SEGMENTS = ['Champions', 'Loyal', 'Potential', 'At Risk', 'Lost']
+CHUNK_SIZE = 1000
+
+
+def _customer_score(revenue, grand_total, paid_orders, last_paid_order, now):
+    """Customer Score 0-100
+
+    - Umsatz: 40 (Anteil am Gesamtumsatz in Prozent)
+    - Frequenz: 30 (5 Punkte je Bestellung)
+    - Aktualität: 30 (minus 3 Punkte je 10 Tage seit der letzten Bestellung)
+    """
+    days_since_order = (now - last_paid_order).days if last_paid_order else 999
+    revenue_score = min(revenue / grand_total * 100 if grand_total > 0 else 0, 40)
+    frequency_score = min(paid_orders * 5, 30)
+    recency_score = max(30 - days_since_order / 10, 0)
+    return int(revenue_score + frequency_score + recency_score)
+
+
+def _segment(days_since, order_count, revenue):
+    """RFM-Segment oder None"""
+    if days_since is None:
+        return 'Lost'
+    if days_since < 30 and order_count >= 5 and revenue > 5000:
+        return 'Champions'
+    if days_since < 60 and order_count >= 3:
+        return 'Loyal'
+    if revenue > 3000 and order_count < 3:
+        return 'Potential'
+    if 60 < days_since < 120:
+        return 'At Risk'
+    if days_since > 120:
+        return 'Lost'
+    # z.B. neue Kunden mit kleiner Bestellung
+    return None
+
+
+def _next_action(open_orders, at_risk, segment):
+    """Wichtigste Aktion je Kunde (Reihenfolge wie die Dashboard-Empfehlungen)"""
+    if open_orders:
+        return 'follow_up'
+    if at_risk:
+        return 'reactivate'
+    if segment == 'Champions':
+        return 'reward'
+    if segment == 'Potential':
+        return 'upsell'
+    return None
+
+
+def compute(now=None):
+    """Kennzahlen aller Kunden neu berechnen (ohne Commit), liefert die Anzahl"""
+    now = now or datetime.now()
+    computed_at = datetime.utcnow()
+    history = archive.order_rollup()
+    valid = history.c.status != 'Storniert'
+
+    # Eine gruppierte Abfrage über Hot-Bestellungen und Archiv
+    totals = select(
+        history.c.customer_id,
+        func.sum(case((valid, history.c.revenue), else_=0)).label('revenue'),
+        func.sum(case((valid, history.c.order_count), else_=0)).label('paid_orders'),
+        func.max(case((valid, history.c.last_order_date))).label('last_paid_order'),
+        func.sum(history.c.order_count).label('order_count'),
+        func.max(history.c.last_order_date).label('last_order_date'),
+        func.sum(case((history.c.status == 'Offen', history.c.order_count), else_=0)).label('open_orders'),
+    ).group_by(history.c.customer_id).subquery()
+
+    rows = db.session.execute(
+        select(Customer.id, totals.c.revenue, totals.c.paid_orders, totals.c.last_paid_order,
+               totals.c.order_count, totals.c.last_order_date, totals.c.open_orders)
+        .outerjoin(totals, totals.c.customer_id == Customer.id)
+    ).all()
+    grand_total = sum(float(row.revenue or 0) for row in rows)
+
+    scores = []
+    for row in rows:
+        revenue = float(row.revenue or 0)
+        order_count = int(row.order_count or 0)
+        last_order = row.last_order_date
+        days_since = (now - last_order).days if last_order else None
+
+        # Health Score: 100 - Tage seit letzter Bestellung / 3
+        health = int(max(0, 100 - days_since / 3)) if last_order else None
+        at_risk = days_since is not None and days_since > 60 and health < 40 and revenue > 1000
+        segment = _segment(days_since, order_count, revenue)
+
+        scores.append({
+            'customer_id': row.id,
+            'total_revenue': round(revenue, 2),
+            'order_count': order_count,
+            'open_orders': int(row.open_orders or 0),
+            'last_order_date': last_order,
+            'score': _customer_score(revenue, grand_total, int(row.paid_orders or 0),
+                                     row.last_paid_order, now),
+            'health_score': health,
+            'segment': segment,
+            'at_risk': at_risk,
+            'next_action': _next_action(row.open_orders, at_risk, segment),
+            'computed_at': computed_at,
+        })
+
+    db.session.execute(delete(CustomerScore))
+    for start in range(0, len(scores), CHUNK_SIZE):
+        db.session.execute(CustomerScore.__table__.insert(), scores[start:start + CHUNK_SIZE])
+    return len(scores)
+
+
+def computed_at():
+    """Stand der Kennzahlen oder None, wenn noch nie berechnet"""
+    return db.session.execute(select(func.max(CustomerScore.computed_at))).scalar()
+
+
+def segment_counts():
+    """Anzahl Kunden je Segment (alle Segmente, auch leere)"""
+    counts = dict(db.session.execute(
+        select(CustomerScore.segment, func.count()).group_by(CustomerScore.segment)
+    ).all())
+    return {segment: counts.get(segment, 0) for segment in SEGMENTS}
+
+
+@jobs.task(TASK)
+def compute_scores_job():
+    """Kundenkennzahlen neu berechnen"""
+    return {'customers': compute()}
+
+
+def enqueue(user=None, priority=0):
+    """Neuberechnung einreihen - läuft schon eine, wird keine zweite angelegt"""
+    return jobs.enqueue(TASK, user=user, priority=priority, dedup_key=TASK)
+
+
+def init_app(app):
+    interval = app.config['CUSTOMER_SCORES_INTERVAL']
+    if interval:
+        jobs.schedule(TASK, interval)
+    app.cli.add_command(scores_compute_command)
+
+
+@click.command('scores-compute')
+@with_appcontext
+def scores_compute_command():
+    """Kundenkennzahlen sofort berechnen (ohne Worker)"""
+    count = compute()
+    db.session.commit()
+    click.echo(f'Kennzahlen für {count} Kunden berechnet.')
@@ -0,0 +1,48 @@
+"""
+Template-Cache
+Jinja kompiliert jedes Template beim ersten Rendern pro Prozess. Der
+Bytecode-Cache legt das Kompilat auf der Platte ab, sodass neue Worker es
+nur noch laden; das optionale Warm-up kompiliert alle Templates schon in
+`create_app` statt beim ersten Request.
+
+`app.extensions['template_version']` ist ein Hash über alle Template-Quellen
+und fließt in ETags und Fragment-Cache-Schlüssel ein.
+"""
+import hashlib
+import os
+import time
+
+from jinja2 import FileSystemBytecodeCache
+
+
+def init_app(app):
+    """Bytecode-Cache setzen - muss vor dem ersten Zugriff auf app.jinja_env laufen"""
+    cache_dir = app.config['TEMPLATE_CACHE_DIR']
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        app.jinja_options = {**app.jinja_options,
+                             'bytecode_cache': FileSystemBytecodeCache(cache_dir)}
+
+    app.extensions['template_version'] = source_version(app)
+
+
+def source_version(app):
+    """Templates ändern sich nur mit einem Deploy - Hash über alle Quellen"""
+    loader = app.jinja_loader
+    digest = hashlib.sha1()
+    for name in sorted(loader.list_templates()):
+        source, filename, _ = loader.get_source(None, name)
+        digest.update(name.encode() + source.encode())
+    return digest.hexdigest()[:12]
+
+
+def warm_up(app):
+    """Alle Templates laden und kompilieren, liefert (Anzahl, Sekunden)"""
+    started = time.perf_counter()
+    names = [name for name in app.jinja_env.list_templates() if name.endswith('.html')]
+    for name in names:
+        app.jinja_env.get_template(name)
+
+    elapsed = time.perf_counter() - started
+    app.logger.info('Template-Warm-up: %d Templates in %.0f ms', len(names), elapsed * 1000)
+    return len(names), elapsed
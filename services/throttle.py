@@ -0,0 +1,223 @@
+"""
+Login-Throttling
+Token-Bucket je IP-Adresse und je E-Mail-Adresse. Jeder Login-Versuch
+verbraucht vor der Passwortprüfung ein Token aus beiden Buckets; ist einer
+leer, wird der Versuch ohne Hash-Berechnung abgewiesen. Erfolgreiche Logins
+bekommen ihre Tokens zurück, damit viele Mitarbeiter hinter einer IP sich
+morgens gleichzeitig anmelden können.
+
+Backends:
+- memory: pro Prozess (Standard)
+- sqlite: gemeinsame SQLite-Datei für mehrere Worker-Prozesse
+"""
+import itertools
+import sqlite3
+import threading
+import time
+
+from flask import current_app
+
+COUNTERS = ('attempts', 'rejected_ip', 'rejected_email', 'successes')
+
+
+def _refill(tokens, updated, now, capacity, rate):
+    return min(capacity, tokens + (now - updated) * rate)
+
+
+class MemoryBackend:
+    """Buckets im Prozessspeicher
+
+    Jeder Eintrag trägt Burst und Rate seiner Art (IP/E-Mail) mit. Über
+    MAX_KEYS fallen zuerst volle Buckets weg, danach die am längsten
+    unbenutzten, bis höchstens PRUNE_TO Einträge übrig sind.
+    """
+
+    MAX_KEYS = 10000
+    PRUNE_TO = 7500
+
+    def __init__(self):
+        self._buckets = {}
+        self._counters = dict.fromkeys(COUNTERS, 0)
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        """Ein Token entnehmen -> (erlaubt, Sekunden bis zum nächsten Token)"""
+        with self._lock:
+            tokens, updated, _, _ = self._buckets.get(key, (capacity, now, capacity, rate))
+            tokens = _refill(tokens, updated, now, capacity, rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, capacity, rate)
+                return False, (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1, now, capacity, rate)
+            if len(self._buckets) > self.MAX_KEYS:
+                self._prune(now)
+            return True, 0
+
+    def give(self, key, capacity, now):
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated, capacity, rate = self._buckets[key]
+                self._buckets[key] = (min(capacity, tokens + 1), updated, capacity, rate)
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def counters(self):
+        with self._lock:
+            return dict(self._counters, tracked_keys=len(self._buckets))
+
+    def _prune(self, now):
+        # Volle Buckets entsprechen dem Ausgangszustand und können weg
+        buckets = {key: bucket for key, bucket in self._buckets.items()
+                   if _refill(bucket[0], bucket[1], now, bucket[2], bucket[3]) < bucket[2]}
+        # Harte Grenze (z.B. Credential Stuffing mit vielen E-Mails): älteste zuerst
+        if len(buckets) > self.PRUNE_TO:
+            newest = sorted(buckets.items(), key=lambda item: item[1][1])[-self.PRUNE_TO:]
+            buckets = dict(newest)
+        self._buckets = buckets
+
+
+class SQLiteBackend:
+    """Buckets in einer SQLite-Datei, gemeinsam für alle Worker-Prozesse
+
+    Alle PRUNE_EVERY Schreibvorgänge (je Prozess) werden volle Buckets
+    gelöscht und die Tabelle wie beim MemoryBackend auf PRUNE_TO Zeilen begrenzt.
+    """
+
+    MAX_KEYS = MemoryBackend.MAX_KEYS
+    PRUNE_TO = MemoryBackend.PRUNE_TO
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = itertools.count(1)
+        with self._connect() as conn:
+            columns = {row[1] for row in conn.execute('PRAGMA table_info(throttle_buckets)')}
+            if columns and 'capacity' not in columns:
+                # Altes Schema ohne Burst/Rate - Buckets sind nur Laufzeitzustand
+                conn.execute('DROP TABLE throttle_buckets')
+            conn.execute('CREATE TABLE IF NOT EXISTS throttle_buckets '
+                         '(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, '
+                         'capacity REAL NOT NULL, rate REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS throttle_counters '
+                         '(name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def take(self, key, capacity, rate, now):
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM throttle_buckets WHERE key = ?',
+                               (key,)).fetchone()
+            tokens = _refill(*row, now, capacity, rate) if row else capacity
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO throttle_buckets (key, tokens, updated, capacity, rate) '
+                         'VALUES (?, ?, ?, ?, ?)', (key, tokens, now, capacity, rate))
+            if next(self._writes) % self.PRUNE_EVERY == 0:
+                self._prune(conn, now)
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, 0 if allowed else (1 - tokens) / rate
+
+    def _prune(self, conn, now):
+        conn.execute('DELETE FROM throttle_buckets WHERE tokens + (? - updated) * rate >= capacity',
+                     (now,))
+        count = conn.execute('SELECT COUNT(*) FROM throttle_buckets').fetchone()[0]
+        if count > self.MAX_KEYS:
+            conn.execute('DELETE FROM throttle_buckets WHERE key IN '
+                         '(SELECT key FROM throttle_buckets ORDER BY updated LIMIT ?)',
+                         (count - self.PRUNE_TO,))
+
+    def give(self, key, capacity, now):
+        self._connect().execute('UPDATE throttle_buckets SET tokens = MIN(capacity, tokens + 1) '
+                                'WHERE key = ?', (key,))
+
+    def incr(self, name):
+        self._connect().execute('INSERT INTO throttle_counters (name, value) VALUES (?, 1) '
+                                'ON CONFLICT(name) DO UPDATE SET value = value + 1', (name,))
+
+    def counters(self):
+        conn = self._connect()
+        counters = dict.fromkeys(COUNTERS, 0)
+        counters.update(conn.execute('SELECT name, value FROM throttle_counters').fetchall())
+        counters['tracked_keys'] = conn.execute('SELECT COUNT(*) FROM throttle_buckets').fetchone()[0]
+        return counters
+
+
+class LoginThrottle:
+    """Token-Buckets für IP und E-Mail eines Login-Versuchs"""
+
+    def __init__(self, backend, ip_limit, email_limit):
+        self.backend = backend
+        # (Burst, Tokens pro Sekunde)
+        self.limits = {'ip': ip_limit, 'email': email_limit}
+
+    def _keys(self, ip, email):
+        return {'ip': f'ip:{ip}', 'email': f'email:{(email or "").strip().lower()}'}
+
+    def check(self, ip, email):
+        """Versuch zulassen? Liefert None oder die Wartezeit in Sekunden"""
+        now = time.time()
+        keys = self._keys(ip, email)
+        self.backend.incr('attempts')
+
+        allowed, retry_after = self.backend.take(keys['ip'], *self.limits['ip'], now)
+        if not allowed:
+            self.backend.incr('rejected_ip')
+            return retry_after
+
+        allowed, retry_after = self.backend.take(keys['email'], *self.limits['email'], now)
+        if not allowed:
+            self.backend.give(keys['ip'], self.limits['ip'][0], now)
+            self.backend.incr('rejected_email')
+            return retry_after
+
+        return None
+
+    def success(self, ip, email):
+        """Erfolgreicher Login - verbrauchte Tokens zurückgeben"""
+        now = time.time()
+        for kind, key in self._keys(ip, email).items():
+            self.backend.give(key, self.limits[kind][0], now)
+        self.backend.incr('successes')
+
+    def stats(self):
+        counters = self.backend.counters()
+        counters['hashes_avoided'] = counters['rejected_ip'] + counters['rejected_email']
+        return counters
+
+
+def get_throttle():
+    """LoginThrottle der App oder None, wenn abgeschaltet"""
+    return current_app.extensions.get('login_throttle')
+
+
+def init_app(app):
+    if not app.config['LOGIN_THROTTLE_ENABLED']:
+        return
+
+    if app.config['LOGIN_THROTTLE_BACKEND'] == 'sqlite':
+        backend = SQLiteBackend(app.config['LOGIN_THROTTLE_DB'])
+    else:
+        backend = MemoryBackend()
+
+    app.extensions['login_throttle'] = LoginThrottle(
+        backend,
+        ip_limit=(app.config['LOGIN_THROTTLE_IP_BURST'],
+                  app.config['LOGIN_THROTTLE_IP_PER_MINUTE'] / 60),
+        email_limit=(app.config['LOGIN_THROTTLE_EMAIL_BURST'],
+                     app.config['LOGIN_THROTTLE_EMAIL_PER_MINUTE'] / 60),
+    )
@@ -0,0 +1,145 @@
+"""
+Zeitreihen für Charts
+Umsatz, Bestellungen, Neukunden und Kontakte je Tag, Woche, Monat oder
+Quartal - eine GROUP BY-Abfrage über Datums-Buckets statt einer Abfrage je
+Zeitraum. Lücken (Zeiträume ohne Zeilen) werden hier mit 0 aufgefüllt.
+
+    GET /reports/timeseries/revenue?granularity=week&from=2026-01-01&to=2026-03-31
+
+Buckets werden in der Datenbank gebildet: PostgreSQL `date_trunc`, SQLite
+`date()` mit Modifikatoren. Wochen beginnen am Montag, jeder Bucket wird
+über sein erstes Datum identifiziert.
+
+Umsatz und Bestellungen enthalten das Archiv: bei Monat/Quartal über die
+Archiv-Monatssummen, bei Tag/Woche zeilengenau über die archivierten
+Bestellungen.
+"""
+from datetime import date, datetime, time, timedelta
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import cast, func
+
+from models import db, Contact, Customer
+from services import archive
+
+GRANULARITIES = ('day', 'week', 'month', 'quarter')
+
+# Kennzahl -> Datenquelle für data_version()/ETag
+METRICS = {
+    'revenue': 'orders',
+    'orders': 'orders',
+    'customers': 'customers',
+    'contacts': 'contacts',
+}
+
+# Zeitraum ohne from/to: so viele Buckets bis heute
+DEFAULT_BUCKETS = {'day': 30, 'week': 12, 'month': 12, 'quarter': 8}
+MAX_BUCKETS = 1000
+
+STEPS = {
+    'day': relativedelta(days=1),
+    'week': relativedelta(weeks=1),
+    'month': relativedelta(months=1),
+    'quarter': relativedelta(months=3),
+}
+
+
+def truncate(day, granularity):
+    """Erstes Datum des Buckets, in dem `day` liegt"""
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    if granularity == 'quarter':
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    return day
+
+
+def bucket(column, granularity):
+    """SQL-Ausdruck für den Bucket-Anfang von `column`"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return func.date(func.date_trunc(granularity, column))
+    if granularity == 'week':
+        # Nächster Sonntag (oder derselbe), 6 Tage zurück = Montag
+        return func.date(column, 'weekday 0', '-6 days')
+    if granularity == 'month':
+        return func.date(column, 'start of month')
+    if granularity == 'quarter':
+        months_back = (cast(func.strftime('%m', column), db.Integer) - 1) % 3
+        return func.date(column, 'start of month', func.printf('-%d months', months_back))
+    return func.date(column)
+
+
+def label(start, granularity):
+    """Anzeigetext des Buckets: 2026-10-19, 2026-W42, 2026-10, 2026-Q4"""
+    if granularity == 'week':
+        year, week, _ = start.isocalendar()
+        return f'{year}-W{week:02d}'
+    if granularity == 'month':
+        return start.strftime('%Y-%m')
+    if granularity == 'quarter':
+        return f'{start.year}-Q{(start.month - 1) // 3 + 1}'
+    return start.isoformat()
+
+
+def buckets(start, end, granularity):
+    """Alle Bucket-Anfänge von `start` bis einschließlich `end`"""
+    current = truncate(start, granularity)
+    result = []
+    while current <= end:
+        result.append(current)
+        current += STEPS[granularity]
+    return result
+
+
+def bucket_count(start, end, granularity):
+    """Anzahl Buckets von `start` bis `end`, ohne sie aufzuzählen"""
+    start, end = truncate(start, granularity), truncate(end, granularity)
+    if granularity == 'day':
+        return (end - start).days + 1
+    if granularity == 'week':
+        return (end - start).days // 7 + 1
+    months = (end.year - start.year) * 12 + end.month - start.month
+    return (months // 3 if granularity == 'quarter' else months) + 1
+
+
+def default_range(granularity, today=None):
+    end = today or date.today()
+    start = truncate(end, granularity) - STEPS[granularity] * (DEFAULT_BUCKETS[granularity] - 1)
+    return start, end
+
+
+def _source(metric, granularity):
+    """(Datumsspalte, Wert, Filter) der Kennzahl"""
+    if metric == 'customers':
+        return Customer.created_at, func.count(), ()
+    if metric == 'contacts':
+        return Contact.contact_time, func.count(), ()
+
+    if granularity in ('month', 'quarter'):
+        # Archiv-Summen liegen auf dem Monatsanfang - für Monat/Quartal exakt
+        history = archive.order_rollup()
+        date_column, amount, count = history.c.period, history.c.revenue, func.sum(history.c.order_count)
+    else:
+        history = archive.order_history()
+        date_column, amount, count = history.c.order_date, history.c.total_amount, func.count()
+    if metric == 'revenue':
+        return date_column, func.sum(amount), (history.c.status != 'Storniert',)
+    return date_column, count, ()
+
+
+def series(metric, granularity, start, end):
+    """[(Bucket-Anfang, Wert)] von `start` bis `end` (Datum, inklusive), lückenlos"""
+    date_column, value, criteria = _source(metric, granularity)
+    first = truncate(start, granularity)
+    key = bucket(date_column, granularity).label('bucket')
+
+    rows = db.session.query(key, value).filter(
+        date_column >= datetime.combine(first, time.min),
+        date_column < datetime.combine(end + timedelta(days=1), time.min),
+        *criteria
+    ).group_by(key).all()
+
+    # SQLite liefert 'YYYY-MM-DD', PostgreSQL ein date
+    values = {str(row_bucket)[:10]: row_value or 0 for row_bucket, row_value in rows}
+    return [(day, values.get(day.isoformat(), 0)) for day in buckets(first, end, granularity)]
@@ -0,0 +1,159 @@
+"""
+User-Cache für Flask-Login
+`load_user` läuft bei jedem Request mit `current_user`. Statt jedes Mal die
+users-Tabelle zu lesen, wird ein schlanker Datensatz (id, name, role,
+is_active, Passwort-Version) pro Prozess mit kurzer TTL zwischengespeichert.
+
+Invalidierung:
+- explizit über `invalidate()` (z.B. in auth.edit_profile)
+- automatisch nach jedem Commit, der einen User ändert oder löscht
+  (Deaktivierung, Rollenwechsel, auch aus der Flask-Shell)
+Andere Worker-Prozesse sehen Änderungen spätestens nach USER_CACHE_TTL.
+"""
+import threading
+import time
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+
+from models import db, User
+
+PENDING_KEY = 'user_cache_invalidate'
+
+
+class CachedUser(UserMixin):
+    """Schlanker Benutzer für current_user
+
+    Nicht zwischengespeicherte Attribute (email, created_at, contacts, ...)
+    laden beim ersten Zugriff den vollständigen User nach.
+    """
+
+    def __init__(self, id, name, role, is_active, password_version):
+        self.id = id
+        self.name = name
+        self.role = role
+        self.active = is_active
+        self.password_version = password_version
+        self._user = None
+
+    @property
+    def is_active(self):
+        return self.active
+
+    def get_id(self):
+        return f'{self.id}:{self.password_version}'
+
+    def is_chef(self):
+        """Prüfe ob User Chef ist"""
+        return self.role in ['Chef', 'Admin']
+
+    def load(self):
+        """Vollständigen User aus der Datenbank (einmal pro Request)"""
+        if self._user is None:
+            self._user = db.session.get(User, self.id)
+        return self._user
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.load(), name)
+
+    def __repr__(self):
+        return f'<CachedUser {self.id}>'
+
+
+class UserCache:
+    """Prozesslokaler TTL-Cache für CachedUser-Datensätze"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id):
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        row = db.session.query(User.id, User.name, User.role, User.is_active,
+                               User.password_version).filter(User.id == user_id).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+
+        record = (row.id, row.name, row.role, bool(row.is_active),
+                  row.password_version)
+        with self._lock:
+            self._entries[user_id] = (time.monotonic() + self.ttl, record)
+        return record
+
+    def invalidate(self, user_id=None):
+        """Einen oder (ohne Argument) alle Einträge verwerfen"""
+        with self._lock:
+            if user_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(user_id, None)
+
+
+def get_cache():
+    return current_app.extensions['user_cache']
+
+
+def invalidate(user_id=None):
+    get_cache().invalidate(user_id)
+
+
+def load_user(user_id):
+    """Flask-Login user_loader: '<id>:<passwort-version>' -> CachedUser oder None
+
+    Sessions mit veralteter Passwort-Version (Passwort geändert) und
+    deaktivierte Benutzer werden abgemeldet.
+    """
+    id_part, _, version = user_id.partition(':')
+    if not id_part.isdigit():
+        return None
+
+    record = get_cache().get(int(id_part))
+    if record is None:
+        return None
+
+    user = CachedUser(*record)
+    if not user.is_active or str(user.password_version) != version:
+        return None
+    return user
+
+
+def _queue_invalidation(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(PENDING_KEY, set()).add(target.id)
+
+
+def _after_commit(session):
+    user_ids = session.info.pop(PENDING_KEY, None)
+    if user_ids:
+        cache = current_app.extensions.get('user_cache')
+        if cache is not None:
+            for user_id in user_ids:
+                cache.invalidate(user_id)
+
+
+def _after_rollback(session):
+    session.info.pop(PENDING_KEY, None)
+
+
+def init_app(app):
+    app.extensions['user_cache'] = UserCache(app.config['USER_CACHE_TTL'])
+
+    if not event.contains(User, 'after_update', _queue_invalidation):
+        event.listen(User, 'after_update', _queue_invalidation)
+        event.listen(User, 'after_delete', _queue_invalidation)
+        event.listen(db.session, 'after_commit', _after_commit)
+        event.listen(db.session, 'after_rollback', _after_rollback)
@@ -0,0 +1,299 @@
+"""
+API Blueprint - JSON-API v1 für Integrationen
+Liste, Einzelabruf und Batch-Abruf je Modell:
+
+    GET /api/v1/orders?fields=order_number,total_amount&include=customer,items&limit=100
+    GET /api/v1/orders?after=<letzte id>            (Keyset-Paginierung)
+    GET /api/v1/customers?ids=3,17,42               (Batch)
+    GET /api/v1/customers/17?include=orders&fields[orders]=order_number,status
+    GET /api/v1/changes?since=<cursor>&entity=orders,contacts   (Change-Feed)
+
+`fields=` lädt nur die angeforderten Spalten, `include=` lädt verknüpfte
+Zeilen mit einer Abfrage je Beziehung (kein N+1). Anmeldung über die normale
+Session (POST /auth/login).
+"""
+from datetime import datetime
+
+from flask import Blueprint, current_app, request, url_for
+from flask_login import current_user
+from sqlalchemy import select
+
+from models import (db, User, Customer, Product, Order, OrderItem, Contact,
+                    ArchivedOrder, ArchivedOrderItem, ChangeLog)
+from services import replica, changelog
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+# Rein lesend -> Read-Replica
+bp.before_request(replica.route_to_replica)
+
+
+class ApiError(Exception):
+    """Fehler mit HTTP-Status, wird als {'error': ...} ausgeliefert"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+class Include:
+    """Beziehung: Zeilen von `resource`, deren `remote_key` gleich `local_key` ist"""
+
+    def __init__(self, resource, local_key, remote_key, many):
+        self.resource = resource
+        self.local_key = local_key
+        self.remote_key = remote_key
+        self.many = many
+
+
+class Resource:
+    """Modell mit den Feldern und Beziehungen, die die API ausliefert"""
+
+    def __init__(self, model, fields, includes=None, private=()):
+        self.model = model
+        self.fields = fields
+        self.includes = includes or {}
+        # Felder nur für Chef/Admin (z.B. Kontaktbewertungen)
+        self.private = private
+
+    def allowed_fields(self):
+        if current_user.is_chef():
+            return self.fields
+        return tuple(name for name in self.fields if name not in self.private)
+
+
+RESOURCES = {
+    'customers': Resource(Customer, (
+        'id', 'first_name', 'last_name', 'email', 'phone', 'company', 'address', 'city',
+        'postal_code', 'country', 'notes', 'rating', 'created_at', 'updated_at',
+    ), includes={
+        'orders': Include('orders', 'id', 'customer_id', many=True),
+        'contacts': Include('contacts', 'id', 'customer_id', many=True),
+        'archived_orders': Include('archived_orders', 'id', 'customer_id', many=True),
+    }),
+    'products': Resource(Product, (
+        'id', 'sku', 'name', 'description', 'base_price', 'category', 'is_active',
+        'created_at', 'updated_at',
+    )),
+    'orders': Resource(Order, (
+        'id', 'order_number', 'customer_id', 'order_date', 'status', 'total_amount', 'notes',
+        'created_at', 'updated_at',
+    ), includes={
+        'customer': Include('customers', 'customer_id', 'id', many=False),
+        'items': Include('order_items', 'id', 'order_id', many=True),
+    }),
+    'order_items': Resource(OrderItem, (
+        'id', 'order_id', 'product_id', 'quantity', 'unit_price', 'discount', 'updated_at',
+    ), includes={
+        'order': Include('orders', 'order_id', 'id', many=False),
+        'product': Include('products', 'product_id', 'id', many=False),
+    }),
+    'archived_orders': Resource(ArchivedOrder, (
+        'id', 'order_number', 'customer_id', 'order_date', 'status', 'total_amount', 'notes',
+        'created_at', 'archived_at',
+    ), includes={
+        'customer': Include('customers', 'customer_id', 'id', many=False),
+        'items': Include('archived_order_items', 'id', 'order_id', many=True),
+    }),
+    'archived_order_items': Resource(ArchivedOrderItem, (
+        'id', 'order_id', 'product_id', 'quantity', 'unit_price', 'discount',
+    ), includes={
+        'product': Include('products', 'product_id', 'id', many=False),
+    }),
+    'contacts': Resource(Contact, (
+        'id', 'customer_id', 'user_id', 'channel', 'subject', 'notes', 'contact_time',
+        'duration_minutes', 'rating', 'created_at', 'updated_at',
+    ), includes={
+        'customer': Include('customers', 'customer_id', 'id', many=False),
+        'user': Include('users', 'user_id', 'id', many=False),
+    }, private=('rating',)),
+    # Ohne password_hash
+    'users': Resource(User, ('id', 'name', 'email', 'role', 'is_active', 'created_at')),
+}
+
+
+@bp.before_request
+def require_login():
+    # JSON statt Redirect auf die Login-Seite
+    if not current_user.is_authenticated:
+        return {'error': 'Nicht angemeldet'}, 401
+
+
+@bp.errorhandler(ApiError)
+def api_error(error):
+    return {'error': error.message}, error.status
+
+
+def _resource(name):
+    if name not in RESOURCES:
+        raise ApiError(f'Unbekannte Ressource: {name}', 404)
+    return RESOURCES[name]
+
+
+def _id_list(raw, name):
+    try:
+        return [int(value) for value in raw.split(',') if value.strip()]
+    except ValueError:
+        raise ApiError(f'{name} erwartet eine Liste von IDs')
+
+
+def _fields(resource, raw):
+    """Angeforderte Felder prüfen - ohne Angabe alle erlaubten"""
+    allowed = resource.allowed_fields()
+    if not raw:
+        return list(allowed)
+
+    fields = [name.strip() for name in raw.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in allowed]
+    if unknown:
+        raise ApiError(f'Unbekannte Felder: {", ".join(unknown)}')
+    # ID immer mitliefern (Paginierung, Zuordnung)
+    return ['id'] + [name for name in fields if name != 'id']
+
+
+def _includes(resource, raw):
+    names = [name.strip() for name in (raw or '').split(',') if name.strip()]
+    unknown = [name for name in names if name not in resource.includes]
+    if unknown:
+        raise ApiError(f'Unbekannte Beziehungen: {", ".join(unknown)}')
+    return names
+
+
+def _value(value):
+    # Datumswerte als ISO 8601 statt HTTP-Datum (Flask-Standard)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _fetch(resource, fields, *criteria, limit=None, includes=()):
+    """Nur die angeforderten Spalten laden, Beziehungen je eine Abfrage"""
+    model = resource.model
+    keys = [resource.includes[name].local_key for name in includes]
+    columns = list(dict.fromkeys(fields + keys))
+
+    query = select(*[getattr(model, name) for name in columns]).where(*criteria).order_by(model.id)
+    if limit is not None:
+        query = query.limit(limit)
+    rows = [dict(row) for row in db.session.execute(query).mappings()]
+
+    for name in includes:
+        _attach(resource, name, rows)
+
+    # Nur für Beziehungen geladene Schlüssel wieder entfernen
+    hidden = [key for key in keys if key not in fields]
+    return [{key: _value(value) for key, value in row.items() if key not in hidden} for row in rows]
+
+
+def _attach(resource, name, rows):
+    include = resource.includes[name]
+    target = RESOURCES[include.resource]
+    values = {row[include.local_key] for row in rows if row[include.local_key] is not None}
+
+    fields = _fields(target, request.args.get(f'fields[{name}]'))
+    related = {}
+    if values:
+        remote = getattr(target.model, include.remote_key)
+        extra = [] if include.remote_key in fields else [include.remote_key]
+        for row in _fetch(target, fields + extra, remote.in_(values)):
+            key = row.pop(include.remote_key) if extra else row[include.remote_key]
+            related.setdefault(key, []).append(row)
+
+    for row in rows:
+        matches = related.get(row[include.local_key], [])
+        row[name] = matches if include.many else (matches[0] if matches else None)
+
+
+@bp.route('/')
+def index():
+    """Verfügbare Ressourcen mit Feldern und Beziehungen"""
+    return {
+        name: {
+            'url': url_for('api.list_resource', resource=name),
+            'fields': list(resource.allowed_fields()),
+            'include': list(resource.includes),
+        }
+        for name, resource in RESOURCES.items()
+    }
+
+
+@bp.route('/changes')
+def changes():
+    """Änderungen nach dem Cursor, je Datensatz zusammengefasst
+
+    Abnehmer speichern `cursor` und fragen damit beim nächsten Sync erneut;
+    geänderte Zeilen holen sie per Batch-Abruf (?ids=...). 'create' und
+    'update' als Upsert behandeln.
+    """
+    since = request.args.get('since', 0, type=int)
+    page_size = current_app.config['CHANGE_FEED_PAGE_SIZE']
+    limit = min(request.args.get('limit', page_size, type=int), page_size)
+    if limit < 1:
+        raise ApiError('limit muss mindestens 1 sein')
+
+    query = select(ChangeLog).where(ChangeLog.id > since)
+    if request.args.get('entity'):
+        entities = [name.strip() for name in request.args['entity'].split(',') if name.strip()]
+        unknown = [name for name in entities if name not in changelog.TRACKED.values()]
+        if unknown:
+            raise ApiError(f'Kein Change-Feed für: {", ".join(unknown)}')
+        query = query.where(ChangeLog.entity.in_(entities))
+
+    rows = db.session.execute(query.order_by(ChangeLog.id).limit(limit + 1)).scalars().all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    # Cursor auch ohne Änderungen zurückgeben, damit der Abnehmer weiterpollen kann
+    cursor = rows[-1].id if rows else since
+
+    next_url = None
+    if has_more:
+        args = request.args.to_dict()
+        args.update(since=cursor, limit=limit)
+        next_url = url_for('api.changes', **args)
+
+    return {'changes': changelog.compact_page(rows), 'cursor': cursor, 'next': next_url}
+
+
+@bp.route('/<resource>')
+def list_resource(resource):
+    """Liste mit Keyset-Paginierung (after=<id>) oder Batch-Abruf (ids=1,2,3)"""
+    res = _resource(resource)
+    fields = _fields(res, request.args.get('fields'))
+    includes = _includes(res, request.args.get('include'))
+    max_size = current_app.config['API_MAX_PAGE_SIZE']
+
+    if 'ids' in request.args:
+        ids = _id_list(request.args['ids'], 'ids')
+        if len(ids) > max_size:
+            raise ApiError(f'Höchstens {max_size} IDs pro Abruf')
+        rows = _fetch(res, fields, res.model.id.in_(ids), includes=includes)
+        found = {row['id'] for row in rows}
+        return {'data': rows, 'missing': [i for i in ids if i not in found]}
+
+    limit = min(request.args.get('limit', current_app.config['API_PAGE_SIZE'], type=int), max_size)
+    after = request.args.get('after', 0, type=int)
+    if limit < 1:
+        raise ApiError('limit muss mindestens 1 sein')
+
+    # Eine Zeile mehr laden, um zu wissen, ob es weitergeht
+    rows = _fetch(res, fields, res.model.id > after, limit=limit + 1, includes=includes)
+    next_url = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        args = request.args.to_dict()
+        args.update(after=rows[-1]['id'], limit=limit)
+        next_url = url_for('api.list_resource', resource=resource, **args)
+
+    return {'data': rows, 'next': next_url}
+
+
+@bp.route('/<resource>/<int:id>')
+def get_resource(resource, id):
+    """Einzelner Datensatz"""
+    res = _resource(resource)
+    rows = _fetch(res, _fields(res, request.args.get('fields')), res.model.id == id,
+                  includes=_includes(res, request.args.get('include')))
+    if not rows:
+        raise ApiError('Nicht gefunden', 404)
+    return {'data': rows[0]}
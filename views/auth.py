@@ -2,11 +2,12 @@
 Auth Blueprint - Authentifizierung
 Login, Logout, Registrierung
 """
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from urllib.parse import urlparse
 
 from models import db, User
+from services import user_cache, throttle
 
 bp = Blueprint('auth', __name__, url_prefix='/auth')
 
@@ -22,6 +23,15 @@ def login():
         password = request.form.get('password')
         remember = request.form.get('remember', False)
         
+        # Über dem Limit: abweisen, bevor ein Passwort-Hash berechnet wird
+        login_throttle = throttle.get_throttle()
+        if login_throttle is not None:
+            retry_after = login_throttle.check(request.remote_addr, email)
+            if retry_after is not None:
+                wait = max(1, round(retry_after))
+                flash(f'Zu viele Anmeldeversuche. Bitte in {wait} Sekunden erneut versuchen.', 'danger')
+                return render_template('auth/login.html'), 429, {'Retry-After': str(wait)}
+        
         user = User.query.filter_by(email=email).first()
         
         if user is None or not user.check_password(password):
@@ -32,6 +42,14 @@ def login():
             flash('Ihr Account ist deaktiviert. Bitte kontaktieren Sie den Administrator.', 'warning')
             return redirect(url_for('auth.login'))
         
+        # Hash auf die aktuellen Parameter umstellen - nur hier ist das Klartext-Passwort bekannt
+        if user.needs_rehash():
+            user.rehash_password(password)
+            db.session.commit()
+        
+        if login_throttle is not None:
+            login_throttle.success(request.remote_addr, email)
+        
         login_user(user, remember=remember)
         flash(f'Willkommen zurück, {user.name}!', 'success')
         
@@ -45,6 +63,20 @@ def login():
     return render_template('auth/login.html')
 
 
+@bp.route('/throttle')
+@login_required
+def throttle_stats():
+    """Zähler des Login-Throttlings (JSON, nur Admin/Chef)"""
+    if not current_user.is_chef():
+        return {'error': 'Keine Berechtigung'}, 403
+    
+    login_throttle = throttle.get_throttle()
+    if login_throttle is None:
+        return {'enabled': False}
+    return {'enabled': True, 'backend': current_app.config['LOGIN_THROTTLE_BACKEND'],
+            **login_throttle.stats()}
+
+
 @bp.route('/logout')
 @login_required
 def logout():
@@ -109,7 +141,9 @@ def profile():
 def edit_profile():
     """Profil bearbeiten"""
     if request.method == 'POST':
-        current_user.name = request.form.get('name')
+        # current_user ist nur der gecachte Datensatz - Änderungen am echten User
+        user = current_user.load()
+        user.name = request.form.get('name')
         
         # Passwort ändern (optional)
         new_password = request.form.get('new_password')
@@ -117,9 +151,14 @@ def edit_profile():
             if len(new_password) < 6:
                 flash('Passwort muss mindestens 6 Zeichen lang sein.', 'danger')
                 return redirect(url_for('auth.edit_profile'))
-            current_user.set_password(new_password)
+            user.set_password(new_password)
         
         db.session.commit()
+        user_cache.invalidate(user.id)
+        if new_password:
+            # Neue Passwort-Version in die eigene Session übernehmen,
+            # andere Sessions dieses Users werden abgemeldet
+            login_user(user, fresh=True)
         flash('Profil aktualisiert.', 'success')
         return redirect(url_for('auth.profile'))
     
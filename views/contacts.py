@@ -7,6 +7,7 @@ from sqlalchemy import desc
 from datetime import datetime
 
 from models import db, Contact, Customer
+from services.conditional import conditional, version_of
 
 bp = Blueprint('contacts', __name__, url_prefix='/contacts')
 
@@ -53,8 +54,17 @@ def list():
                          stats=stats)
 
 
+def _detail_version(id):
+    """Kontakt und Kunde (Name)"""
+    return [
+        version_of(Contact.updated_at, Contact.id == id),
+        version_of(Customer.updated_at, Customer.id == Contact.customer_id, Contact.id == id),
+    ]
+
+
 @bp.route('/<int:id>')
 @login_required
+@conditional(_detail_version)
 def detail(id):
     """Kontaktdetails"""
     contact = Contact.query.get_or_404(id)
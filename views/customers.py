@@ -5,10 +5,13 @@ Detailansicht mit KPIs, Umsatzfilter, Bestellungen und Kontakten
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from sqlalchemy import desc, func
+from sqlalchemy.orm import contains_eager
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 
-from models import db, Customer, Order, Contact
+from models import db, Customer, CustomerScore, Order, Contact, ArchivedOrder, RevenueForecast
+from services import scores, forecast
+from services.conditional import conditional, latest_of, version_of
 
 bp = Blueprint('customers', __name__, url_prefix='/customers')
 
@@ -20,8 +23,24 @@ def list():
     page = request.args.get('page', 1, type=int)
     per_page = 25
     search = request.args.get('q', '').strip()
+    segment = request.args.get('segment', '')
+    at_risk = request.args.get('at_risk', type=int)
     
-    query = Customer.query
+    if segment not in scores.SEGMENTS:
+        segment = ''
+    
+    # Kennzahlen aus customer_scores (Kunden ohne Zeile: noch nicht berechnet).
+    # Mit Filter innerer Join - dann liest SQLite zuerst den Index von customer_scores
+    if segment or at_risk:
+        query = Customer.query.join(Customer.scores)
+    else:
+        query = Customer.query.outerjoin(Customer.scores)
+    query = query.options(contains_eager(Customer.scores))
+    
+    if segment:
+        query = query.filter(CustomerScore.segment == segment)
+    if at_risk:
+        query = query.filter(CustomerScore.at_risk.is_(True))
     
     if search:
         from sqlalchemy import or_
@@ -35,17 +54,36 @@ def list():
             )
         )
     
-    pagination = query.order_by(desc(Customer.created_at)).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Gefilterte Listen (Dashboard-Empfehlungen) nach Umsatz, sonst neueste zuerst
+    if segment or at_risk:
+        query = query.order_by(desc(CustomerScore.total_revenue))
+    else:
+        query = query.order_by(desc(Customer.created_at))
+    pagination = query.paginate(page=page, per_page=per_page, error_out=False)
     
     return render_template('customers/list.html', 
                          pagination=pagination, 
-                         search=search)
+                         search=search,
+                         segment=segment,
+                         at_risk=at_risk)
+
+
+def _detail_version(id):
+    """Kunde, Bestellungen, Kontakte, Archiv und Kennzahlen"""
+    return [
+        version_of(Customer.updated_at, Customer.id == id),
+        version_of(Order.updated_at, Order.customer_id == id),
+        version_of(Contact.updated_at, Contact.customer_id == id),
+        version_of(ArchivedOrder.archived_at, ArchivedOrder.customer_id == id),
+        version_of(CustomerScore.computed_at, CustomerScore.customer_id == id),
+        # Prognosen werden komplett ersetzt - Stand genügt, kein count(*)
+        latest_of(RevenueForecast.computed_at),
+    ]
 
 
 @bp.route('/<int:id>')
 @login_required
+@conditional(_detail_version)
 def detail(id):
     """
     Kunden-Detailansicht mit:
@@ -84,26 +122,30 @@ def detail(id):
     # Letzte Kontakte (Timeline, neueste zuerst)
     contacts = customer.contacts.order_by(desc(Contact.contact_time)).limit(15).all()
     
+    # Archivierte Bestellungen (ältere Historie)
+    archived_orders = customer.archived_orders.order_by(
+        desc(ArchivedOrder.order_date)
+    ).limit(20).all()
+    
     # Letzter Kontakt
     last_contact = contacts[0] if contacts else None
     
     # Statistiken
-    order_count = customer.orders.count()
+    archived_count = customer.archived_orders.count()
+    order_count = customer.orders.count() + archived_count
     contact_count = customer.contacts.count()
     
-    # Durchschnittlicher Bestellwert
+    # Durchschnittlicher Bestellwert (Umsatz gesamt enthält das Archiv)
     avg_order_value = 0
     if order_count > 0:
-        total_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.customer_id == customer.id,
-            Order.status != 'Storniert'
-        ).scalar() or 0
-        avg_order_value = total_revenue / order_count
+        avg_order_value = revenue_total / order_count
     
     return render_template('customers/detail.html',
                          customer=customer,
                          orders=orders,
                          contacts=contacts,
+                         archived_orders=archived_orders,
+                         archived_count=archived_count,
                          last_contact=last_contact,
                          revenue_total=revenue_total,
                          revenue_last_year=revenue_last_year,
@@ -112,7 +154,9 @@ def detail(id):
                          contact_count=contact_count,
                          avg_order_value=avg_order_value,
                          date_from=date_from,
-                         date_to=date_to)
+                         date_to=date_to,
+                         scores=customer.scores,
+                         forecast=forecast.series(customer.id))
 
 
 @bp.route('/new', methods=['GET', 'POST'])
@@ -196,6 +240,21 @@ def delete(id):
     return redirect(url_for('customers.list'))
 
 
+@bp.route('/scores/recompute', methods=['POST'])
+@login_required
+def recompute_scores():
+    """Kundenkennzahlen sofort neu berechnen lassen (nur Admin/Chef)"""
+    if not current_user.is_chef():
+        flash('Keine Berechtigung.', 'danger')
+        return redirect(url_for('main.index'))
+    
+    job = scores.enqueue(user=current_user, priority=20)
+    db.session.commit()
+    
+    flash('Neuberechnung der Kundenkennzahlen eingereiht.', 'info')
+    return redirect(url_for('jobs.detail', id=job.id))
+
+
 @bp.route('/<int:id>/revenue', methods=['GET'])
 @login_required
 def revenue(id):
@@ -0,0 +1,105 @@
+"""
+Jobs Blueprint - Status der Hintergrund-Jobs, Ergebnisse, Einreihen
+"""
+import os
+
+from flask import Blueprint, render_template, redirect, url_for, flash, abort, send_from_directory
+from flask_login import login_required, current_user
+from sqlalchemy import func
+
+from models import db, Job
+from services import jobs
+
+bp = Blueprint('jobs', __name__, url_prefix='/jobs')
+
+EXPORT_TITLES = {'customers': 'Kunden', 'orders': 'Bestellungen', 'contacts': 'Interaktionen'}
+
+
+def _visible_jobs():
+    # Chef/Admin sehen alle Jobs, Mitarbeiter ihre eigenen
+    query = Job.query
+    if not current_user.is_chef():
+        query = query.filter(Job.user_id == current_user.id)
+    return query
+
+
+def _get_job(id):
+    job = _visible_jobs().filter(Job.id == id).first()
+    if job is None:
+        abort(404)
+    return job
+
+
+@bp.route('/')
+@login_required
+def list():
+    """Statusseite: letzte Jobs und Warteschlange"""
+    recent = _visible_jobs().order_by(Job.id.desc()).limit(100).all()
+    counts = dict(db.session.query(Job.status, func.count()).group_by(Job.status).all())
+    return render_template('jobs/list.html', jobs=recent, counts=counts)
+
+
+@bp.route('/<int:id>')
+@login_required
+def detail(id):
+    """Einzelner Job mit Ergebnis bzw. Fehler"""
+    return render_template('jobs/detail.html', job=_get_job(id))
+
+
+@bp.route('/<int:id>/status')
+@login_required
+def status(id):
+    """Status als JSON (zum Abfragen per Skript/JS)"""
+    job = _get_job(id)
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'result': job.result_data,
+        'download': url_for('jobs.download', id=job.id)
+                    if job.status == 'done' and (job.result_data or {}).get('file') else None,
+    }
+
+
+@bp.route('/<int:id>/download')
+@login_required
+def download(id):
+    """Ergebnisdatei eines abgeschlossenen Jobs"""
+    job = _get_job(id)
+    result = job.result_data or {}
+    if job.status != 'done' or 'file' not in result:
+        abort(404)
+    return send_from_directory(os.path.abspath(jobs.result_dir(job.id)), result['file'],
+                               mimetype=result.get('mimetype'), as_attachment=True)
+
+
+@bp.route('/export/<kind>', methods=['POST'])
+@login_required
+def export(kind):
+    """CSV-Export im Hintergrund erstellen"""
+    if kind not in EXPORT_TITLES:
+        abort(404)
+    show_ratings = current_user.is_chef()
+    job = jobs.enqueue('reports.export_csv', {'kind': kind, 'show_ratings': show_ratings},
+                       priority=10, user=current_user,
+                       dedup_key=f'export:{kind}:{current_user.id}')
+    db.session.commit()
+
+    flash(f'Export {EXPORT_TITLES[kind]} wird im Hintergrund erstellt.', 'info')
+    return redirect(url_for('jobs.detail', id=job.id))
+
+
+@bp.route('/recompute-totals', methods=['POST'])
+@login_required
+def recompute_totals():
+    """Bestellsummen neu berechnen (nur Admin/Chef)"""
+    if not current_user.is_chef():
+        flash('Keine Berechtigung.', 'danger')
+        return redirect(url_for('jobs.list'))
+
+    job = jobs.enqueue('orders.recompute_totals', user=current_user, dedup_key='orders.recompute_totals')
+    db.session.commit()
+
+    flash('Neuberechnung der Bestellsummen eingereiht.', 'info')
+    return redirect(url_for('jobs.detail', id=job.id))
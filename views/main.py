@@ -4,13 +4,19 @@ Enthält Übersichten für Kunden, Bestellungen und Kontakte
 """
 from flask import Blueprint, render_template, request, url_for
 from flask_login import login_required, current_user
-from sqlalchemy import desc, func, or_
-from datetime import datetime, timedelta
+from sqlalchemy import desc, func, or_, select
+from sqlalchemy.orm import joinedload
+from datetime import datetime
 
-from models import db, Customer, Order, Contact
+from models import db, Customer, CustomerScore, Order, Contact
+from services import replica, archive, scores, forecast, parallel
+from services.fragment_cache import deferred
 
 bp = Blueprint('main', __name__)
 
+# Dashboard und Suche sind rein lesend -> Read-Replica
+bp.before_request(replica.route_to_replica)
+
 
 @bp.route('/')
 @login_required
@@ -25,13 +31,58 @@ def index():
     """
     now = datetime.now()
     
-    # === KEY METRICS ===
+    # Hot-Bestellungen + Archiv-Monatssummen (Umsätze inkl. archivierter Bestellungen)
+    history = archive.order_rollup()
+    
+    # Unabhängige Abfragegruppen gleichzeitig (services.parallel)
+    results = parallel.gather(
+        stats=(_stats, history, now),
+        lifecycle_stats=(_lifecycle_stats, history),
+        pipeline=(_pipeline, history),
+        # Prognosen sind vorberechnet (services.forecast)
+        forecast=(_forecast,),
+        recent_contacts=(_recent_contacts,),
+        recent_orders=(_recent_orders,),
+        # Scores, Segmente und gefährdete Kunden sind vorberechnet (services.scores)
+        scores_computed_at=(scores.computed_at,),
+    )
+    pipeline, pipeline_revenue = results['pipeline']
+    forecast_next_month, growth_rate = results['forecast']
+    
+    # Abschnitte erst beim Rendern laden - bei einem Treffer im
+    # Fragment-Cache entfallen die Abfragen ganz
+    top_customers = deferred(_top_customers)
+    at_risk_customers = deferred(_at_risk_customers)
+    segments = deferred(scores.segment_counts)
+    channel_counts = deferred(_channel_counts)
+    recommendations = deferred(_recommendations, pipeline, segments)
+    
+    return render_template('index_tabbed.html',
+                         now=now,
+                         stats=results['stats'],
+                         lifecycle_stats=results['lifecycle_stats'],
+                         top_customers=top_customers,
+                         recent_contacts=results['recent_contacts'],
+                         recent_orders=results['recent_orders'],
+                         channel_counts=channel_counts,
+                         at_risk_customers=at_risk_customers,
+                         pipeline=pipeline,
+                         pipeline_revenue=pipeline_revenue,
+                         forecast_next_month=forecast_next_month,
+                         growth_rate=growth_rate * 100,
+                         segments=segments,
+                         recommendations=recommendations,
+                         scores_computed_at=results['scores_computed_at'])
+
+
+def _stats(history, now):
+    """KEY METRICS"""
     total_revenue = db.session.query(
-        func.sum(Order.total_amount)
-    ).filter(Order.status != 'Storniert').scalar() or 0
+        func.sum(history.c.revenue)
+    ).filter(history.c.status != 'Storniert').scalar() or 0
     
     total_customers = Customer.query.count()
-    total_orders = Order.query.count()
+    total_orders = db.session.query(func.sum(history.c.order_count)).scalar() or 0
     total_products = db.session.query(func.count(func.distinct(Order.id))).scalar() or 0
     
     # Neue Kunden diesen Monat
@@ -45,11 +96,11 @@ def index():
     
     # Conversion Rate (Kunden mit Bestellungen / Alle Kunden * 100)
     customers_with_orders = db.session.query(
-        func.count(func.distinct(Order.customer_id))
+        func.count(func.distinct(history.c.customer_id))
     ).scalar() or 0
     conversion_rate = (customers_with_orders / total_customers * 100) if total_customers > 0 else 0
     
-    stats = {
+    return {
         'total_revenue': total_revenue,
         'total_customers': total_customers,
         'total_orders': total_orders,
@@ -59,214 +110,120 @@ def index():
         'avg_order_value': avg_order_value,
         'conversion_rate': conversion_rate
     }
+
+
+def _lifecycle_stats(history):
+    """CUSTOMER LIFECYCLE STAGES"""
+    customers_with_any_order = select(history.c.customer_id)
     
-    # === CUSTOMER LIFECYCLE STAGES ===
     # Lead: Kunden ohne Bestellung, aber mit Kontakten
-    leads = db.session.query(Customer).outerjoin(Order).filter(
-        Order.id == None,
+    leads = Customer.query.filter(
+        ~Customer.id.in_(customers_with_any_order),
         Customer.contacts.any()
     ).count()
     
     # Prospect: Kunden ohne Bestellung und ohne Kontakte (nur angelegt)
-    prospects = db.session.query(Customer).outerjoin(Order).outerjoin(Contact).filter(
-        Order.id == None,
-        Contact.id == None
+    prospects = Customer.query.filter(
+        ~Customer.id.in_(customers_with_any_order),
+        ~Customer.contacts.any()
     ).count()
     
+    # Bestellanzahl je Kunde (inkl. Archiv)
+    order_counts = db.session.query(
+        history.c.customer_id,
+        func.sum(history.c.order_count).label('order_count')
+    ).group_by(history.c.customer_id).subquery()
+    
     # Customer: Kunden mit 1-3 Bestellungen
-    customers_active = db.session.query(Customer).join(Order).group_by(Customer.id).having(
-        func.count(Order.id).between(1, 3)
-    ).count()
+    customers_active = db.session.query(func.count()).select_from(order_counts).filter(
+        order_counts.c.order_count.between(1, 3)
+    ).scalar()
     
     # VIP: Kunden mit 4+ Bestellungen oder Rating >= 4
-    vip_customers = db.session.query(Customer).outerjoin(Order).group_by(Customer.id).having(
-        func.count(Order.id) >= 4
-    ).count()
+    vip_customers = db.session.query(func.count()).select_from(order_counts).filter(
+        order_counts.c.order_count >= 4
+    ).scalar()
     
-    lifecycle_stats = {
+    return {
         'leads': leads,
         'prospects': prospects,
         'customers': customers_active,
         'vip': vip_customers
     }
-    
-    # === TOP CUSTOMERS BY REVENUE ===
-    # Berechne Revenue und Customer Score für jeden Kunden
-    top_customers_data = db.session.query(
-        Customer,
-        func.sum(Order.total_amount).label('total_revenue'),
-        func.count(Order.id).label('order_count'),
-        func.max(Order.order_date).label('last_order_date')
-    ).join(Order).filter(
-        Order.status != 'Storniert'
-    ).group_by(Customer.id).order_by(
-        desc('total_revenue')
-    ).limit(5).all()
-    
-    top_customers = []
-    for customer, revenue, order_count, last_order in top_customers_data:
-        # Customer Score Berechnung:
-        # - Revenue: 40% (normalisiert auf höchsten Umsatz)
-        # - Frequency: 30% (Anzahl Bestellungen)
-        # - Recency: 30% (Tage seit letzter Bestellung)
-        days_since_order = (now - last_order).days if last_order else 999
-        
-        # Konvertiere alle Werte zu float für Berechnungen
-        revenue_float = float(revenue) if revenue else 0
-        total_revenue_float = float(total_revenue) if total_revenue else 0
-        
-        revenue_score = min((revenue_float / total_revenue_float * 100) if total_revenue_float > 0 else 0, 40)
-        frequency_score = min(order_count * 5, 30)  # Max 30 Punkte bei 6+ Orders
-        recency_score = max(30 - (days_since_order / 10), 0)  # Verliere 3 Punkte pro 10 Tage
-        
-        total_score = int(revenue_score + frequency_score + recency_score)
-        
-        top_customers.append({
-            'customer': customer,
-            'total_revenue': revenue,
-            'order_count': order_count,
-            'score': total_score
-        })
-    
-    # === RECENT ACTIVITY (Letzte Kontakte) ===
-    recent_contacts = Contact.query.order_by(
+
+
+def _recent_contacts():
+    """RECENT ACTIVITY (Letzte Kontakte)"""
+    return Contact.query.options(joinedload(Contact.customer)).order_by(
         desc(Contact.contact_time)
     ).limit(10).all()
-    
-    # === RECENT ORDERS ===
-    recent_orders = Order.query.order_by(
+
+
+def _recent_orders():
+    """RECENT ORDERS"""
+    return Order.query.options(joinedload(Order.customer)).order_by(
         desc(Order.order_date)
     ).limit(10).all()
+
+
+def _pipeline(history):
+    """SALES PIPELINE: Bestellungen und Umsatz nach Status"""
+    pipeline_raw = {
+        row.status: row for row in db.session.query(
+            history.c.status,
+            func.sum(history.c.order_count).label('count'),
+            func.sum(history.c.revenue).label('revenue')
+        ).group_by(history.c.status).all()
+    }
     
-    # === CHANNEL COUNTS ===
-    channel_counts = {}
-    for channel in ['Telefon', 'E-Mail', 'Meeting', 'Chat']:
-        channel_counts[channel] = Contact.query.filter_by(channel=channel).count()
-    
-    # === CUSTOMER HEALTH & CHURN RISK ===
-    # Berechne für jeden Kunden: Health Score & Churn Risk
-    all_customers = Customer.query.all()
-    at_risk_customers = []
-    
-    for customer in all_customers:
-        # Tage seit letzter Bestellung
-        last_order = db.session.query(func.max(Order.order_date)).filter(
-            Order.customer_id == customer.id
-        ).scalar()
-        
-        if last_order:
-            days_since_order = (now - last_order).days
-            
-            # Churn Risk: Wenn länger als 60 Tage keine Bestellung
-            if days_since_order > 60:
-                # Berechne Gesamtumsatz
-                total_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-                    Order.customer_id == customer.id,
-                    Order.status != 'Storniert'
-                ).scalar() or 0
-                
-                # Health Score: 0-100
-                # Basis: 100 - (Tage seit letzter Order / 3)
-                health_score = max(0, 100 - (days_since_order / 3))
-                
-                if health_score < 40 and float(total_revenue) > 1000:  # Nur wichtige Kunden
-                    at_risk_customers.append({
-                        'customer': customer,
-                        'days_inactive': days_since_order,
-                        'health_score': int(health_score),
-                        'total_revenue': total_revenue,
-                        'last_order_date': last_order
-                    })
-    
-    # Sortiere nach Revenue (höchste zuerst)
-    at_risk_customers.sort(key=lambda x: float(x['total_revenue']), reverse=True)
-    at_risk_customers = at_risk_customers[:5]  # Top 5 gefährdete Kunden
-    
-    # === SALES PIPELINE ===
-    # Gruppiere Bestellungen nach Status
     pipeline = {
-        'Offen': Order.query.filter_by(status='Offen').count(),
-        'In Bearbeitung': Order.query.filter_by(status='In Bearbeitung').count(),
-        'Bezahlt': Order.query.filter_by(status='Bezahlt').count(),
-        'Storniert': Order.query.filter_by(status='Storniert').count()
+        status: int(pipeline_raw[status].count) if status in pipeline_raw else 0
+        for status in ['Offen', 'In Bearbeitung', 'Bezahlt', 'Storniert']
     }
     
     pipeline_revenue = {
-        'Offen': float(db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status == 'Offen'
-        ).scalar() or 0),
-        'In Bearbeitung': float(db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status == 'In Bearbeitung'
-        ).scalar() or 0),
-        'Bezahlt': float(db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status == 'Bezahlt'
-        ).scalar() or 0)
+        status: float(pipeline_raw[status].revenue or 0) if status in pipeline_raw else 0.0
+        for status in ['Offen', 'In Bearbeitung', 'Bezahlt']
     }
-    
-    # === REVENUE FORECAST (Nächster Monat) ===
-    # Basierend auf durchschnittlichem monatlichen Wachstum
-    last_3_months_revenue = []
-    for i in range(3):
-        month_start = (now - timedelta(days=30*i)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(seconds=1)
-        
-        revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert',
-            Order.order_date >= month_start,
-            Order.order_date <= month_end
-        ).scalar() or 0
-        
-        last_3_months_revenue.append(float(revenue))
-    
-    # Berechne Durchschnitt und Trend
-    avg_monthly_revenue = sum(last_3_months_revenue) / len(last_3_months_revenue) if last_3_months_revenue else 0
-    
-    # Trend: Vergleiche letzten Monat mit vorletztem
-    if len(last_3_months_revenue) >= 2 and last_3_months_revenue[1] > 0:
-        growth_rate = (last_3_months_revenue[0] - last_3_months_revenue[1]) / last_3_months_revenue[1]
-        forecast_next_month = last_3_months_revenue[0] * (1 + growth_rate)
-    else:
-        growth_rate = 0
-        forecast_next_month = avg_monthly_revenue
-    
-    # === CUSTOMER SEGMENTATION (RFM) ===
-    segments = {
-        'Champions': 0,      # Hohe Frequency, Hoher Revenue, Kürzlich aktiv
-        'Loyal': 0,          # Hohe Frequency, mittlerer Revenue
-        'Potential': 0,      # Niedriger Frequency, aber hoher Revenue
-        'At Risk': 0,        # War aktiv, jetzt inaktiv
-        'Lost': 0            # Lange inaktiv
-    }
-    
-    for customer in all_customers:
-        last_order = db.session.query(func.max(Order.order_date)).filter(
-            Order.customer_id == customer.id
-        ).scalar()
-        
-        order_count = Order.query.filter_by(customer_id=customer.id).count()
-        
-        total_revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.customer_id == customer.id,
-            Order.status != 'Storniert'
-        ).scalar() or 0
-        
-        if last_order:
-            days_since = (now - last_order).days
-            
-            if days_since < 30 and order_count >= 5 and float(total_revenue) > 5000:
-                segments['Champions'] += 1
-            elif days_since < 60 and order_count >= 3:
-                segments['Loyal'] += 1
-            elif float(total_revenue) > 3000 and order_count < 3:
-                segments['Potential'] += 1
-            elif days_since > 60 and days_since < 120:
-                segments['At Risk'] += 1
-            elif days_since > 120:
-                segments['Lost'] += 1
-        else:
-            segments['Lost'] += 1
-    
-    # === NEXT BEST ACTIONS ===
+    return pipeline, pipeline_revenue
+
+
+def _forecast():
+    """REVENUE FORECAST (Nächster Monat, vorberechnet), liefert (Prognose, Wachstumsrate)
+
+    Wachstum gegenüber der Prognose für den laufenden Monat; ohne Berechnung (None, 0).
+    """
+    values = [float(revenue) for _, revenue in forecast.series()]
+    if len(values) < 2:
+        return None, 0
+    growth_rate = (values[1] - values[0]) / values[0] if values[0] > 0 else 0
+    return values[1], growth_rate
+
+
+def _top_customers():
+    """Top 5 Kunden nach Umsatz mit Customer Score (aus customer_scores)"""
+    return CustomerScore.query.options(joinedload(CustomerScore.customer)).filter(
+        CustomerScore.total_revenue > 0
+    ).order_by(desc(CustomerScore.total_revenue)).limit(5).all()
+
+
+def _channel_counts():
+    """Anzahl Kontakte je Kanal"""
+    channel_counts = {}
+    for channel in ['Telefon', 'E-Mail', 'Meeting', 'Chat']:
+        channel_counts[channel] = Contact.query.filter_by(channel=channel).count()
+    return channel_counts
+
+
+def _at_risk_customers():
+    """Customer Health & Churn Risk: Top 5 gefährdete Kunden nach Umsatz"""
+    return CustomerScore.query.options(joinedload(CustomerScore.customer)).filter(
+        CustomerScore.at_risk.is_(True)
+    ).order_by(desc(CustomerScore.total_revenue)).limit(5).all()
+
+
+def _recommendations(pipeline, segments):
+    """Next Best Actions"""
     recommendations = []
     
     # 1. Offene Bestellungen follow-up
@@ -281,13 +238,14 @@ def index():
         })
     
     # 2. At-Risk Kunden kontaktieren
-    if len(at_risk_customers) > 0:
+    at_risk_count = CustomerScore.query.filter(CustomerScore.at_risk.is_(True)).count()
+    if at_risk_count > 0:
         recommendations.append({
             'icon': '⚠️',
             'title': 'At-Risk Kunden reaktivieren',
-            'description': f'{len(at_risk_customers)} wertvolle Kunden sind inaktiv',
+            'description': f'{at_risk_count} wertvolle Kunden sind inaktiv',
             'priority': 'high',
-            'action_url': url_for('customers.list')
+            'action_url': url_for('customers.list', at_risk=1)
         })
     
     # 3. Champions belohnen
@@ -297,7 +255,7 @@ def index():
             'title': 'Champion-Kunden belohnen',
             'description': f'{segments["Champions"]} Top-Kunden verdienen besondere Aufmerksamkeit',
             'priority': 'medium',
-            'action_url': url_for('customers.list')
+            'action_url': url_for('customers.list', segment='Champions')
         })
     
     # 4. Potenzial-Kunden entwickeln
@@ -307,24 +265,9 @@ def index():
             'title': 'Upselling-Chancen nutzen',
             'description': f'{segments["Potential"]} Kunden mit hohem Umsatzpotenzial',
             'priority': 'medium',
-            'action_url': url_for('customers.list')
+            'action_url': url_for('customers.list', segment='Potential')
         })
-    
-    return render_template('index_tabbed.html',
-                         now=now,
-                         stats=stats,
-                         lifecycle_stats=lifecycle_stats,
-                         top_customers=top_customers,
-                         recent_contacts=recent_contacts,
-                         recent_orders=recent_orders,
-                         channel_counts=channel_counts,
-                         at_risk_customers=at_risk_customers,
-                         pipeline=pipeline,
-                         pipeline_revenue=pipeline_revenue,
-                         forecast_next_month=forecast_next_month,
-                         growth_rate=growth_rate * 100,
-                         segments=segments,
-                         recommendations=recommendations)
+    return recommendations
 
 
 @bp.route('/search')
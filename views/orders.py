@@ -3,12 +3,14 @@ Orders Blueprint - Bestellungsverwaltung
 """
 from flask import Blueprint, render_template, redirect, url_for, flash, request, make_response
 from flask_login import login_required, current_user
-from sqlalchemy import desc, or_
+from sqlalchemy import desc, or_, func
 from datetime import datetime
 import csv
 import io
 
-from models import db, Order, OrderItem, Customer, Product
+from models import db, Order, OrderItem, Customer, Product, ArchivedOrder, ArchivedOrderItem
+from services import jobs
+from services.conditional import conditional, version_of
 
 bp = Blueprint('orders', __name__, url_prefix='/orders')
 
@@ -55,8 +57,30 @@ def list():
                          stats=stats)
 
 
+def _order_version(id):
+    """Bestellung, Positionen, deren Produkte und Kunde"""
+    return [
+        version_of(Order.updated_at, Order.id == id),
+        version_of(OrderItem.updated_at, OrderItem.order_id == id),
+        version_of(Product.updated_at, Product.id == OrderItem.product_id, OrderItem.order_id == id),
+        version_of(Customer.updated_at, Customer.id == Order.customer_id, Order.id == id),
+    ]
+
+
+def _archived_order_version(id):
+    """Archivierte Bestellungen ändern sich nicht mehr - nur Produkte und Kunde"""
+    return [
+        version_of(ArchivedOrder.archived_at, ArchivedOrder.id == id),
+        version_of(Product.updated_at, Product.id == ArchivedOrderItem.product_id,
+                   ArchivedOrderItem.order_id == id),
+        version_of(Customer.updated_at, Customer.id == ArchivedOrder.customer_id,
+                   ArchivedOrder.id == id),
+    ]
+
+
 @bp.route('/<int:id>')
 @login_required
+@conditional(_order_version)
 def detail(id):
     """Bestelldetails"""
     order = Order.query.get_or_404(id)
@@ -78,14 +102,19 @@ def new():
         
         customer = Customer.query.get_or_404(customer_id)
         
-        # Generiere Bestellnummer
+        # Generiere Bestellnummer (archivierte Nummern nicht wiederverwenden)
         year = datetime.now().year
-        last_order = Order.query.filter(
-            Order.order_number.like(f'A-{year}%')
-        ).order_by(desc(Order.order_number)).first()
+        last_number = max(
+            db.session.query(func.max(Order.order_number)).filter(
+                Order.order_number.like(f'A-{year}%')
+            ).scalar() or '',
+            db.session.query(func.max(ArchivedOrder.order_number)).filter(
+                ArchivedOrder.order_number.like(f'A-{year}%')
+            ).scalar() or ''
+        )
         
-        if last_order:
-            last_num = int(last_order.order_number.split('-')[1])
+        if last_number:
+            last_num = int(last_number.split('-')[1])
             order_number = f'A-{last_num + 1}'
         else:
             order_number = f'A-{year}001'
@@ -204,11 +233,37 @@ def delete(id):
     return redirect(url_for('orders.list'))
 
 
+@bp.route('/archive/<int:id>')
+@login_required
+@conditional(_archived_order_version)
+def archived_detail(id):
+    """Details einer archivierten Bestellung (nur lesend)"""
+    order = ArchivedOrder.query.get_or_404(id)
+    items = order.items.all()
+    
+    return render_template('orders/detail.html', order=order, items=items, archived=True)
+
+
 @bp.route('/<int:id>/export_csv')
 @login_required
+@conditional(_order_version)
 def export_csv(id):
     """CSV-Export der Bestellung"""
     order = Order.query.get_or_404(id)
+    return _order_csv(order)
+
+
+@bp.route('/archive/<int:id>/export_csv')
+@login_required
+@conditional(_archived_order_version)
+def archived_export_csv(id):
+    """CSV-Export einer archivierten Bestellung"""
+    order = ArchivedOrder.query.get_or_404(id)
+    return _order_csv(order)
+
+
+def _order_csv(order):
+    """CSV-Response für eine (aktive oder archivierte) Bestellung"""
     items = order.items.all()
     
     # CSV erstellen
@@ -242,3 +297,32 @@ def export_csv(id):
     response.headers['Content-Disposition'] = f'attachment; filename=bestellung_{order.order_number}.csv'
     
     return response
+
+
+@jobs.task('orders.recompute_totals')
+def recompute_totals(batch_size=500):
+    """Summen aller aktiven Bestellungen aus den Positionen neu berechnen"""
+    checked = changed = 0
+    last_id = 0
+    while True:
+        orders = Order.query.filter(Order.id > last_id).order_by(Order.id).limit(batch_size).all()
+        if not orders:
+            break
+        last_id = orders[-1].id
+        
+        items = {}
+        for item in OrderItem.query.filter(OrderItem.order_id.between(orders[0].id, last_id)):
+            items.setdefault(item.order_id, []).append(item)
+        
+        for order in orders:
+            # Dieselbe Formel wie beim Bearbeiten der Positionen
+            total = order.calculate_total(items.get(order.id, []))
+            if order.total_amount != total:
+                order.total_amount = total
+                changed += 1
+        checked += len(orders)
+        # Je Batch committen: kurze Schreibsperren, Fortschritt bleibt erhalten
+        db.session.commit()
+    
+    return {'checked': checked, 'changed': changed}
+
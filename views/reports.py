@@ -1,18 +1,33 @@
 """
 Reports Blueprint - Berichte und Dashboard
 """
-from flask import Blueprint, render_template, make_response
+from flask import Blueprint, render_template, make_response, request, flash, abort
 from flask_login import login_required, current_user
-from sqlalchemy import func, extract, desc
-from datetime import datetime, timedelta
+from sqlalchemy import func, extract, desc, select, and_, union_all, null, literal
+from sqlalchemy.orm import joinedload
+from datetime import date, datetime, timedelta
 from dateutil.relativedelta import relativedelta
 import csv
 import io
 
-from models import db, Order, Customer, Contact, Product
+from models import db, Order, Customer, Contact, Product, ArchivedOrder, ArchivedOrderSummary, ProductSalesDaily
+from services import replica, archive, jobs, parallel, timeseries, cube, forecast
+from services.conditional import conditional
+from services.fragment_cache import deferred, cached_value, DATA_SOURCES
 
 bp = Blueprint('reports', __name__, url_prefix='/reports')
 
+# Reports sind rein lesend -> Read-Replica
+bp.before_request(replica.route_to_replica)
+
+# Kundenbericht: so viele Kunden ohne Bestellungen anzeigen
+NO_ORDERS_LIMIT = 100
+
+# Kohortenbericht: Standard- und Höchstzahl Monate, Ergebnis gilt einen Tag
+COHORT_MONTHS = 12
+COHORT_MONTHS_MAX = 36
+COHORT_CACHE_TTL = 24 * 3600
+
 
 @bp.route('/')
 @login_required
@@ -28,114 +43,151 @@ def index():
     last_year_start = this_year_start - relativedelta(years=1)
     last_year_end = this_year_start - timedelta(seconds=1)
     
-    # KPIs berechnen
-    kpis = {
-        # Umsatz
-        'revenue_total': db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert'
+    # Hot-Bestellungen + Archiv-Monatssummen (Zeiträume liegen auf Monatsgrenzen)
+    history = archive.order_rollup()
+    
+    # KPIs und neueste Aktivitäten: unabhängige Gruppen gleichzeitig (services.parallel)
+    periods = this_month_start, last_month_start, last_month_end, this_year_start, last_year_start, last_year_end
+    results = parallel.gather(
+        revenue=(_revenue_kpis, history, *periods),
+        orders=(_order_kpis, history, this_month_start),
+        customers=(_customer_contact_kpis, this_month_start),
+        recent_orders=(_recent_orders,),
+        recent_contacts=(_recent_contacts,),
+    )
+    kpis = {**results['revenue'], **results['orders'], **results['customers']}
+    recent_orders = results['recent_orders']
+    recent_contacts = results['recent_contacts']
+    
+    # Charts und Top 10 erst beim Rendern berechnen (Fragment-Cache)
+    monthly_revenue = deferred(_monthly_revenue, now)
+    top_customers = deferred(_top_customers, history)
+    order_status_stats = deferred(_order_status_stats, history)
+    contact_channel_stats = deferred(_contact_channel_stats)
+    
+    # Durchschnittswerte
+    avg_order_value = kpis['revenue_total'] / kpis['orders_total'] if kpis['orders_total'] > 0 else 0
+    avg_customer_value = kpis['revenue_total'] / kpis['customers_total'] if kpis['customers_total'] > 0 else 0
+    
+    return render_template('reports/dashboard.html',
+                         now=now,
+                         kpis=kpis,
+                         monthly_revenue=monthly_revenue,
+                         top_customers=top_customers,
+                         order_status_stats=order_status_stats,
+                         contact_channel_stats=contact_channel_stats,
+                         recent_orders=recent_orders,
+                         recent_contacts=recent_contacts,
+                         avg_order_value=avg_order_value,
+                         avg_customer_value=avg_customer_value)
+
+
+def _revenue_kpis(history, this_month_start, last_month_start, last_month_end,
+                  this_year_start, last_year_start, last_year_end):
+    """Umsatz"""
+    return {
+        'revenue_total': db.session.query(func.sum(history.c.revenue)).filter(
+            history.c.status != 'Storniert'
         ).scalar() or 0,
-        'revenue_this_month': db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert',
-            Order.order_date >= this_month_start
+        'revenue_this_month': db.session.query(func.sum(history.c.revenue)).filter(
+            history.c.status != 'Storniert',
+            history.c.period >= this_month_start
         ).scalar() or 0,
-        'revenue_last_month': db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert',
-            Order.order_date >= last_month_start,
-            Order.order_date <= last_month_end
+        'revenue_last_month': db.session.query(func.sum(history.c.revenue)).filter(
+            history.c.status != 'Storniert',
+            history.c.period >= last_month_start,
+            history.c.period <= last_month_end
         ).scalar() or 0,
-        'revenue_this_year': db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert',
-            Order.order_date >= this_year_start
+        'revenue_this_year': db.session.query(func.sum(history.c.revenue)).filter(
+            history.c.status != 'Storniert',
+            history.c.period >= this_year_start
         ).scalar() or 0,
-        'revenue_last_year': db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert',
-            Order.order_date >= last_year_start,
-            Order.order_date <= last_year_end
+        'revenue_last_year': db.session.query(func.sum(history.c.revenue)).filter(
+            history.c.status != 'Storniert',
+            history.c.period >= last_year_start,
+            history.c.period <= last_year_end
         ).scalar() or 0,
-        
-        # Bestellungen
-        'orders_total': Order.query.count(),
+    }
+
+
+def _order_kpis(history, this_month_start):
+    """Bestellungen"""
+    return {
+        'orders_total': db.session.query(func.sum(history.c.order_count)).scalar() or 0,
         'orders_this_month': Order.query.filter(Order.order_date >= this_month_start).count(),
         'orders_open': Order.query.filter_by(status='Offen').count(),
-        'orders_paid': Order.query.filter_by(status='Bezahlt').count(),
-        
-        # Kunden
+        'orders_paid': db.session.query(func.sum(history.c.order_count)).filter(
+            history.c.status == 'Bezahlt'
+        ).scalar() or 0,
+    }
+
+
+def _customer_contact_kpis(this_month_start):
+    """Kunden und Kontakte"""
+    return {
         'customers_total': Customer.query.count(),
         'customers_this_month': Customer.query.filter(Customer.created_at >= this_month_start).count(),
-        
-        # Kontakte
         'contacts_total': Contact.query.count(),
         'contacts_this_month': Contact.query.filter(Contact.contact_time >= this_month_start).count()
     }
-    
-    # Monatsumsatz für Chart (letzte 12 Monate)
-    monthly_revenue = []
-    for i in range(11, -1, -1):
-        month_start = (now - relativedelta(months=i)).replace(day=1, hour=0, minute=0, second=0)
-        month_end = (month_start + relativedelta(months=1)) - timedelta(seconds=1)
-        
-        revenue = db.session.query(func.sum(Order.total_amount)).filter(
-            Order.status != 'Storniert',
-            Order.order_date >= month_start,
-            Order.order_date <= month_end
-        ).scalar() or 0
-        
-        monthly_revenue.append({
-            'month': month_start.strftime('%b %Y'),
-            'revenue': float(revenue)
-        })
-    
-    # Top 10 Kunden nach Umsatz
-    top_customers = db.session.query(
+
+
+def _recent_orders():
+    return Order.query.options(joinedload(Order.customer)).order_by(desc(Order.order_date)).limit(5).all()
+
+
+def _recent_contacts():
+    return Contact.query.options(joinedload(Contact.customer)).order_by(desc(Contact.contact_time)).limit(5).all()
+
+
+def _monthly_revenue(now):
+    """Monatsumsatz für Chart (letzte 12 Monate, eine Abfrage)"""
+    this_month = now.date().replace(day=1)
+    points = timeseries.series('revenue', 'month', this_month - relativedelta(months=11),
+                               this_month + relativedelta(months=1, days=-1))
+    return [
+        {'month': month_start.strftime('%b %Y'), 'revenue': float(revenue)}
+        for month_start, revenue in points
+    ]
+
+
+def _top_customers(history):
+    """Top 10 Kunden nach Umsatz"""
+    return db.session.query(
         Customer,
-        func.sum(Order.total_amount).label('total_revenue')
-    ).join(Order).filter(
-        Order.status != 'Storniert'
+        func.sum(history.c.revenue).label('total_revenue')
+    ).join(history, history.c.customer_id == Customer.id).filter(
+        history.c.status != 'Storniert'
     ).group_by(Customer.id).order_by(desc('total_revenue')).limit(10).all()
-    
-    # Bestellungen nach Status
+
+
+def _order_status_stats(history):
+    """Bestellungen nach Status"""
     order_status_raw = db.session.query(
-        Order.status,
-        func.count(Order.id).label('count'),
-        func.sum(Order.total_amount).label('total')
-    ).group_by(Order.status).all()
+        history.c.status,
+        func.sum(history.c.order_count).label('count'),
+        func.sum(history.c.revenue).label('total')
+    ).group_by(history.c.status).all()
     
     # Zu JSON-serialisierbaren Dicts konvertieren
-    order_status_stats = [
+    return [
         {'status': row.status, 'count': row.count, 'total': float(row.total or 0)}
         for row in order_status_raw
     ]
-    
-    # Kontakte nach Kanal
+
+
+def _contact_channel_stats():
+    """Kontakte nach Kanal"""
     contact_channel_raw = db.session.query(
         Contact.channel,
         func.count(Contact.id).label('count')
     ).group_by(Contact.channel).all()
     
     # Zu JSON-serialisierbaren Dicts konvertieren
-    contact_channel_stats = [
+    return [
         {'channel': row.channel, 'count': row.count}
         for row in contact_channel_raw
     ]
-    
-    # Neueste Aktivitäten
-    recent_orders = Order.query.order_by(desc(Order.order_date)).limit(5).all()
-    recent_contacts = Contact.query.order_by(desc(Contact.contact_time)).limit(5).all()
-    
-    # Durchschnittswerte
-    avg_order_value = kpis['revenue_total'] / kpis['orders_total'] if kpis['orders_total'] > 0 else 0
-    avg_customer_value = kpis['revenue_total'] / kpis['customers_total'] if kpis['customers_total'] > 0 else 0
-    
-    return render_template('reports/dashboard.html',
-                         kpis=kpis,
-                         monthly_revenue=monthly_revenue,
-                         top_customers=top_customers,
-                         order_status_stats=order_status_stats,
-                         contact_channel_stats=contact_channel_stats,
-                         recent_orders=recent_orders,
-                         recent_contacts=recent_contacts,
-                         avg_order_value=avg_order_value,
-                         avg_customer_value=avg_customer_value)
 
 
 @bp.route('/customers')
@@ -143,57 +195,341 @@ def index():
 def customers():
     """Kundenberichte"""
     
+    history = archive.order_rollup()
+    
     # Top-Kunden nach verschiedenen Metriken
     top_by_revenue = db.session.query(
         Customer,
-        func.sum(Order.total_amount).label('total_revenue'),
-        func.count(Order.id).label('order_count')
-    ).join(Order).filter(
-        Order.status != 'Storniert'
+        func.sum(history.c.revenue).label('total_revenue'),
+        func.sum(history.c.order_count).label('order_count')
+    ).join(history, history.c.customer_id == Customer.id).filter(
+        history.c.status != 'Storniert'
     ).group_by(Customer.id).order_by(desc('total_revenue')).limit(20).all()
     
     top_by_orders = db.session.query(
         Customer,
-        func.count(Order.id).label('order_count'),
-        func.sum(Order.total_amount).label('total_revenue')
-    ).join(Order).filter(
-        Order.status != 'Storniert'
+        func.sum(history.c.order_count).label('order_count'),
+        func.sum(history.c.revenue).label('total_revenue')
+    ).join(history, history.c.customer_id == Customer.id).filter(
+        history.c.status != 'Storniert'
     ).group_by(Customer.id).order_by(desc('order_count')).limit(20).all()
     
-    # Kunden ohne Bestellungen
-    customers_no_orders = Customer.query.outerjoin(Order).group_by(Customer.id).having(
-        func.count(Order.id) == 0
-    ).all()
+    # Kunden ohne Bestellungen (auch ohne archivierte) - die neuesten, nicht alle Leads
+    customers_no_orders = Customer.query.filter(
+        ~Customer.id.in_(select(history.c.customer_id))
+    ).order_by(desc(Customer.created_at)).limit(NO_ORDERS_LIMIT).all()
     
     return render_template('reports/customers.html',
                          top_by_revenue=top_by_revenue,
                          top_by_orders=top_by_orders,
-                         customers_no_orders=customers_no_orders)
+                         customers_no_orders=customers_no_orders,
+                         no_orders_limit=NO_ORDERS_LIMIT)
 
 
 @bp.route('/products')
 @login_required
 def products():
-    """Produktberichte"""
-    from models import OrderItem
-    
-    # Top-Produkte
+    """Produktberichte (aus den täglichen Produktumsätzen, inkl. Archiv)"""
+    date_from = request.args.get('from', '')
+    date_to = request.args.get('to', '')
+    
+    sales = db.session.query(
+        ProductSalesDaily.product_id,
+        func.sum(ProductSalesDaily.quantity).label('total_sold'),
+        func.sum(ProductSalesDaily.revenue).label('total_revenue')
+    )
+    try:
+        if date_from:
+            sales = sales.filter(ProductSalesDaily.day >= datetime.strptime(date_from, '%Y-%m-%d').date())
+        if date_to:
+            sales = sales.filter(ProductSalesDaily.day <= datetime.strptime(date_to, '%Y-%m-%d').date())
+    except ValueError:
+        flash('Ungültiges Datumsformat.', 'danger')
+    sales = sales.group_by(ProductSalesDaily.product_id).subquery()
+    
+    # Top-Produkte nach Umsatz (nach Rabatt)
     top_products = db.session.query(
-        Product,
-        func.sum(OrderItem.quantity).label('total_sold'),
-        func.sum(OrderItem.quantity * OrderItem.unit_price).label('total_revenue')
-    ).join(OrderItem).join(Order).filter(
-        Order.status != 'Storniert'
-    ).group_by(Product.id).order_by(desc('total_revenue')).limit(20).all()
-    
-    return render_template('reports/products.html', top_products=top_products)
+        Product, sales.c.total_sold, sales.c.total_revenue
+    ).join(sales, sales.c.product_id == Product.id).order_by(
+        desc(sales.c.total_revenue)
+    ).limit(20).all()
+    
+    # Umsatz je Kategorie
+    categories = db.session.query(
+        Product.category,
+        func.sum(sales.c.total_sold).label('total_sold'),
+        func.sum(sales.c.total_revenue).label('total_revenue')
+    ).join(sales, sales.c.product_id == Product.id).group_by(
+        Product.category
+    ).order_by(desc('total_revenue')).all()
+    
+    return render_template('reports/products.html',
+                         top_products=top_products,
+                         categories=categories,
+                         date_from=date_from,
+                         date_to=date_to)
+
+
+def _month_index(column):
+    """Jahr * 12 + Monat - portabel (EXTRACT bzw. strftime unter SQLite)"""
+    return extract('year', column) * 12 + extract('month', column)
+
+
+def _month_label(index):
+    year, month = divmod(index - 1, 12)
+    return f'{year:04d}-{month + 1:02d}'
+
+
+def _cohort_retention(today, months):
+    """Neukunden je Monat und wie viele davon in den Folgemonaten bestellt haben
+
+    Eine Abfrage: Kohorte je Kunde (Monat der Anlage, Größe per Fensterfunktion)
+    und Bestellmonate je Kunde aus Hot-Bestellungen und Archiv-Summen, ohne
+    Stornos. Beide Quellen werden einzeln mit den Neukunden verbunden statt über
+    archive.order_rollup() - so liest die Datenbank nur deren Bestellungen über
+    (customer_id, order_date). Liefert JSON-fähige Dicts, `active[i]` = Kunden
+    mit Bestellung im i-ten Monat nach der Anlage (0 = Anlagemonat).
+    """
+    current = today.year * 12 + today.month
+    year, month = divmod(current - months, 12)
+    start = datetime(year, month + 1, 1)
+
+    cohort = _month_index(Customer.created_at)
+    cohorts = select(
+        Customer.id.label('customer_id'),
+        Customer.created_at,
+        cohort.label('cohort'),
+        func.count().over(partition_by=cohort).label('size')
+    ).where(Customer.created_at >= start).cte('cohorts')
+
+    hot = select(
+        cohorts.c.customer_id, cohorts.c.cohort, cohorts.c.size,
+        _month_index(Order.order_date).label('month')
+    ).join(Order, and_(
+        Order.customer_id == cohorts.c.customer_id,
+        Order.order_date >= cohorts.c.created_at
+    )).where(Order.status != 'Storniert')
+    archived = select(
+        cohorts.c.customer_id, cohorts.c.cohort, cohorts.c.size,
+        _month_index(ArchivedOrderSummary.month)
+    ).join(ArchivedOrderSummary, and_(
+        ArchivedOrderSummary.customer_id == cohorts.c.customer_id,
+        ArchivedOrderSummary.last_order_date >= cohorts.c.created_at
+    )).where(ArchivedOrderSummary.status != 'Storniert')
+    activity = select(union_all(hot, archived).subquery()).distinct().cte('activity')
+
+    offset = (activity.c.month - activity.c.cohort).label('offset')
+    rows = db.session.execute(union_all(
+        select(activity.c.cohort, activity.c.size, offset, func.count())
+        .group_by(activity.c.cohort, activity.c.size, offset),
+        # Größe auch für Kohorten ohne jede Bestellung
+        select(cohorts.c.cohort, cohorts.c.size, null(), literal(0))
+        .group_by(cohorts.c.cohort, cohorts.c.size)
+    )).all()
+
+    result = {}
+    for index, size, month_offset, active in rows:
+        entry = result.setdefault(index, {
+            'cohort': _month_label(index),
+            'customers': size,
+            'active': [0] * (current - index + 1),
+        })
+        if month_offset is not None and month_offset < len(entry['active']):
+            entry['active'][month_offset] = active
+
+    cohorts_list = []
+    for index in sorted(result):
+        entry = result[index]
+        entry['retention'] = [round(active * 100 / entry['customers'], 1) for active in entry['active']]
+        cohorts_list.append(entry)
+    return {'months': months, 'computed_on': today.isoformat(), 'cohorts': cohorts_list}
+
+
+def _cohorts():
+    """Kohortenbericht aus dem Cache (Schlüssel: Tag und Monate)"""
+    try:
+        months = int(request.args.get('months', COHORT_MONTHS))
+    except ValueError:
+        months = COHORT_MONTHS
+    months = max(1, min(months, COHORT_MONTHS_MAX))
+    today = date.today()
+    return cached_value('reports.cohorts', (today.isoformat(), months),
+                        lambda: _cohort_retention(today, months), ttl=COHORT_CACHE_TTL)
+
+
+@bp.route('/cohorts')
+@login_required
+def cohorts():
+    """Kohortenbericht: Wiederkaufrate der Neukunden je Anlagemonat"""
+    return render_template('reports/cohorts.html', report=_cohorts())
+
+
+@bp.route('/cohorts.json')
+@login_required
+def cohorts_json():
+    """Daten des Kohortenberichts für den Chart"""
+    return _cohorts()
+
+
+def _timeseries_version(metric):
+    if metric not in timeseries.METRICS:
+        abort(404)
+    return DATA_SOURCES[timeseries.METRICS[metric]]()
+
+
+@bp.route('/timeseries/<metric>')
+@login_required
+@conditional(_timeseries_version)
+def timeseries_json(metric):
+    """Zeitreihe (revenue, orders, customers, contacts) als Chart-Daten
+
+    ?granularity=day|week|month|quarter (Standard month), ?from=&to= als YYYY-MM-DD
+    """
+    if metric not in timeseries.METRICS:
+        abort(404)
+    granularity = request.args.get('granularity', 'month')
+    if granularity not in timeseries.GRANULARITIES:
+        return {'error': f'Unbekannte Granularität: {granularity}'}, 400
+    
+    start, end = timeseries.default_range(granularity)
+    try:
+        if request.args.get('from'):
+            start = datetime.strptime(request.args['from'], '%Y-%m-%d').date()
+        if request.args.get('to'):
+            end = datetime.strptime(request.args['to'], '%Y-%m-%d').date()
+    except ValueError:
+        return {'error': 'Ungültiges Datumsformat, erwartet YYYY-MM-DD'}, 400
+    if start > end:
+        return {'error': 'from liegt nach to'}, 400
+    if timeseries.bucket_count(start, end, granularity) > timeseries.MAX_BUCKETS:
+        return {'error': f'Höchstens {timeseries.MAX_BUCKETS} Zeiträume - gröbere Granularität wählen'}, 400
+    
+    points = timeseries.series(metric, granularity, start, end)
+    # Umsatz als Betrag, sonst Anzahl
+    convert = float if metric == 'revenue' else int
+    return {
+        'metric': metric,
+        'granularity': granularity,
+        'from': start.isoformat(),
+        'to': end.isoformat(),
+        'buckets': [bucket_start.isoformat() for bucket_start, _ in points],
+        'labels': [timeseries.label(bucket_start, granularity) for bucket_start, _ in points],
+        'values': [convert(value) for _, value in points],
+    }
+
+
+def _forecast_version(customer_id=None):
+    return DATA_SOURCES['forecasts']()
+
+
+@bp.route('/forecast')
+@bp.route('/forecast/<int:customer_id>')
+@login_required
+@conditional(_forecast_version)
+def forecast_json(customer_id=None):
+    """Umsatzprognose gesamt bzw. eines Kunden (vorberechnet, services.forecast)"""
+    if customer_id is not None:
+        Customer.query.get_or_404(customer_id)
+    points = forecast.series(customer_id)
+    computed_at = forecast.computed_at()
+    return {
+        'customer_id': customer_id,
+        'computed_at': computed_at.isoformat() if computed_at else None,
+        'months': [month.isoformat() for month, _ in points],
+        'labels': [timeseries.label(month, 'month') for month, _ in points],
+        'values': [float(revenue) for _, revenue in points],
+    }
+
+
+def _csv_arg(name, default=''):
+    return [value for value in request.args.get(name, default).split(',') if value]
+
+
+@bp.route('/cube')
+@login_required
+def cube_pivot():
+    """Pivot über den Umsatz-Würfel (JSON), ohne Zugriff auf die Basistabellen
+
+    ?by=city,month       Dimensionen: country, city, category, status, month, quarter, year
+    ?measures=revenue    Kennzahlen: revenue, quantity, orders, customers (Standard: alle)
+    ?status=Bezahlt,Offen&category=...&country=...&city=...   Filter
+    ?from=2026-01&to=2026-06   Monate (inklusive)
+    """
+    dimensions = _csv_arg('by', 'category')
+    measures = _csv_arg('measures', ','.join(cube.MEASURES))
+    unknown = [name for name in dimensions if name not in cube.DIMENSIONS]
+    unknown += [name for name in measures if name not in cube.MEASURES]
+    if unknown:
+        return {'error': f"Unbekannte Dimension/Kennzahl: {', '.join(unknown)}"}, 400
+    if len(set(dimensions)) != len(dimensions):
+        return {'error': 'Dimension mehrfach angegeben'}, 400
+    
+    filters = {name: _csv_arg(name) for name in cube.FILTERS if _csv_arg(name)}
+    try:
+        start = datetime.strptime(request.args['from'], '%Y-%m').date() if request.args.get('from') else None
+        end = datetime.strptime(request.args['to'], '%Y-%m').date() if request.args.get('to') else None
+    except ValueError:
+        return {'error': 'Ungültiger Monat, erwartet YYYY-MM'}, 400
+    
+    totals = cube.pivot([], measures, filters, start, end)
+    return {
+        'dimensions': dimensions,
+        'measures': measures,
+        'filters': filters,
+        'from': request.args.get('from') or None,
+        'to': request.args.get('to') or None,
+        'rows': cube.pivot(dimensions, measures, filters, start, end),
+        # Kunden/Bestellungen sind nicht additiv - Gesamtwerte eigens aus dem Würfel
+        'totals': totals[0],
+    }
+
+
+# Versionen der Exporte: wie die Fragmente, ohne count(*) über ganze Tabellen
+def _customers_version():
+    return DATA_SOURCES['customers']()
+
+
+def _orders_version():
+    return DATA_SOURCES['orders']() + DATA_SOURCES['customers']()
+
+
+def _contacts_version():
+    return DATA_SOURCES['contacts']() + DATA_SOURCES['customers']()
 
 
 @bp.route('/export/customers_csv')
 @login_required
+@conditional(_customers_version)
 def export_customers_csv():
     """Export aller Kunden als CSV"""
-    
+    return _csv_response(_customers_csv(), 'kunden_export.csv')
+
+
+@bp.route('/export/orders_csv')
+@login_required
+@conditional(_orders_version)
+def export_orders_csv():
+    """Export aller Bestellungen als CSV (inkl. Archiv)"""
+    return _csv_response(_orders_csv(), 'bestellungen_export.csv')
+
+
+@bp.route('/export/contacts_csv')
+@login_required
+@conditional(_contacts_version)
+def export_contacts_csv():
+    """Export aller Kontakte als CSV"""
+    # Nur Chef sieht Bewertungen
+    return _csv_response(_contacts_csv(current_user.is_chef()), 'kontakte_export.csv')
+
+
+def _csv_response(text, filename):
+    response = make_response(text)
+    response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+def _customers_csv():
     customers = Customer.query.order_by(Customer.last_name, Customer.first_name).all()
     
     # CSV erstellen
@@ -222,20 +558,22 @@ def export_customers_csv():
             customer.created_at.strftime('%d.%m.%Y') if customer.created_at else ''
         ])
     
-    # Response erstellen
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-    response.headers['Content-Disposition'] = 'attachment; filename=kunden_export.csv'
-    
-    return response
+    return output.getvalue()
 
 
-@bp.route('/export/orders_csv')
-@login_required
-def export_orders_csv():
-    """Export aller Bestellungen als CSV"""
-    
-    orders = Order.query.join(Customer).order_by(desc(Order.order_date)).all()
+def _orders_csv():
+    history = archive.order_history()
+    orders = db.session.query(
+        history.c.order_number,
+        history.c.order_date,
+        history.c.status,
+        history.c.total_amount,
+        history.c.archived,
+        Customer.first_name,
+        Customer.last_name
+    ).join(Customer, Customer.id == history.c.customer_id).order_by(
+        desc(history.c.order_date)
+    ).all()
     
     # CSV erstellen
     output = io.StringIO()
@@ -243,35 +581,24 @@ def export_orders_csv():
     
     # Header
     writer.writerow([
-        'Bestellnummer', 'Kunde', 'Datum', 'Status', 'Betrag (EUR)'
+        'Bestellnummer', 'Kunde', 'Datum', 'Status', 'Betrag (EUR)', 'Archiviert'
     ])
     
     # Daten
     for order in orders:
         writer.writerow([
             order.order_number,
-            order.customer.full_name,
+            f"{order.first_name} {order.last_name}",
             order.order_date.strftime('%d.%m.%Y'),
             order.status,
-            f"{order.total_amount:.2f}"
+            f"{order.total_amount:.2f}",
+            'Ja' if order.archived else 'Nein'
         ])
     
-    # Response erstellen
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-    response.headers['Content-Disposition'] = 'attachment; filename=bestellungen_export.csv'
-    
-    return response
+    return output.getvalue()
 
 
-@bp.route('/export/contacts_csv')
-@login_required
-def export_contacts_csv():
-    """Export aller Kontakte als CSV"""
-    
-    # Nur Chef sieht Bewertungen
-    show_ratings = current_user.is_chef()
-    
+def _contacts_csv(show_ratings):
     contacts = Contact.query.join(Customer).order_by(desc(Contact.contact_time)).all()
     
     # CSV erstellen
@@ -298,9 +625,20 @@ def export_contacts_csv():
             row.append(contact.rating or '')
         writer.writerow(row)
     
-    # Response erstellen
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'text/csv; charset=utf-8-sig'
-    response.headers['Content-Disposition'] = 'attachment; filename=kontakte_export.csv'
-    
-    return response
+    return output.getvalue()
+
+
+# Exporte, die auch als Hintergrund-Job laufen können: Art -> (CSV, Dateiname)
+EXPORTS = {
+    'customers': (lambda show_ratings: _customers_csv(), 'kunden_export.csv'),
+    'orders': (lambda show_ratings: _orders_csv(), 'bestellungen_export.csv'),
+    'contacts': (_contacts_csv, 'kontakte_export.csv'),
+}
+
+
+@jobs.task('reports.export_csv')
+def export_csv_job(kind, show_ratings=False):
+    """Großen Export im Hintergrund erstellen (Read-Replica, falls vorhanden)"""
+    replica.route_to_replica()
+    build, filename = EXPORTS[kind]
+    return jobs.write_result(filename, build(show_ratings))
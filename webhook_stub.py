@@ -0,0 +1,101 @@
+"""
+Lokaler Webhook-Empfänger zum Testen der Outbox
+Nimmt POST {"events": [...]} entgegen, gibt jeden Batch aus, prüft optional
+die HMAC-Signatur und meldet doppelt zugestellte Ereignis-IDs. Mit
+--fail-rate/--delay lassen sich Ausfälle und langsame Empfänger simulieren.
+
+Aufruf:
+    python webhook_stub.py --port 8099
+    python webhook_stub.py --fail-rate 0.5 --delay 0.2 --secret geheim
+
+    OUTBOX_WEBHOOK_URLS=http://127.0.0.1:8099/billing flask --app app outbox-dispatch
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    """Empfangene Ereignisse (für Ausgabe und Duplikat-Erkennung)"""
+
+    def __init__(self, fail_rate=0.0, delay=0.0, secret=None):
+        self.fail_rate = fail_rate
+        self.delay = delay
+        self.secret = secret
+        self.batches = 0
+        self.seen = set()
+        self.duplicates = 0
+        self.lock = threading.Lock()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        state = self.server.state
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        if state.delay:
+            time.sleep(state.delay)
+        if random.random() < state.fail_rate:
+            self._reply(503, {'error': 'simulierter Ausfall'})
+            return
+
+        if state.secret:
+            expected = 'sha256=' + hmac.new(state.secret.encode(), body, hashlib.sha256).hexdigest()
+            if not hmac.compare_digest(expected, self.headers.get('X-Signature', '')):
+                self._reply(401, {'error': 'Signatur ungültig'})
+                return
+
+        events = json.loads(body)['events']
+        with state.lock:
+            state.batches += 1
+            for event in events:
+                if event['id'] in state.seen:
+                    state.duplicates += 1
+                state.seen.add(event['id'])
+            print(f'{self.path} Batch {state.batches}: {len(events)} Ereignisse '
+                  f'(gesamt {len(state.seen)}, Duplikate {state.duplicates})', flush=True)
+            for event in events:
+                print(f"  #{event['id']} {event['type']} {json.dumps(event['data'])}", flush=True)
+        self._reply(200, {'received': len(events)})
+
+    def _reply(self, status, data):
+        payload = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port=8099, **options):
+    server = ThreadingHTTPServer(('127.0.0.1', port), StubHandler)
+    server.state = StubState(**options)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lokaler Webhook-Empfänger für die Outbox')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--fail-rate', type=float, default=0.0, help='Anteil Antworten mit 503 (0-1)')
+    parser.add_argument('--delay', type=float, default=0.0, help='Verzögerung je Anfrage in Sekunden')
+    parser.add_argument('--secret', help='OUTBOX_WEBHOOK_SECRET zur Prüfung der Signatur')
+    args = parser.parse_args()
+
+    server = make_server(args.port, fail_rate=args.fail_rate, delay=args.delay, secret=args.secret)
+    print(f'Webhook-Stub auf http://127.0.0.1:{args.port}/ (Strg+C beendet)')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()